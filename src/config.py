@@ -26,6 +26,44 @@ TRACK_WIDTH = 80
 CHECKPOINT_RADIUS = 30
 TOTAL_LAPS = 3
 
+# Distance field settings (signed distance to the road edge)
+TRACK_FIELD_CELL_SIZE = 4  # Pixels per field cell
+TRACK_FIELD_MAX_DISTANCE = 64  # Distances are clamped to +/- this (pixels)
+TRACK_RAY_MAX_STEPS = 24  # Batched ray steps; rays still marching finish one by one
+TRACK_RAY_MIN_STEP = 2
+TRACK_RAY_EPSILON = 0.5
+
+# Track geometry settings (analytic centreline queries)
+TRACK_SPLINE_SPACING = 16  # Pixels between centreline samples
+TRACK_BVH_LEAF_SIZE = 4  # Segments per BVH leaf
+
+# AI navigation settings (flow field used to recover off the road)
+NAV_CELL_SIZE = 32  # Pixels per flow field cell
+NAV_CENTER_PULL = 0.6  # Weight of the pull toward the middle of the road
+NAV_OFFROAD_FORWARD = 0.3  # Weight of the forward direction off the road
+NAV_GRADIENT_STEP = 8  # Pixels between distance samples for the gradient
+AI_MAX_RECOVERY_TIME = 4.0  # Seconds off the road before AI respawns instead
+
+# Wall settings (optional solid road edges)
+TRACK_WALLS = False  # Karts slide along the road edges instead of leaving the road
+WALL_MAX_SLIDES = 3  # Wall contacts resolved per move
+WALL_SKIN = 0.01  # Gap left between a kart and a wall it stops at (pixels)
+WALL_FIELD_MARGIN = 2 * TRACK_FIELD_CELL_SIZE  # Distance field error allowance
+WALL_SPARK_SPEED = 2  # Harder hits (pixels per tick into the wall) throw dust
+
+# Procedural track settings
+GENERATOR_MIN_POINTS = 8
+GENERATOR_MAX_POINTS = 14
+GENERATOR_MIN_ROAD_WIDTH = TRACK_WIDTH
+GENERATOR_MAX_ROAD_WIDTH = 140
+GENERATOR_MIN_SEGMENT = 160  # Shortest straight between control points
+GENERATOR_MAX_TURN = 100  # Sharpest turn at a control point (degrees)
+GENERATOR_CLEARANCE = 40  # Grass between non-adjacent road segments
+GENERATOR_MAX_WATER = 4
+GENERATOR_MAX_ATTEMPTS = 200
+TRACK_CACHE_DIR = "track_cache"
+TRACK_PACK_DIR = "track_packs"  # Compiled tracks (python -m src.track.packs)
+
 # Kart settings
 KART_SIZE = 20
 MAX_SPEED = 8
@@ -38,6 +76,151 @@ WATER_RESPAWN = True
 # AI settings
 AI_REACTION_TIME = 0.1
 AI_SPEED_VARIATION = 0.8
+NUM_AI_KARTS = 3
+AI_SHELL_RANGE = 350  # Fire at karts this close ahead
+AI_SHELL_CONE = 10  # Degrees either side of the heading
+AI_BANANA_RANGE = 120  # Drop bananas on karts this close behind
+
+# Item settings
+ITEM_BOX_ROW_INTERVAL = 2  # A row of item boxes every Nth checkpoint segment
+ITEM_BOXES_PER_ROW = 3
+ITEM_BOX_RADIUS = 12
+ITEM_BOX_RESPAWN_TIME = 4.0
+ITEM_PROJECTILE_CAPACITY = 256  # Pooled shells and bananas in play
+ITEM_PROJECTILE_RADIUS = 8
+ITEM_SHELL_SPEED = 720  # Pixels per second
+ITEM_SHELL_LIFE = 3.0
+ITEM_BANANA_LIFE = 30.0
+ITEM_OWNER_GRACE = 0.5  # Seconds before a kart can hit its own projectile
+ITEM_SPIN_TIME = 1.0
+ITEM_SPIN_RATE = 720  # Degrees per second while spinning out
+ITEM_GRID_CELL = 64  # Broadphase cell size (>= hit distance)
+
+
+# Particle settings
+PARTICLE_CAPACITY = 4096
+PARTICLE_FADE_STEPS = 8  # Pre-rendered alpha levels per particle sprite
+PARTICLE_DUST_PER_FRAME = 1
+PARTICLE_SKID_PER_FRAME = 2
+PARTICLE_SKID_TURN_RATE = 2.5  # Degrees per frame before tyres leave marks
+
+# Audio settings
+AUDIO_ENABLED = True
+AUDIO_VOICES = 4  # Karts heard at once, the nearest to the camera
+AUDIO_EFFECT_CHANNELS = 4  # Mixer channels for one-shot effects
+AUDIO_PITCH_BUCKETS = 16  # Precomputed engine pitches
+AUDIO_ENGINE_PITCH = (0.8, 2.6)  # Engine playback rate at rest and top speed
+AUDIO_HEARING_DISTANCE = 700  # Pixels from the screen centre
+AUDIO_ENGINE_VOLUME = 0.35
+AUDIO_RUMBLE_VOLUME = 0.5
+AUDIO_RUMBLE_MIN_SPEED = 0.1  # Fraction of top speed before grass rumbles
+AUDIO_SPLASH_VOLUME = 0.8
+
+# Adaptive quality settings
+ADAPTIVE_QUALITY = True
+QUALITY_WINDOW = 90  # Frames of history the controller looks at
+QUALITY_EVAL_INTERVAL = 15  # Frames between decisions
+QUALITY_DOWNGRADE_RATIO = 0.9  # p90 work time above this share of budget
+QUALITY_UPGRADE_RATIO = 0.55  # p90 work time below this share of budget
+QUALITY_COOLDOWN = 60  # Frames to wait after any change
+QUALITY_UPGRADE_HOLD = 180  # Frames of headroom needed before upgrading
+QUALITY_MAX_UPGRADE_HOLD = 1800
+
+# Highest quality first. Intervals are in frames; ai_far_reaction_scale
+# slows decisions of AI karts that are off screen. render_scale sticks to
+# 1 and 0.5 because the 2x upscale has a fast path and other ratios cost
+# more to upscale than they save.
+QUALITY_LEVELS = [
+    {'name': 'high', 'render_scale': 1.0, 'particle_interval': 1,
+     'hud_interval': 1, 'ai_far_reaction_scale': 1},
+    {'name': 'medium', 'render_scale': 1.0, 'particle_interval': 2,
+     'hud_interval': 3, 'ai_far_reaction_scale': 2},
+    {'name': 'low', 'render_scale': 0.5, 'particle_interval': 2,
+     'hud_interval': 6, 'ai_far_reaction_scale': 3},
+    {'name': 'lowest', 'render_scale': 0.5, 'particle_interval': 3,
+     'hud_interval': 10, 'ai_far_reaction_scale': 4}
+]
+
+# Pipelined simulation settings
+PIPELINED_SIMULATION = False  # Run race simulation on a worker thread
+SIM_TICK_RATE = FPS  # Fixed simulation ticks per second in pipelined mode
+SIM_MAX_CATCH_UP_TICKS = 5  # Ticks run back to back before skipping ahead
+SNAPSHOT_TELEPORT_DISTANCE = 50  # Larger moves (respawns) are not interpolated
+
+# Input latency settings
+LATENCY_TRACING = False  # Trace input-to-flip latency, report at exit
+LATENCY_SAMPLES = 4096
+LATE_INPUT_SAMPLING = False  # Start each frame as late as the deadline allows
+LATE_INPUT_MARGIN_MS = 2.0  # Slack kept on top of the p90 frame work time
+
+# Tracing settings
+TRACE_ENABLED = False  # Record timing spans; F10 or exit dumps Chrome trace JSON
+TRACE_CAPACITY = 1 << 20  # Events kept (oldest are overwritten)
+TRACE_DIR = "traces"
+
+# Rollback settings
+SNAPSHOT_RING_SIZE = FPS * 5  # Recent race snapshots kept (one per tick)
+PRACTICE_REWIND = True  # Backspace rewinds the race
+REWIND_SECONDS = 2.0
+
+# Telemetry settings
+TELEMETRY_DIR = None  # Directory for per-tick kart telemetry; None disables
+TELEMETRY_SAMPLE_EVERY = 1  # Record every Nth simulation tick
+TELEMETRY_CHUNK_ROWS = 4096
+TELEMETRY_POOL_SIZE = 4  # Chunk buffers; rows are dropped when all are busy
+
+# Telemetry analytics settings (src/systems/analytics.py)
+ANALYTICS_CELL_SIZE = 16  # Heatmap cell, in pixels
+ANALYTICS_CHUNK_ROWS = 1 << 22  # Rows analyzed at a time (whole races)
+ANALYTICS_TELEPORT_SPEED = 3 * MAX_SPEED  # Pixels per tick no kart drives at
+ANALYTICS_HOTSPOTS = 5  # Hotspots reported per map
+ANALYTICS_HOTSPOT_RADIUS = 64  # Minimum distance between hotspots
+
+# State feed settings (shared-memory race state for external tools)
+STATE_FEED_NAME = None  # Shared-memory segment name, e.g. "kart_state"; None disables
+STATE_FEED_SLOTS = 64  # Frames kept in the ring (about a second of ticks)
+STATE_FEED_MAX_KARTS = 16
+
+# Frame scheduler settings (deferred background work)
+SCHEDULER_MAX_FRAME_MS = 4.0  # Most time spent on deferred jobs per frame
+SCHEDULER_MARGIN_MS = 1.0  # Budget kept free at the end of each frame
+
+# Idle redraw settings (menu scenes draw only when they change)
+IDLE_REDRAW = True
+IDLE_WAIT_MS = 100  # Longest sleep in the event queue while a menu is idle
+
+# Frame capture settings (F9 toggles capture)
+CAPTURE_ENABLED = False  # Capture from startup
+CAPTURE_DIR = "captures"
+CAPTURE_POOL_SIZE = 8  # Frame buffers; frames are dropped when all are queued
+CAPTURE_WRITERS = 2  # PNG writer threads (an encoder always gets one)
+CAPTURE_WRITER_NICE = 10  # Writers yield the CPU to the game loop
+CAPTURE_PNG_LEVEL = 1  # zlib level: fast beats small for a live capture
+# Pipe raw frames to an encoder instead of writing PNGs, e.g.
+# "ffmpeg -loglevel error -y -f rawvideo -pix_fmt {pix_fmt} -s {width}x{height}
+#  -r {fps} -i - -pix_fmt yuv420p {output}.mp4"
+CAPTURE_ENCODER = None
+
+# Memory diagnostics settings (snapshots at every scene change)
+MEMORY_DIAGNOSTICS = False  # Trace allocations; slows the game down
+MEMORY_DIR = "memory"  # Per-session timelines (memory-<date>-<time>.jsonl)
+MEMORY_TOP_SITES = 10  # Allocation sites kept per snapshot
+MEMORY_TRACEBACK_FRAMES = 1  # Frames per allocation traceback
+
+# Lap prediction settings (customization screen)
+LAP_PREDICTION_CACHE = "track_cache/lap_predictions.json"
+LAP_PREDICTION_MAX_TIME = 60.0  # Simulated seconds before giving up on a lap
+LAP_PREDICTION_LOOK_AHEAD = 90  # Pixels along the flow field the driver aims
+LAP_PREDICTION_CORNER_SPEED = 0.5  # Slowest corner speed, fraction of max
+LAP_PREDICTION_CHECK_TICKS = 30  # Ticks between checks for a newer request
+
+# Training environment settings
+ENV_DT = 1.0 / FPS
+ENV_MAX_EPISODE_STEPS = 3600
+ENV_RAY_ANGLES = (-90, -45, -20, 0, 20, 45, 90)  # Relative to heading
+ENV_RAY_LENGTH = 300
+ENV_OFF_TRACK_PENALTY = 0.01
+ENV_EDGE_MARGIN = 20  # Penalty ramps in from this far inside the edge
 
 # Game states
 MENU = "menu"
@@ -46,3 +229,4 @@ PAUSED = "paused"
 FINISHED = "finished"
 CUSTOMIZATION = "customization"
 TRACK_SELECT = "track_select"
+EDITOR = "editor"
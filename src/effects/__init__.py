@@ -0,0 +1 @@
+# effects package
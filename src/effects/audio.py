@@ -0,0 +1,271 @@
+"""
+Engine and effect audio.
+
+Every sound is synthesized once per process when the first race starts:
+
+    engine   a looped engine note resampled into AUDIO_PITCH_BUCKETS pitch
+             variants between AUDIO_ENGINE_PITCH, so following a kart's
+             speed only means switching which buffer its channel loops
+    rumble   looped low noise for karts off the road
+    splash   a one-shot for karts falling into water
+
+Only the AUDIO_VOICES karts nearest the camera (within
+AUDIO_HEARING_DISTANCE) are heard. Each voice owns two reserved mixer
+channels, engine and rumble, and keeps its kart while that kart stays among
+the nearest. Splashes play on the unreserved channels. Per frame this is a
+distance sort over the karts and a few volume and buffer changes, and none
+of it touches sample data.
+
+The game works the same without a mixer (no audio device, or
+AUDIO_ENABLED off); SDL's dummy audio driver plays everything into the void
+for headless runs.
+"""
+
+import math
+import threading
+import numpy as np
+import pygame
+from src.config import *
+
+# Sounds per mixer format: {(frequency, size, channels): sounds}
+_sound_cache = {}
+
+
+def _loop_noise(length, low, high, rng):
+    """Noise that loops seamlessly over length samples, limited to low..high
+    cycles per loop."""
+    spectrum = np.zeros(length // 2 + 1, dtype=np.complex128)
+    size = max(1, high - low)
+    spectrum[low:low + size] = rng.normal(size=size) + 1j * rng.normal(size=size)
+    noise = np.fft.irfft(spectrum, length)
+    return noise / np.abs(noise).max()
+
+
+def synthesize_sounds(frequency):
+    """Sample data at frequency Hz as float arrays in [-1, 1]: 'engine'
+    (one loop per pitch bucket), 'rumble' and 'splash'."""
+    rng = np.random.default_rng(7)
+
+    # Half a second of a 55 Hz note, an even number of whole cycles so
+    # the loop (and every resampled variant) repeats seamlessly
+    cycles = 2 * int(round(0.25 * 55))
+    length = int(round(cycles * frequency / 55))
+    phase = np.arange(length) * (2 * np.pi * cycles / length)
+    engine = (0.6 * np.sin(phase) + 0.3 * np.sin(2 * phase + 0.5) +
+              0.15 * np.sin(3 * phase + 1.1) + 0.1 * np.sin(5 * phase + 2.0))
+    engine *= 1 + 0.3 * np.sin(phase / 2)  # Firing-order throb
+    engine += 0.08 * _loop_noise(length, cycles * 2, cycles * 40, rng)
+    engine /= np.abs(engine).max()
+
+    low, high = AUDIO_ENGINE_PITCH
+    loops = []
+    for bucket in range(AUDIO_PITCH_BUCKETS):
+        rate = low + (high - low) * bucket / max(1, AUDIO_PITCH_BUCKETS - 1)
+        size = max(2, int(round(length / rate)))
+        positions = np.arange(size) * (length / size)
+        loops.append(np.interp(positions, np.arange(length + 1),
+                               np.append(engine, engine[0])))
+
+    # One second of low rumble, looping
+    rumble_length = int(frequency)
+    rumble = _loop_noise(rumble_length, 20, 160, rng)
+    rumble *= 1 + 0.4 * _loop_noise(rumble_length, 4, 12, rng)
+    rumble /= np.abs(rumble).max()
+
+    # Splash: a burst of bright noise that dies away
+    splash_length = int(frequency * 0.7)
+    time = np.arange(splash_length) / frequency
+    splash = rng.normal(size=splash_length)
+    splash = np.diff(splash, prepend=0.0)  # Brighter
+    splash *= np.exp(-time * 6) * np.minimum(1, time * 200)
+    splash /= np.abs(splash).max()
+
+    return {'engine': loops, 'rumble': rumble, 'splash': splash}
+
+
+def _make_sound(samples, channels, size):
+    """A Sound from float samples in the mixer's format (size is pygame's:
+    bits, negative for signed samples, 32 for floats)."""
+    if size == 32:
+        data = samples.astype(np.float32)
+    else:
+        bits = abs(size)
+        peak = 2 ** (bits - 1) - 1
+        data = samples * 0.9 * peak
+        if size > 0:
+            data += peak + 1
+        data = data.astype(f"{'i' if size < 0 else 'u'}{bits // 8}")
+    if channels > 1:
+        data = np.repeat(data[:, None], channels, axis=1)
+    return pygame.sndarray.make_sound(np.ascontiguousarray(data))
+
+
+def load_sounds():
+    """Sounds for the current mixer format, built on first use."""
+    mixer_format = pygame.mixer.get_init()
+    if mixer_format not in _sound_cache:
+        frequency, size, channels = mixer_format
+        samples = synthesize_sounds(frequency)
+        _sound_cache[mixer_format] = {
+            'engine': [_make_sound(loop, channels, size) for loop in samples['engine']],
+            'rumble': _make_sound(samples['rumble'], channels, size),
+            'splash': _make_sound(samples['splash'], channels, size)}
+    return _sound_cache[mixer_format]
+
+
+def init_mixer():
+    """Start the mixer if it is not running. Returns whether audio works."""
+    if not AUDIO_ENABLED:
+        return False
+    if pygame.mixer.get_init() is None:
+        try:
+            pygame.mixer.init()
+        except pygame.error as error:
+            print(f"Audio unavailable: {error}")
+            return False
+    return True
+
+
+class Voice:
+    """The engine and rumble channels of one heard kart."""
+
+    __slots__ = ('engine', 'rumble', 'kart', 'bucket', 'rumbling')
+
+    def __init__(self, engine, rumble):
+        self.engine = engine
+        self.rumble = rumble
+        self.kart = None  # Index of the kart heard
+        self.bucket = None  # Engine loop playing
+        self.rumbling = False
+
+    def release(self):
+        self.engine.stop()
+        self.rumble.stop()
+        self.kart = None
+        self.bucket = None
+        self.rumbling = False
+
+
+class KartAudio:
+    """Engine, rumble and splash sounds of the karts nearest the camera."""
+
+    def __init__(self):
+        self.enabled = init_mixer()
+        self.splashes = []  # (x, y) collected by the simulation
+        self.lock = threading.Lock()
+        self.paused = False
+        if not self.enabled:
+            return
+        self.sounds = load_sounds()
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(),
+                                          2 * AUDIO_VOICES + AUDIO_EFFECT_CHANNELS))
+        pygame.mixer.set_reserved(2 * AUDIO_VOICES)
+        self.voices = [Voice(pygame.mixer.Channel(2 * i), pygame.mixer.Channel(2 * i + 1))
+                       for i in range(AUDIO_VOICES)]
+
+    def collect(self, karts):
+        """Remember the splashes of the last simulation tick (runs on the
+        simulation thread in pipelined mode)."""
+        if not self.enabled:
+            return
+        for kart in karts:
+            for name, x, y in kart.events:
+                if name == 'splash':
+                    with self.lock:
+                        self.splashes.append((x, y))
+
+    def update(self, karts, camera_x, camera_y):
+        """Follow the karts of a snapshot from the camera at (camera_x,
+        camera_y), the top left of the screen."""
+        if not self.enabled:
+            return
+        if self.paused:
+            self.set_paused(False)
+        listener_x = camera_x + SCREEN_WIDTH / 2
+        listener_y = camera_y + SCREEN_HEIGHT / 2
+
+        # The nearest karts in hearing distance get the voices
+        in_range = []
+        for index, kart in enumerate(karts):
+            distance = math.hypot(kart.x - listener_x, kart.y - listener_y)
+            if distance < AUDIO_HEARING_DISTANCE:
+                in_range.append((distance, index))
+        heard = {index: distance for distance, index in sorted(in_range)[:AUDIO_VOICES]}
+
+        free = []
+        for voice in self.voices:
+            if voice.kart is not None and voice.kart not in heard:
+                voice.release()
+            if voice.kart is None:
+                free.append(voice)
+        assigned = {voice.kart for voice in self.voices}
+        for index in heard:
+            if index not in assigned:
+                free.pop().kart = index
+
+        for voice in self.voices:
+            if voice.kart is not None:
+                kart = karts[voice.kart]
+                self.play_kart(voice, kart, heard[voice.kart], kart.x - listener_x)
+
+        with self.lock:
+            splashes, self.splashes = self.splashes, []
+        for x, y in splashes:
+            distance = math.hypot(x - listener_x, y - listener_y)
+            if distance < AUDIO_HEARING_DISTANCE:
+                channel = pygame.mixer.find_channel()
+                if channel is not None:
+                    channel.play(self.sounds['splash'])
+                    self.set_volume(channel, AUDIO_SPLASH_VOLUME, distance, x - listener_x)
+
+    def play_kart(self, voice, kart, distance, offset_x):
+        """Keep a voice's loops in step with its kart."""
+        speed = min(abs(kart.speed) / MAX_SPEED, 1.0)
+        pitch = speed * (AUDIO_PITCH_BUCKETS - 1)
+        # Some slack, so a speed between two buckets does not keep
+        # restarting the loop
+        if voice.bucket is None or abs(pitch - voice.bucket) > 0.75:
+            voice.bucket = int(round(pitch))
+            voice.engine.play(self.sounds['engine'][voice.bucket], loops=-1)
+        self.set_volume(voice.engine, AUDIO_ENGINE_VOLUME * (0.4 + 0.6 * speed),
+                        distance, offset_x)
+
+        rumbling = not kart.on_track and speed > AUDIO_RUMBLE_MIN_SPEED
+        if rumbling != voice.rumbling:
+            if rumbling:
+                voice.rumble.play(self.sounds['rumble'], loops=-1, fade_ms=60)
+            else:
+                voice.rumble.fadeout(120)
+            voice.rumbling = rumbling
+        if rumbling:
+            self.set_volume(voice.rumble, AUDIO_RUMBLE_VOLUME * speed, distance, offset_x)
+
+    @staticmethod
+    def set_volume(channel, volume, distance, offset_x):
+        """Volume falling off with distance, panned by horizontal offset."""
+        volume *= max(0.0, 1 - distance / AUDIO_HEARING_DISTANCE) ** 2
+        pan = max(-1.0, min(1.0, offset_x / (SCREEN_WIDTH / 2)))
+        channel.set_volume(volume * min(1.0, 1 - pan), volume * min(1.0, 1 + pan))
+
+    def set_paused(self, paused):
+        """Pause or resume every kart sound (e.g. with the game)."""
+        if not self.enabled or paused == self.paused:
+            return
+        for voice in self.voices:
+            if paused:
+                voice.engine.pause()
+                voice.rumble.pause()
+            else:
+                voice.engine.unpause()
+                voice.rumble.unpause()
+        self.paused = paused
+
+    def stop(self):
+        """Silence everything (leaving the race)."""
+        if not self.enabled:
+            return
+        for voice in self.voices:
+            voice.release()
+        with self.lock:
+            self.splashes.clear()
+        self.paused = False
@@ -0,0 +1,225 @@
+"""
+Pooled particle effects (dust, skid marks, water splashes).
+
+Particles live in preallocated NumPy arrays with a fixed capacity. New
+particles overwrite the oldest slots, updates are vectorized over the whole
+pool and drawing is one batched blit of cached, pre-faded sprites.
+"""
+
+import math
+import pygame
+import numpy as np
+from src.config import *
+
+PARTICLE_DUST = 0
+PARTICLE_SKID = 1
+PARTICLE_SPLASH = 2
+
+# Per-kind look and motion: color, radius, lifetime (s), launch speed (px/s)
+# and drag (fraction of velocity lost per second)
+PARTICLE_KINDS = {
+    PARTICLE_DUST: {'color': (170, 150, 110), 'radius': 4, 'life': 0.6,
+                    'speed': 60, 'drag': 3.0},
+    PARTICLE_SKID: {'color': (30, 30, 30), 'radius': 2, 'life': 1.5,
+                    'speed': 0, 'drag': 0.0},
+    PARTICLE_SPLASH: {'color': (220, 240, 255), 'radius': 3, 'life': 0.8,
+                      'speed': 150, 'drag': 2.5}
+}
+
+
+class ParticleSystem:
+    """Fixed-capacity particle pool updated and drawn in bulk."""
+
+    def __init__(self, capacity=PARTICLE_CAPACITY, seed=None):
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.life = np.ones(capacity, dtype=np.float32)
+        self.drag = np.zeros(capacity, dtype=np.float32)
+        self.kind = np.zeros(capacity, dtype=np.intp)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+        # Scratch space so emitting and updating never allocate
+        self.scratch = np.zeros((2, capacity), dtype=np.float32)
+        self.still_alive = np.zeros(capacity, dtype=bool)
+        self.rng = np.random.default_rng(seed)
+        self.next_slot = 0
+
+        self.sprites = self.create_sprites()
+        self.radii = np.array([PARTICLE_KINDS[kind]['radius']
+                               for kind in sorted(PARTICLE_KINDS)])
+
+    def create_sprites(self):
+        """Pre-render every particle kind at each fade level."""
+        sprites = []
+        for kind in sorted(PARTICLE_KINDS):
+            settings = PARTICLE_KINDS[kind]
+            radius = settings['radius']
+            base = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(base, settings['color'], (radius, radius), radius)
+
+            levels = []
+            for step in range(PARTICLE_FADE_STEPS):
+                faded = base.copy()
+                alpha = int(255 * (1 - step / PARTICLE_FADE_STEPS))
+                faded.fill((255, 255, 255, alpha),
+                           special_flags=pygame.BLEND_RGBA_MULT)
+                levels.append(faded)
+            sprites.append(levels)
+        return sprites
+
+    def emit(self, kind, x, y, count, base_vx=0.0, base_vy=0.0):
+        """Spawn count particles of a kind at (x, y), recycling old slots."""
+        count = min(count, self.capacity)
+        settings = PARTICLE_KINDS[kind]
+        start = self.next_slot
+        end = start + count
+        self.next_slot = end % self.capacity
+
+        # Split into at most two contiguous slices around the ring's end
+        if end <= self.capacity:
+            self._fill(slice(start, end), 0, kind, settings, x, y,
+                       base_vx, base_vy)
+        else:
+            first = self.capacity - start
+            self._fill(slice(start, self.capacity), 0, kind, settings, x, y,
+                       base_vx, base_vy)
+            self._fill(slice(0, end - self.capacity), first, kind, settings,
+                       x, y, base_vx, base_vy)
+
+    def _fill(self, slots, offset, kind, settings, x, y, base_vx, base_vy):
+        """Initialize a contiguous slice of the pool."""
+        n = slots.stop - slots.start
+        angles = self.scratch[0, offset:offset + n]
+        speeds = self.scratch[1, offset:offset + n]
+        self.rng.random(out=angles, dtype=np.float32)
+        self.rng.random(out=speeds, dtype=np.float32)
+        angles *= 2 * math.pi
+        speeds *= settings['speed']
+
+        self.x[slots] = x
+        self.y[slots] = y
+        np.cos(angles, out=self.vx[slots])
+        np.sin(angles, out=self.vy[slots])
+        self.vx[slots] *= speeds
+        self.vy[slots] *= speeds
+        self.vx[slots] += base_vx
+        self.vy[slots] += base_vy
+        self.age[slots] = 0
+        self.life[slots] = settings['life']
+        self.drag[slots] = settings['drag']
+        self.kind[slots] = kind
+        self.alive[slots] = True
+
+    def update(self, dt):
+        """Advance every live particle."""
+        step = self.scratch[0]
+        np.multiply(self.vx, dt, out=step)
+        self.x += step
+        np.multiply(self.vy, dt, out=step)
+        self.y += step
+
+        # Exponential-ish drag without going negative
+        np.multiply(self.drag, -dt, out=step)
+        step += 1
+        np.maximum(step, 0, out=step)
+        self.vx *= step
+        self.vy *= step
+
+        self.age += dt
+        np.less(self.age, self.life, out=self.still_alive)
+        self.alive &= self.still_alive
+
+    def clear(self):
+        """Remove all particles."""
+        self.alive[:] = False
+        self.next_slot = 0
+
+    def count(self):
+        """Number of live particles."""
+        return int(np.count_nonzero(self.alive))
+
+    def snapshot(self):
+        """Copy of the live particles as (x, y, kind, fade level) arrays.
+
+        Safe to draw from another thread while the pool keeps updating.
+        """
+        indices = np.flatnonzero(self.alive)
+        fade = (self.age[indices] / self.life[indices] *
+                PARTICLE_FADE_STEPS).astype(np.intp)
+        np.minimum(fade, PARTICLE_FADE_STEPS - 1, out=fade)
+        return self.x[indices], self.y[indices], self.kind[indices], fade
+
+    def draw(self, screen, camera_x, camera_y, scale=1.0, snapshot=None):
+        """Draw visible particles with a single batched blit.
+
+        snapshot is an optional snapshot() result to draw instead of the
+        live pool.
+        """
+        x, y, kinds, fade = snapshot if snapshot is not None else self.snapshot()
+        if len(x) == 0:
+            return
+
+        screen_x = (x - camera_x) * scale
+        screen_y = (y - camera_y) * scale
+        width, height = screen.get_size()
+        visible = (screen_x > -8) & (screen_x < width + 8) & \
+            (screen_y > -8) & (screen_y < height + 8)
+        if not visible.any():
+            return
+
+        kinds = kinds[visible]
+        fade = fade[visible]
+        radii = self.radii[kinds]
+        left = (screen_x[visible] - radii).astype(np.intp).tolist()
+        top = (screen_y[visible] - radii).astype(np.intp).tolist()
+
+        sprites = self.sprites
+        screen.blits([(sprites[k][f], (lx, ty)) for k, f, lx, ty in
+                      zip(kinds.tolist(), fade.tolist(), left, top)],
+                     doreturn=False)
+
+
+class KartEffects:
+    """Turns kart state transitions into particle bursts and trails."""
+
+    def __init__(self, particles):
+        self.particles = particles
+        self.last_angles = {}
+
+    def update(self, karts):
+        """Emit particles for what each kart did during its last update."""
+        for kart in karts:
+            for name, x, y in kart.events:
+                if name == 'left_track':
+                    self.particles.emit(PARTICLE_DUST, x, y, 12)
+                elif name == 'splash':
+                    self.particles.emit(PARTICLE_SPLASH, x, y, 30)
+                elif name == 'hit':
+                    self.particles.emit(PARTICLE_DUST, x, y, 20)
+                elif name == 'hit_wall':
+                    self.particles.emit(PARTICLE_DUST, x, y, 8)
+
+            # Dust trail while driving on grass or sand
+            if not kart.on_track and abs(kart.speed) > 0.05:
+                self.particles.emit(PARTICLE_DUST, kart.x, kart.y,
+                                    PARTICLE_DUST_PER_FRAME)
+
+            # Skid marks behind the kart when turning hard at speed
+            last_angle = self.last_angles.get(kart, kart.angle)
+            self.last_angles[kart] = kart.angle
+            turn_rate = abs(kart.angle - last_angle)
+            if kart.on_track and turn_rate > PARTICLE_SKID_TURN_RATE and \
+                    abs(kart.speed) > kart.max_speed * 0.5:
+                angle_rad = math.radians(kart.angle)
+                rear_x = kart.x - math.cos(angle_rad) * kart.size / 2
+                rear_y = kart.y - math.sin(angle_rad) * kart.size / 2
+                self.particles.emit(PARTICLE_SKID, rear_x, rear_y,
+                                    PARTICLE_SKID_PER_FRAME)
+
+    def reset(self):
+        """Forget per-kart state (e.g. after a restart)."""
+        self.last_angles.clear()
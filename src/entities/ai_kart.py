@@ -6,18 +6,22 @@ import pygame
 import math
 import random
 from src.entities.kart import Kart
+from src.entities.items import ITEM_SHELL, ITEM_BANANA
 from src.config import *
+from src.systems.trace import traced
 
 
 class AIKart(Kart):
-    def __init__(self, x, y, color=BLUE, config=None, track=None):
+    def __init__(self, x, y, color=BLUE, config=None, track=None, rng=None):
         """Initialize an AI-controlled kart."""
         super().__init__(x, y, color, is_player=False, config=config)
 
         self.track = track
+        self.rng = rng or random  # Seeded random.Random for reproducible races
         self.target_point = None
         self.reaction_timer = 0
-        self.ai_speed_multiplier = random.uniform(
+        self.reaction_time = AI_REACTION_TIME  # Raised for far karts at low quality
+        self.ai_speed_multiplier = self.rng.uniform(
             0.8, 1.0)  # Add variety to AI performance
 
         # AI behavior parameters
@@ -28,9 +32,15 @@ class AIKart(Kart):
         self.last_position = (x, y)
         self.stuck_check_timer = 0
 
+        # Last decision, exposed for telemetry
+        self.target_speed = 0.0
+        self.turn_decision = 0  # -1 left, 0 straight, 1 right
+
         # Pathfinding
         self.waypoints = []
         self.current_waypoint = 0
+        self.recovering = False  # Following the track's flow field
+        self.recovery_timer = 0  # Seconds spent off the road
 
         if track:
             self.generate_waypoints()
@@ -47,8 +57,8 @@ class AIKart(Kart):
         for i in range(len(checkpoints)):
             checkpoint = checkpoints[i]
             # Add some variation to make AI look more natural
-            offset_x = random.uniform(-20, 20)
-            offset_y = random.uniform(-20, 20)
+            offset_x = self.rng.uniform(-20, 20)
+            offset_y = self.rng.uniform(-20, 20)
             self.waypoints.append(
                 (checkpoint[0] + offset_x, checkpoint[1] + offset_y))
 
@@ -78,14 +88,35 @@ class AIKart(Kart):
             self.respawn()
             self.stuck_timer = 0
 
-        # AI decision making (with reaction delay)
-        if self.reaction_timer >= AI_REACTION_TIME:
+        # Off the road or stuck: steer by the flow field, deciding every
+        # tick until back on the road
+        recovering = self.track is not None and self.track.distance_field is not None \
+            and (not self.on_track or self.stuck_timer > 0)
+        if recovering and not self.on_track:
+            self.recovery_timer += dt
+            # No way back (e.g. cut off by water), or the crawl back over
+            # grass has taken longer than a respawn would
+            if self.recovery_timer > AI_MAX_RECOVERY_TIME or math.isinf(
+                    self.track.get_flow_field().distance_to_road(self.x, self.y)):
+                self.respawn()
+                self.stuck_timer = 0
+                recovering = False
+        if not recovering or self.on_track:
+            self.recovery_timer = 0
+        if self.recovering and not recovering:
+            self.resync_waypoint()
+        self.recovering = recovering
+
+        # AI decision making (with reaction delay, none while spinning)
+        if (self.recovering or self.reaction_timer >= self.reaction_time) and \
+                self.spin_timer <= 0:
             self.make_ai_decisions(dt)
             self.reaction_timer = 0
 
         # Update physics
         super().update(dt, track)
 
+    @traced()
     def make_ai_decisions(self, dt):
         """Make AI decisions for movement and steering."""
         if not self.waypoints:
@@ -94,8 +125,11 @@ class AIKart(Kart):
                              self.max_speed * self.ai_speed_multiplier)
             return
 
-        # Find target waypoint
-        target_waypoint = self.get_target_waypoint()
+        # Find target waypoint (a point along the flow when recovering)
+        if self.recovering:
+            target_waypoint = self.get_recovery_target()
+        else:
+            target_waypoint = self.get_target_waypoint()
 
         if target_waypoint:
             # Calculate angle to target
@@ -113,12 +147,15 @@ class AIKart(Kart):
                 angle_diff += 360
 
             # Determine turning direction and speed
+            self.turn_decision = 0
             if abs(angle_diff) > 5:  # Need to turn
                 turn_amount = min(abs(angle_diff), self.max_turn_angle)
                 if angle_diff > 0:
                     self.angle += turn_amount * 0.1  # Smooth turning
+                    self.turn_decision = 1
                 else:
                     self.angle -= turn_amount * 0.1
+                    self.turn_decision = -1
 
             # Adjust speed based on turn sharpness
             if abs(angle_diff) > 30:
@@ -131,6 +168,10 @@ class AIKart(Kart):
                 # Straight or gentle turn, full speed
                 target_speed = self.max_speed * self.ai_speed_multiplier
 
+            # Steer towards open road when the edge is close ahead
+            self.avoid_edges()
+            self.target_speed = target_speed
+
             # Accelerate or decelerate towards target speed
             if self.speed < target_speed:
                 self.speed = min(self.speed + self.acceleration, target_speed)
@@ -138,6 +179,64 @@ class AIKart(Kart):
                 self.speed = max(
                     self.speed - self.acceleration * 2, target_speed)
 
+    def avoid_edges(self):
+        """Nudge the heading away from a nearby road edge using track rays."""
+        if not self.track or self.track.distance_field is None or not self.on_track:
+            return
+
+        reach = self.look_ahead_distance
+        if self.track.raycast(self.x, self.y, self.angle, reach) >= reach:
+            return
+
+        left = self.track.raycast(self.x, self.y, self.angle - 30, reach)
+        right = self.track.raycast(self.x, self.y, self.angle + 30, reach)
+        if right > left:
+            self.angle += self.max_turn_angle * 0.05
+        elif left > right:
+            self.angle -= self.max_turn_angle * 0.05
+
+    def wants_to_use_item(self, karts):
+        """Fire a shell at a kart just ahead, or drop a banana on one close
+        behind."""
+        if self.item == ITEM_SHELL:
+            reach, cone, facing = AI_SHELL_RANGE, AI_SHELL_CONE, self.angle
+        elif self.item == ITEM_BANANA:
+            reach, cone, facing = AI_BANANA_RANGE, 45, self.angle + 180
+        else:
+            return False
+
+        for kart in karts:
+            if kart is self:
+                continue
+            dx = kart.x - self.x
+            dy = kart.y - self.y
+            if dx * dx + dy * dy > reach * reach:
+                continue
+            angle_diff = (math.degrees(math.atan2(dy, dx)) - facing + 180) % 360 - 180
+            if abs(angle_diff) <= cone:
+                return True
+        return False
+
+    def get_recovery_target(self):
+        """Point a look-ahead distance along the track's flow field."""
+        dx, dy = self.track.get_flow_field().direction_at(self.x, self.y)
+        return (self.x + dx * self.look_ahead_distance,
+                self.y + dy * self.look_ahead_distance)
+
+    def resync_waypoint(self):
+        """Aim for the nearest waypoint ahead after rejoining the road."""
+        if not self.waypoints:
+            return
+        nearest = min(range(len(self.waypoints)),
+                      key=lambda i: (self.waypoints[i][0] - self.x) ** 2 +
+                      (self.waypoints[i][1] - self.y) ** 2)
+        # Skip it if it is already behind (against the flow)
+        dx, dy = self.track.get_flow_field().direction_at(self.x, self.y)
+        waypoint_x, waypoint_y = self.waypoints[nearest]
+        if (waypoint_x - self.x) * dx + (waypoint_y - self.y) * dy < 0:
+            nearest = (nearest + 1) % len(self.waypoints)
+        self.current_waypoint = nearest
+
     def get_target_waypoint(self):
         """Get the current target waypoint."""
         if not self.waypoints:
@@ -162,9 +261,9 @@ class AIKart(Kart):
         """Override parent method - AI doesn't use input."""
         pass
 
-    def draw(self, screen, camera_x=0, camera_y=0):
+    def draw(self, screen, camera_x=0, camera_y=0, scale=1.0, state=None):
         """Draw the AI kart."""
-        super().draw(screen, camera_x, camera_y)
+        super().draw(screen, camera_x, camera_y, scale, state)
 
         # Draw waypoint for debugging (optional)
         if self.waypoints and hasattr(self, 'debug_mode') and self.debug_mode:
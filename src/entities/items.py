@@ -0,0 +1,245 @@
+"""
+Item boxes, held items and pooled projectiles (shells and banana peels).
+
+Projectiles live in preallocated NumPy arrays like the particle pool: firing
+writes into the oldest free slot and never allocates. Hits against karts go
+through a uniform grid broadphase: live projectiles are sorted by grid cell
+once per tick, and each kart only tests the projectiles in the 3x3 cells
+around it.
+"""
+
+import math
+import pygame
+import numpy as np
+from src.config import *
+from src.systems.trace import traced
+
+ITEM_NONE = 0
+ITEM_SHELL = 1
+ITEM_BANANA = 2
+
+ITEM_NAMES = {ITEM_NONE: "-", ITEM_SHELL: "Shell", ITEM_BANANA: "Banana"}
+
+# Projectile kinds reuse the item ids
+PROJECTILE_COLORS = {ITEM_SHELL: (0, 200, 0), ITEM_BANANA: (255, 225, 50)}
+PROJECTILE_LIFE = {ITEM_SHELL: ITEM_SHELL_LIFE, ITEM_BANANA: ITEM_BANANA_LIFE}
+
+
+class ItemSystem:
+    """Item boxes on a track plus a fixed-capacity projectile pool."""
+
+    def __init__(self, track, rng, capacity=ITEM_PROJECTILE_CAPACITY):
+        self.track = track
+        self.rng = rng  # Race RNG (rolls item box contents)
+
+        boxes = track.get_item_box_positions()
+        self.box_x = np.array([x for x, _ in boxes], dtype=np.float32)
+        self.box_y = np.array([y for _, y in boxes], dtype=np.float32)
+        self.box_timer = np.zeros(len(boxes), dtype=np.float32)  # 0 = active
+
+        self.capacity = capacity
+        self.x = np.zeros(capacity, dtype=np.float32)
+        self.y = np.zeros(capacity, dtype=np.float32)
+        self.vx = np.zeros(capacity, dtype=np.float32)
+        self.vy = np.zeros(capacity, dtype=np.float32)
+        self.age = np.zeros(capacity, dtype=np.float32)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.owner = np.zeros(capacity, dtype=np.int16)  # Kart index
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.life = np.array([PROJECTILE_LIFE.get(kind, 0.0)
+                              for kind in range(max(PROJECTILE_LIFE) + 1)],
+                             dtype=np.float32)
+        self.next_slot = np.zeros(1, dtype=np.int32)  # Array so snapshots copy it
+
+        # Broadphase grid dimensions
+        self.grid_width = track.width // ITEM_GRID_CELL + 2
+
+        self.sprites = self.create_sprites()
+
+    def create_sprites(self):
+        """Pre-render item boxes and projectiles."""
+        size = ITEM_BOX_RADIUS * 2
+        box = pygame.Surface((size, size), pygame.SRCALPHA)
+        box.fill((255, 200, 0, 200))
+        pygame.draw.rect(box, WHITE, box.get_rect(), 2)
+
+        sprites = {'box': box}
+        radius = ITEM_PROJECTILE_RADIUS
+        for kind, color in PROJECTILE_COLORS.items():
+            sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, color, (radius, radius), radius)
+            pygame.draw.circle(sprite, BLACK, (radius, radius), radius, 1)
+            sprites[kind] = sprite
+        return sprites
+
+    def state_arrays(self):
+        """Every array holding race state, for snapshots (fixed sizes)."""
+        return [self.box_timer, self.x, self.y, self.vx, self.vy, self.age,
+                self.kind, self.owner, self.alive, self.next_slot]
+
+    def spawn(self, kind, x, y, vx, vy, owner):
+        """Put a projectile in play, recycling the oldest slot when full."""
+        slot = int(self.next_slot[0])
+        self.next_slot[0] = (slot + 1) % self.capacity
+        self.x[slot] = x
+        self.y[slot] = y
+        self.vx[slot] = vx
+        self.vy[slot] = vy
+        self.age[slot] = 0
+        self.kind[slot] = kind
+        self.owner[slot] = owner
+        self.alive[slot] = True
+
+    def use_item(self, karts, index):
+        """Fire or drop the item held by karts[index]."""
+        kart = karts[index]
+        kind = kart.item
+        if kind == ITEM_NONE or kart.spin_timer > 0:
+            return
+        kart.item = ITEM_NONE
+
+        angle_rad = math.radians(kart.angle)
+        dx = math.cos(angle_rad)
+        dy = math.sin(angle_rad)
+        offset = kart.size / 2 + ITEM_PROJECTILE_RADIUS + 2
+        if kind == ITEM_SHELL:
+            speed = ITEM_SHELL_SPEED + max(kart.speed, 0) * FPS
+            self.spawn(kind, kart.x + dx * offset, kart.y + dy * offset,
+                       dx * speed, dy * speed, index)
+        else:
+            self.spawn(kind, kart.x - dx * offset, kart.y - dy * offset,
+                       0.0, 0.0, index)
+
+    @traced()
+    def update(self, dt, karts):
+        """Respawn boxes, hand out items, move projectiles and resolve hits."""
+        kart_x = np.array([kart.x for kart in karts], dtype=np.float32)
+        kart_y = np.array([kart.y for kart in karts], dtype=np.float32)
+
+        self.update_boxes(dt, karts, kart_x, kart_y)
+        self.update_projectiles(dt)
+        self.resolve_hits(karts, kart_x, kart_y)
+
+        # AI karts decide whether to use what they hold
+        for index, kart in enumerate(karts):
+            if kart.item != ITEM_NONE and not kart.is_player and \
+                    kart.wants_to_use_item(karts):
+                self.use_item(karts, index)
+
+    def update_boxes(self, dt, karts, kart_x, kart_y):
+        """Tick box respawn timers and let karts drive through active boxes."""
+        if len(self.box_timer) == 0:
+            return
+        np.subtract(self.box_timer, dt, out=self.box_timer)
+        np.maximum(self.box_timer, 0, out=self.box_timer)
+
+        # Karts x boxes is small (16 x ~30), a dense test is cheapest
+        reach = (ITEM_BOX_RADIUS + KART_SIZE / 2) ** 2
+        dx = kart_x[:, None] - self.box_x
+        dy = kart_y[:, None] - self.box_y
+        touching = (dx * dx + dy * dy < reach) & (self.box_timer == 0)
+        for kart_index, box_index in zip(*np.nonzero(touching)):
+            if self.box_timer[box_index] > 0:
+                continue  # Taken by an earlier kart this tick
+            self.box_timer[box_index] = ITEM_BOX_RESPAWN_TIME
+            kart = karts[kart_index]
+            if kart.item == ITEM_NONE:
+                kart.item = self.rng.choice((ITEM_SHELL, ITEM_BANANA))
+
+    def update_projectiles(self, dt):
+        """Move shells, age everything and retire expired projectiles."""
+        live = np.flatnonzero(self.alive)
+        if len(live) == 0:
+            return
+
+        self.x[live] += self.vx[live] * dt
+        self.y[live] += self.vy[live] * dt
+        self.age[live] += dt
+
+        expired = self.age[live] >= self.life[self.kind[live]]
+        # Shells break when they leave the road
+        shells = self.kind[live] == ITEM_SHELL
+        if shells.any() and self.track.distance_field is not None:
+            off_road = self.track.distances_at(
+                self.x[live[shells]], self.y[live[shells]]) < -ITEM_PROJECTILE_RADIUS
+            expired[np.flatnonzero(shells)[off_road]] = True
+        self.alive[live[expired]] = False
+
+    def resolve_hits(self, karts, kart_x, kart_y):
+        """Spin out karts touching a projectile (grid broadphase)."""
+        live = np.flatnonzero(self.alive)
+        if len(live) == 0:
+            return
+
+        # Sort live projectiles by grid cell; cells of a grid row are then
+        # contiguous, so a 3x3 neighbourhood is three searchsorted ranges
+        cell_x = (self.x[live] // ITEM_GRID_CELL).astype(np.intp) + 1
+        cell_y = (self.y[live] // ITEM_GRID_CELL).astype(np.intp) + 1
+        cells = cell_y * self.grid_width + cell_x
+        order = np.argsort(cells, kind='stable')
+        sorted_cells = cells[order]
+        sorted_live = live[order]
+
+        reach = (ITEM_PROJECTILE_RADIUS + KART_SIZE / 2) ** 2
+        for index, kart in enumerate(karts):
+            column = int(kart.x // ITEM_GRID_CELL) + 1
+            row = int(kart.y // ITEM_GRID_CELL) + 1
+            for neighbour_row in (row - 1, row, row + 1):
+                first = neighbour_row * self.grid_width + column - 1
+                start, stop = sorted_cells.searchsorted(first, 'left'), \
+                    sorted_cells.searchsorted(first + 2, 'right')
+                for slot in sorted_live[start:stop].tolist():
+                    if not self.alive[slot]:
+                        continue
+                    dx = self.x[slot] - kart_x[index]
+                    dy = self.y[slot] - kart_y[index]
+                    if dx * dx + dy * dy >= reach:
+                        continue
+                    if self.owner[slot] == index and self.age[slot] < ITEM_OWNER_GRACE:
+                        continue
+                    self.alive[slot] = False
+                    kart.spin_out()
+
+    def snapshot(self):
+        """Copy of what draw() needs: active boxes and live projectiles."""
+        live = np.flatnonzero(self.alive)
+        active = self.box_timer == 0
+        return (self.box_x[active], self.box_y[active],
+                self.x[live], self.y[live], self.kind[live])
+
+    def draw(self, screen, camera_x, camera_y, scale=1.0, snapshot=None):
+        """Draw item boxes and projectiles in one batched blit."""
+        box_x, box_y, x, y, kinds = snapshot if snapshot is not None \
+            else self.snapshot()
+        if scale != 1.0:
+            return self.draw_scaled(screen, camera_x, camera_y, scale,
+                                    box_x, box_y, x, y, kinds)
+
+        width, height = screen.get_size()
+        blits = []
+        box = self.sprites['box']
+        for bx, by in zip((box_x - camera_x - ITEM_BOX_RADIUS).tolist(),
+                          (box_y - camera_y - ITEM_BOX_RADIUS).tolist()):
+            if -32 < bx < width and -32 < by < height:
+                blits.append((box, (bx, by)))
+        sprites = self.sprites
+        for px, py, kind in zip((x - camera_x - ITEM_PROJECTILE_RADIUS).tolist(),
+                                (y - camera_y - ITEM_PROJECTILE_RADIUS).tolist(),
+                                kinds.tolist()):
+            if -32 < px < width and -32 < py < height:
+                blits.append((sprites[kind], (px, py)))
+        screen.blits(blits, doreturn=False)
+
+    def draw_scaled(self, screen, camera_x, camera_y, scale, box_x, box_y,
+                    x, y, kinds):
+        """Reduced render scale: plain shapes instead of sprites."""
+        box_size = max(2, int(ITEM_BOX_RADIUS * 2 * scale))
+        for bx, by in zip(box_x.tolist(), box_y.tolist()):
+            rect = pygame.Rect(0, 0, box_size, box_size)
+            rect.center = ((bx - camera_x) * scale, (by - camera_y) * scale)
+            pygame.draw.rect(screen, (255, 200, 0), rect)
+        radius = max(1, int(ITEM_PROJECTILE_RADIUS * scale))
+        for px, py, kind in zip(x.tolist(), y.tolist(), kinds.tolist()):
+            pygame.draw.circle(screen, PROJECTILE_COLORS[kind],
+                               ((px - camera_x) * scale, (py - camera_y) * scale),
+                               radius)
@@ -5,6 +5,26 @@ Kart class representing a racing kart with physics and controls.
 import pygame
 import math
 from src.config import *
+from src.entities.items import ITEM_NONE
+
+
+def read_keyboard_controls():
+    """Sample the keyboard as (throttle, steer), each in [-1, 1]."""
+    keys = pygame.key.get_pressed()
+
+    throttle = 0
+    if keys[pygame.K_UP] or keys[pygame.K_w]:
+        throttle = 1
+    elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
+        throttle = -1
+
+    steer = 0
+    if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+        steer -= 1
+    if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+        steer += 1
+
+    return throttle, steer
 
 
 class Kart:
@@ -47,6 +67,18 @@ class Kart:
         # Off-track status
         self.on_track = True
 
+        # Items: what the kart holds and how long it still spins after a hit
+        self.item = ITEM_NONE
+        self.spin_timer = 0.0
+
+        # State transitions from the last update, as (name, x, y) tuples,
+        # e.g. ('left_track', x, y) or ('splash', x, y). Read by effects.
+        self.events = []
+
+        # Player input sampled elsewhere (e.g. handed to the simulation
+        # thread); None reads the keyboard during update
+        self.controls = None
+
         # Create kart surface
         self.size = KART_SIZE
         self.create_kart_surface()
@@ -73,9 +105,19 @@ class Kart:
 
     def update(self, dt, track=None):
         """Update kart physics and movement."""
+        self.events.clear()
+
+        # Spinning out after a hit: no control, shed speed
+        if self.spin_timer > 0:
+            self.spin_timer -= dt
+            self.angle += ITEM_SPIN_RATE * dt
+            self.speed *= 0.9
         # Handle input for player kart
-        if self.is_player:
-            self.handle_input(dt)
+        elif self.is_player:
+            if self.controls is not None:
+                self.apply_controls(*self.controls, dt)
+            else:
+                self.handle_input(dt)
 
         # Apply friction
         self.speed *= self.friction
@@ -85,36 +127,52 @@ class Kart:
         self.velocity_x = math.cos(angle_rad) * self.speed
         self.velocity_y = math.sin(angle_rad) * self.speed
 
-        # Update position
-        self.x += self.velocity_x
-        self.y += self.velocity_y
+        # Update position, sliding along solid walls
+        if track:
+            x, y, impact = track.move_circle(self.x, self.y, self.velocity_x,
+                                             self.velocity_y, self.size / 2)
+            if impact:
+                # Only the part of the move along the wall is kept
+                moved = math.hypot(x - self.x, y - self.y)
+                self.speed *= moved / max(abs(self.speed), moved, 1e-9)
+                self.velocity_x = x - self.x
+                self.velocity_y = y - self.y
+                if impact > WALL_SPARK_SPEED:
+                    self.events.append(('hit_wall', x, y))
+            self.x, self.y = x, y
+        else:
+            self.x += self.velocity_x
+            self.y += self.velocity_y
 
         # Check track boundaries if track is provided
         if track:
+            was_on_track = self.on_track
             self.on_track = track.is_on_track(self.x, self.y)
 
             # Apply speed penalty if off track
             if not self.on_track:
                 self.speed *= OFF_TRACK_SPEED_PENALTY
+                if was_on_track:
+                    self.events.append(('left_track', self.x, self.y))
 
             # Check for water hazards (respawn)
             if track.is_in_water(self.x, self.y):
+                self.events.append(('splash', self.x, self.y))
                 self.respawn()
 
-        # Rotate the kart surface
-        self.surface = pygame.transform.rotate(
-            self.original_surface, -self.angle)
-
     def handle_input(self, dt):
         """Handle player input."""
-        keys = pygame.key.get_pressed()
+        self.apply_controls(*read_keyboard_controls(), dt)
 
+    def apply_controls(self, throttle, steer, dt):
+        """Apply throttle and steering in [-1, 1] (keyboard or external driver)."""
         # Acceleration and deceleration
-        if keys[pygame.K_UP] or keys[pygame.K_w]:
-            self.speed = min(self.speed + self.acceleration, self.max_speed)
-        elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
-            self.speed = max(self.speed - self.acceleration *
-                             2, -self.max_speed * 0.5)
+        if throttle > 0:
+            self.speed = min(self.speed + self.acceleration *
+                             throttle, self.max_speed)
+        elif throttle < 0:
+            self.speed = max(self.speed + self.acceleration *
+                             2 * throttle, -self.max_speed * 0.5)
         else:
             # Natural deceleration when no input
             if self.speed > 0:
@@ -125,11 +183,7 @@ class Kart:
         # Turning (only when moving)
         if abs(self.speed) > 0.1:
             turning_factor = min(abs(self.speed) / self.max_speed, 1.0)
-
-            if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-                self.angle -= self.turn_speed * turning_factor
-            if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-                self.angle += self.turn_speed * turning_factor
+            self.angle += self.turn_speed * turning_factor * steer
 
     def respawn(self):
         """Respawn the kart at the last checkpoint."""
@@ -140,6 +194,11 @@ class Kart:
         self.velocity_x = 0
         self.velocity_y = 0
 
+    def spin_out(self):
+        """React to being hit by a shell or banana."""
+        self.spin_timer = ITEM_SPIN_TIME
+        self.events.append(('hit', self.x, self.y))
+
     def set_respawn_point(self, x, y, angle):
         """Set a new respawn point (usually at a checkpoint)."""
         self.respawn_x = x
@@ -154,24 +213,24 @@ class Kart:
         """Get the center position of the kart."""
         return (self.x, self.y)
 
-    def draw(self, screen, camera_x=0, camera_y=0):
-        """Draw the kart on the screen."""
+    def draw(self, screen, camera_x=0, camera_y=0, scale=1.0, state=None):
+        """Draw the kart on the screen (scale < 1 for reduced render size).
+
+        state is an optional KartState snapshot to draw instead of the live
+        fields (pipelined simulation).
+        """
+        if state is None:
+            state = self
+        # Rotate lazily so headless simulation never pays for it
+        if scale == 1.0:
+            self.surface = pygame.transform.rotate(
+                self.original_surface, -state.angle)
+        else:
+            self.surface = pygame.transform.rotozoom(
+                self.original_surface, -state.angle, scale)
+
         # Calculate screen position accounting for camera
-        screen_x = self.x - camera_x - self.surface.get_width() // 2
-        screen_y = self.y - camera_y - self.surface.get_height() // 2
+        screen_x = (state.x - camera_x) * scale - self.surface.get_width() // 2
+        screen_y = (state.y - camera_y) * scale - self.surface.get_height() // 2
 
         screen.blit(self.surface, (screen_x, screen_y))
-
-        # Draw debug info for player
-        if self.is_player:
-            font = pygame.font.Font(None, 24)
-            speed_text = font.render(f"Speed: {self.speed:.1f}", True, WHITE)
-            screen.blit(speed_text, (10, 10))
-
-            position_text = font.render(
-                f"Position: {self.race_position}", True, WHITE)
-            screen.blit(position_text, (10, 35))
-
-            lap_text = font.render(
-                f"Lap: {self.current_lap + 1}/{TOTAL_LAPS}", True, WHITE)
-            screen.blit(lap_text, (10, 60))
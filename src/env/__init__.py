@@ -0,0 +1 @@
+# env package
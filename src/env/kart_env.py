@@ -0,0 +1,414 @@
+"""
+Headless Gym-style environments for training driving policies.
+
+KartEnv runs the GameScene race logic (karts, track, RaceManager) without a
+display. VectorKartEnv steps several races in lockstep in this process and
+SubprocVectorKartEnv spreads them over worker processes that write into
+shared-memory buffers. With procedural=True every episode is raced on a
+freshly generated track (drawn from a track cache if one is given).
+"""
+
+import math
+import random
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from src.config import *
+from src.entities.kart import Kart
+from src.entities.ai_kart import AIKart
+from src.scenes.game_scene import RaceManager
+from src.track.track import Track
+from src.track.generator import generate_layout, load_layouts
+
+# Observation layout (followed by one normalized distance per ray)
+OBS_SPEED = 0
+OBS_HEADING_COS = 1
+OBS_HEADING_SIN = 2
+OBS_TARGET_COS = 3
+OBS_TARGET_SIN = 4
+OBS_TARGET_DISTANCE = 5
+OBS_SEGMENT_PROGRESS = 6
+OBS_ON_TRACK = 7
+OBS_RACE_PROGRESS = 8
+OBS_EDGE_DISTANCE = 9
+OBS_RAYS = 10
+
+OBSERVATION_SIZE = OBS_RAYS + len(ENV_RAY_ANGLES)
+ACTION_SIZE = 2  # (throttle, steer), both in [-1, 1]
+
+AI_COLORS = [BLUE, GREEN, PURPLE, ORANGE, YELLOW, BROWN]
+
+
+class KartEnv:
+    """A single headless race controlled through reset()/step()."""
+
+    def __init__(self, track_id=0, num_opponents=0, kart_config=None,
+                 max_episode_steps=ENV_MAX_EPISODE_STEPS, track=None,
+                 procedural=False, track_layouts=None):
+        self.procedural = procedural
+        self.track_layouts = track_layouts  # Cached layouts to draw from
+        self.num_opponents = num_opponents
+        self.kart_config = kart_config
+        self.max_episode_steps = max_episode_steps
+        self.rng = random.Random()
+
+        # Tracks are read-only during a race, so vector envs share one
+        if procedural:
+            self.track = None  # Generated on every reset
+        else:
+            self.track = track if track is not None else Track(track_id, render=False)
+
+        self.observation_size = OBSERVATION_SIZE
+        self.action_size = ACTION_SIZE
+        self.total_checkpoints = 0
+
+        self.kart = None
+        self.karts = []
+        self.race_manager = None
+        self.steps = 0
+        self.checkpoints_passed = 0
+        self.last_checkpoint = -1
+        self.progress = 0.0
+
+    def reset(self, seed=None, out=None):
+        """Start a new race. Returns (observation, info)."""
+        if seed is not None:
+            self.rng.seed(seed)
+        if self.procedural:
+            if self.track_layouts:
+                layout = self.rng.choice(self.track_layouts)
+            else:
+                layout = generate_layout(self.rng.randrange(2 ** 31))
+            self.track = Track(layout=layout, render=False)
+        # RaceManager counts the first start-line crossing as lap 1
+        self.total_checkpoints = len(
+            self.track.checkpoints) * (TOTAL_LAPS - 1) + 1
+
+        start_positions = self.track.get_start_positions(
+            self.num_opponents + 1)
+
+        self.kart = Kart(start_positions[0][0], start_positions[0][1],
+                         config=self.kart_config)
+        self.karts = [self.kart]
+        for i in range(self.num_opponents):
+            pos = start_positions[i + 1]
+            self.karts.append(AIKart(
+                pos[0], pos[1],
+                color=AI_COLORS[i % len(AI_COLORS)],
+                track=self.track,
+                rng=self.rng
+            ))
+
+        if self.track.start_line:
+            for kart in self.karts:
+                kart.set_respawn_point(
+                    self.track.start_line[0], self.track.start_line[1], 0)
+
+        self.race_manager = RaceManager(self.karts, self.track)
+        self.steps = 0
+        self.checkpoints_passed = 0
+        self.last_checkpoint = self.kart.last_checkpoint
+        self.progress = self.get_progress()
+
+        if out is None:
+            out = np.zeros(self.observation_size, dtype=np.float32)
+        self.observe(out)
+        return out, {}
+
+    def step(self, action, out=None):
+        """Advance one tick. Returns (obs, reward, terminated, truncated, info)."""
+        if out is None:
+            out = np.zeros(self.observation_size, dtype=np.float32)
+        reward, terminated, truncated = self.step_into(action, out)
+        info = {
+            'lap': self.kart.current_lap,
+            'checkpoints_passed': self.checkpoints_passed,
+            'race_position': self.kart.race_position
+        }
+        return out, reward, terminated, truncated, info
+
+    def step_into(self, action, out, rays=True):
+        """Advance one tick writing the observation into out.
+
+        Vector envs pass rays=False and cast every env's rays in one batch.
+        """
+        throttle = max(-1.0, min(1.0, float(action[0])))
+        steer = max(-1.0, min(1.0, float(action[1])))
+        self.kart.apply_controls(throttle, steer, ENV_DT)
+
+        for kart in self.karts:
+            kart.update(ENV_DT, self.track)
+        self.race_manager.update(ENV_DT)
+        self.steps += 1
+
+        # Count every newly reached checkpoint so progress never jumps on laps
+        if self.kart.last_checkpoint != self.last_checkpoint:
+            self.last_checkpoint = self.kart.last_checkpoint
+            self.checkpoints_passed += 1
+
+        progress = self.get_progress()
+        reward = progress - self.progress
+        self.progress = progress
+
+        # Smooth penalty: ramps in near the edge and saturates off the road
+        edge_distance = self.track.distance_at(self.kart.x, self.kart.y)
+        reward -= ENV_OFF_TRACK_PENALTY * max(
+            0.0, min(1.0, (ENV_EDGE_MARGIN - edge_distance) / (2 * ENV_EDGE_MARGIN)))
+
+        terminated = self.kart.finished
+        truncated = not terminated and self.steps >= self.max_episode_steps
+
+        self.observe(out, rays)
+        return reward, terminated, truncated
+
+    def get_next_checkpoint(self):
+        """Get the checkpoint the kart is currently driving towards."""
+        checkpoints = self.track.checkpoints
+        return checkpoints[(self.kart.last_checkpoint + 1) % len(checkpoints)]
+
+    def get_segment_progress(self):
+        """Get the fraction of the way from the last checkpoint to the next."""
+        checkpoints = self.track.checkpoints
+        next_x, next_y = self.get_next_checkpoint()
+        if self.kart.last_checkpoint < 0:
+            prev_x, prev_y = self.track.get_start_positions(1)[0]
+        else:
+            prev_x, prev_y = checkpoints[self.kart.last_checkpoint]
+
+        segment_length = math.hypot(next_x - prev_x, next_y - prev_y)
+        if segment_length == 0:
+            return 0.0
+        remaining = math.hypot(next_x - self.kart.x, next_y - self.kart.y)
+        return max(0.0, min(1.0, 1.0 - remaining / segment_length))
+
+    def get_progress(self):
+        """Get race progress measured in checkpoints."""
+        return self.checkpoints_passed + self.get_segment_progress()
+
+    def observe(self, out, rays=True):
+        """Write the observation vector for the controlled kart into out."""
+        kart = self.kart
+        heading = math.radians(kart.angle)
+        next_x, next_y = self.get_next_checkpoint()
+        dx = next_x - kart.x
+        dy = next_y - kart.y
+        relative = math.atan2(dy, dx) - heading
+
+        out[OBS_SPEED] = kart.speed / kart.max_speed
+        out[OBS_HEADING_COS] = math.cos(heading)
+        out[OBS_HEADING_SIN] = math.sin(heading)
+        out[OBS_TARGET_COS] = math.cos(relative)
+        out[OBS_TARGET_SIN] = math.sin(relative)
+        out[OBS_TARGET_DISTANCE] = math.hypot(dx, dy) / ENV_RAY_LENGTH
+        out[OBS_SEGMENT_PROGRESS] = self.get_segment_progress()
+        out[OBS_ON_TRACK] = 1.0 if kart.on_track else 0.0
+        out[OBS_RACE_PROGRESS] = self.checkpoints_passed / self.total_checkpoints
+        out[OBS_EDGE_DISTANCE] = self.track.distance_at(
+            kart.x, kart.y) / TRACK_FIELD_MAX_DISTANCE
+
+        if rays:
+            for i, ray_angle in enumerate(ENV_RAY_ANGLES):
+                distance = self.track.raycast(kart.x, kart.y,
+                                              kart.angle + ray_angle,
+                                              ENV_RAY_LENGTH)
+                out[OBS_RAYS + i] = distance / ENV_RAY_LENGTH
+
+
+class VectorKartEnv:
+    """N independent races stepped in lockstep inside this process."""
+
+    def __init__(self, num_envs, track_id=0, num_opponents=0, kart_config=None,
+                 max_episode_steps=ENV_MAX_EPISODE_STEPS, buffers=None,
+                 procedural=False, track_cache=None):
+        # Procedural envs each race their own track; others share one
+        self.procedural = procedural
+        self.track = None if procedural else Track(track_id, render=False)
+        track_layouts = None
+        if track_cache:
+            track_layouts = list(load_layouts(track_cache).values())
+        self.envs = [
+            KartEnv(num_opponents=num_opponents, kart_config=kart_config,
+                    max_episode_steps=max_episode_steps, track=self.track,
+                    procedural=procedural, track_layouts=track_layouts)
+            for _ in range(num_envs)
+        ]
+        self.num_envs = num_envs
+        self.observation_size = OBSERVATION_SIZE
+        self.action_size = ACTION_SIZE
+
+        # Callers (e.g. subprocess workers) may pass shared-memory views
+        if buffers is None:
+            buffers = allocate_buffers(num_envs)
+        self.observations = buffers['observations']
+        self.rewards = buffers['rewards']
+        self.terminated = buffers['terminated']
+        self.truncated = buffers['truncated']
+
+        self.ray_angles = np.array(ENV_RAY_ANGLES, dtype=np.float32)
+        self.positions = np.zeros((num_envs, 3), dtype=np.float32)
+
+    def cast_rays(self):
+        """Cast the sensor rays of every env in one vectorized call."""
+        for i, env in enumerate(self.envs):
+            self.positions[i] = (env.kart.x, env.kart.y, env.kart.angle)
+        if self.procedural:
+            # One batch per env, since every env has its own track
+            for i, env in enumerate(self.envs):
+                distances = env.track.raycast_many(
+                    self.positions[i, 0:1], self.positions[i, 1:2],
+                    self.positions[i, 2:3] + self.ray_angles, ENV_RAY_LENGTH)
+                self.observations[i, OBS_RAYS:] = distances / ENV_RAY_LENGTH
+            return
+        distances = self.track.raycast_many(
+            self.positions[:, 0:1], self.positions[:, 1:2],
+            self.positions[:, 2:3] + self.ray_angles, ENV_RAY_LENGTH)
+        self.observations[:, OBS_RAYS:] = distances / ENV_RAY_LENGTH
+
+    def reset(self, seed=None):
+        """Reset every race. Env i is seeded with seed + i."""
+        for i, env in enumerate(self.envs):
+            env.reset(None if seed is None else seed + i,
+                      out=self.observations[i])
+        self.cast_rays()
+        self.rewards[:] = 0
+        self.terminated[:] = False
+        self.truncated[:] = False
+        return self.observations, {}
+
+    def step(self, actions):
+        """Step every race; finished races reset automatically."""
+        for i, env in enumerate(self.envs):
+            obs = self.observations[i]
+            reward, terminated, truncated = env.step_into(
+                actions[i], obs, rays=False)
+            self.rewards[i] = reward
+            self.terminated[i] = terminated
+            self.truncated[i] = truncated
+            if terminated or truncated:
+                env.reset(out=obs)
+        self.cast_rays()
+        return self.observations, self.rewards, self.terminated, self.truncated, {}
+
+    def close(self):
+        """Release resources (nothing to do in-process)."""
+        pass
+
+
+def allocate_buffers(num_envs, buffer=None):
+    """Lay out observation/action/result arrays, optionally inside a buffer."""
+    layout = [
+        ('observations', np.float32, (num_envs, OBSERVATION_SIZE)),
+        ('actions', np.float32, (num_envs, ACTION_SIZE)),
+        ('rewards', np.float32, (num_envs,)),
+        ('terminated', np.bool_, (num_envs,)),
+        ('truncated', np.bool_, (num_envs,))
+    ]
+
+    buffers = {}
+    offset = 0
+    for name, dtype, shape in layout:
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        if buffer is None:
+            buffers[name] = np.zeros(shape, dtype=dtype)
+        else:
+            buffers[name] = np.ndarray(
+                shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += size
+    buffers['nbytes'] = offset
+    return buffers
+
+
+def _subproc_worker(conn, shm_name, num_envs, start, stop, env_kwargs):
+    """Worker loop: steps envs [start, stop) inside the shared buffers."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    shared = allocate_buffers(num_envs, shm.buf)
+    local = {name: shared[name][start:stop]
+             for name in ('observations', 'rewards', 'terminated', 'truncated')}
+    actions = shared['actions'][start:stop]
+
+    vec_env = VectorKartEnv(stop - start, buffers=local, **env_kwargs)
+    try:
+        while True:
+            command, arg = conn.recv()
+            if command == 'step':
+                vec_env.step(actions)
+            elif command == 'reset':
+                vec_env.reset(None if arg is None else arg + start)
+            elif command == 'close':
+                break
+            conn.send(True)
+    finally:
+        del shared, local, actions, vec_env
+        shm.close()
+        conn.close()
+
+
+class SubprocVectorKartEnv:
+    """N races split across worker processes sharing one memory block."""
+
+    def __init__(self, num_envs, num_workers=None, **env_kwargs):
+        num_workers = min(num_envs, num_workers or multiprocessing.cpu_count())
+        self.num_envs = num_envs
+        self.observation_size = OBSERVATION_SIZE
+        self.action_size = ACTION_SIZE
+
+        nbytes = allocate_buffers(num_envs)['nbytes']
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        buffers = allocate_buffers(num_envs, self.shm.buf)
+        self.observations = buffers['observations']
+        self.actions = buffers['actions']
+        self.rewards = buffers['rewards']
+        self.terminated = buffers['terminated']
+        self.truncated = buffers['truncated']
+
+        self.connections = []
+        self.processes = []
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_subproc_worker,
+                args=(child_conn, self.shm.name, num_envs,
+                      int(start), int(stop), env_kwargs),
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+        self.closed = False
+
+    def _broadcast(self, command, arg=None):
+        """Send a command to every worker and wait for all of them."""
+        for conn in self.connections:
+            conn.send((command, arg))
+        for conn in self.connections:
+            conn.recv()
+
+    def reset(self, seed=None):
+        """Reset every race. Env i is seeded with seed + i."""
+        self._broadcast('reset', seed)
+        return self.observations, {}
+
+    def step(self, actions):
+        """Step every race in parallel; finished races reset automatically."""
+        self.actions[:] = actions
+        self._broadcast('step')
+        return self.observations, self.rewards, self.terminated, self.truncated, {}
+
+    def close(self):
+        """Stop the workers and free the shared memory."""
+        if self.closed:
+            return
+        self.closed = True
+        for conn in self.connections:
+            conn.send(('close', None))
+        for process in self.processes:
+            process.join()
+        for conn in self.connections:
+            conn.close()
+
+        del self.observations, self.actions, self.rewards
+        del self.terminated, self.truncated
+        self.shm.close()
+        self.shm.unlink()
@@ -4,11 +4,21 @@ Main Game class that handles the game loop and state management.
 
 import pygame
 import sys
+import time
 from src.config import *
 from src.scenes.menu import MenuScene
 from src.scenes.game_scene import GameScene
 from src.scenes.customization import CustomizationScene
 from src.scenes.track_select import TrackSelectScene
+from src.scenes.track_editor import TrackEditorScene
+from src.systems.quality import QualityController
+from src.systems.telemetry import TelemetrySink
+from src.systems.state_feed import StateFeed
+from src.systems.latency import LatencyTracer
+from src.systems.capture import FrameCapture
+from src.systems.scheduler import FrameScheduler
+from src.systems.memory import MemoryTracker
+from src.systems.trace import trace_span, enable_tracing, is_tracing, dump_trace
 
 
 class Game:
@@ -19,6 +29,41 @@ class Game:
         self.clock = pygame.time.Clock()
         self.running = True
 
+        # Adjusts render scale, effect rates and AI detail to hold FPS
+        self.quality = QualityController(FPS)
+
+        # Optional per-tick kart telemetry (see TELEMETRY_DIR)
+        self.telemetry = TelemetrySink(TELEMETRY_DIR) if TELEMETRY_DIR else None
+
+        # Optional live race state for spectator screens (see STATE_FEED_NAME)
+        self.state_feed = StateFeed(STATE_FEED_NAME) if STATE_FEED_NAME else None
+
+        # Memory snapshots at every scene change (started first so the
+        # rest of the game's allocations are traced)
+        self.memory = MemoryTracker() if MEMORY_DIAGNOSTICS else None
+
+        # Timing spans, dumped as Chrome trace JSON on F10 or at exit
+        if TRACE_ENABLED:
+            enable_tracing()
+        self.scene_spans = {}  # Scene class -> (update, draw) span names
+
+        # Optional input-to-flip latency tracing
+        self.latency = LatencyTracer() if LATENCY_TRACING else None
+
+        # Deferred background work, run in each frame's leftover budget
+        self.scheduler = FrameScheduler(FPS)
+
+        # Frame capture for highlight clips, toggled with F9
+        self.capture = None
+        if CAPTURE_ENABLED:
+            self.toggle_capture()
+
+        # Start of the next frame period (late input sampling)
+        self.frame_deadline = None
+
+        # Event that woke an idle wait, handled by the next frame
+        self.pending_events = []
+
         # Game state
         self.state = MENU
         self.selected_track = 0
@@ -34,49 +79,188 @@ class Game:
             MENU: MenuScene(self),
             PLAYING: None,  # Will be created when needed
             CUSTOMIZATION: CustomizationScene(self),
-            TRACK_SELECT: TrackSelectScene(self)
+            TRACK_SELECT: TrackSelectScene(self),
+            EDITOR: TrackEditorScene(self)
         }
 
         self.current_scene = self.scenes[MENU]
 
     def change_state(self, new_state, **kwargs):
         """Change the game state."""
+        with trace_span(f"change_state:{new_state}"):
+            self._change_state(new_state, **kwargs)
+
+    def _change_state(self, new_state, **kwargs):
+        old_state = self.state
+        self.current_scene.on_exit()
         self.state = new_state
+        if self.latency:
+            self.latency.reset()
 
         # Create game scene when needed
         if new_state == PLAYING:
+            # An already built track (e.g. from the editor) can be passed in
+            track = kwargs.pop('track', None)
             if PLAYING not in self.scenes or self.scenes[PLAYING] is None:
-                self.scenes[PLAYING] = GameScene(self, self.selected_track)
+                self.scenes[PLAYING] = GameScene(self, self.selected_track, track)
             else:
                 # Reset the game scene
-                self.scenes[PLAYING] = GameScene(self, self.selected_track)
+                self.scenes[PLAYING] = GameScene(self, self.selected_track, track)
 
         self.current_scene = self.scenes[new_state]
+        self.current_scene.invalidate()
 
         # Handle any additional parameters
         if hasattr(self.current_scene, 'on_enter'):
             self.current_scene.on_enter(**kwargs)
 
+        if self.memory:
+            with trace_span("memory_snapshot"):
+                self.memory.snapshot(f"{old_state}->{new_state}")
+
     def run(self):
         """Main game loop."""
         while self.running:
+            if self.is_idle():
+                # Nothing to show until something happens: sleep in the
+                # event queue (the wait is not frame time for quality)
+                event = pygame.event.wait(IDLE_WAIT_MS)
+                if event.type != pygame.NOEVENT:
+                    self.pending_events.append(event)
+                self.frame_deadline = None
+                self.run_frame(self.clock.tick() / 1000.0)
+                continue
+
+            if LATE_INPUT_SAMPLING:
+                self.wait_for_late_start()
+                dt = self.clock.tick() / 1000.0
+                start = time.perf_counter()
+                self.run_frame(dt)
+                self.quality.record((time.perf_counter() - start) * 1000 -
+                                    self.scheduler.frame_ms)
+                continue
+
             dt = self.clock.tick(FPS) / 1000.0  # Delta time in seconds
+            # Raw time excludes the frame-cap sleep, i.e. real work done
+            # (scheduled jobs only fill slack, so they do not count)
+            self.quality.record(self.clock.get_rawtime() - self.scheduler.frame_ms)
+            self.run_frame(dt)
+
+        self.current_scene.on_exit()
+        self.scheduler.flush()
+        if self.telemetry:
+            self.telemetry.close()
+        if self.state_feed:
+            self.state_feed.close()
+        if self.latency:
+            print(self.latency.summary())
+        if self.capture:
+            self.toggle_capture()
+        if self.memory:
+            self.memory.close()
+            print(f"Memory timeline written to {self.memory.path}")
+        if is_tracing():
+            print(f"Trace written to {dump_trace()}")
+
+    def toggle_capture(self):
+        """Start capturing frames, or finish the running capture."""
+        if self.capture:
+            self.capture.close()
+            print(self.capture.summary())
+            self.capture = None
+            return
+        try:
+            self.capture = FrameCapture(self.screen)
+        except (OSError, ValueError) as error:
+            print(f"Frame capture unavailable: {error}")
+
+    def is_idle(self):
+        """True when the current scene has nothing new to draw and no
+        deferred work is queued, so the loop can block on input."""
+        scene = self.current_scene
+        return (IDLE_REDRAW and scene.event_driven and not scene.needs_redraw
+                and not self.scheduler.depth and not self.capture)
 
-            # Handle events
-            for event in pygame.event.get():
+    def wait_for_late_start(self):
+        """Sleep until just enough time is left to finish the frame by its
+        deadline, so input is pumped as late as possible before flip."""
+        period = 1.0 / FPS
+        now = time.perf_counter()
+        if self.frame_deadline is None or now > self.frame_deadline:
+            self.frame_deadline = now + period  # Missed or first frame: resync
+
+        work = (self.quality.p90_ms + LATE_INPUT_MARGIN_MS) / 1000
+        start_at = self.frame_deadline - work
+        if start_at > now:
+            time.sleep(start_at - now)
+        self.frame_deadline += period
+
+    def run_frame(self, dt):
+        """Handle events, update and draw a single frame, then run deferred
+        jobs in what is left of the frame budget."""
+        frame_start = time.perf_counter()
+        with trace_span("frame"):
+            self._run_frame(dt)
+            with trace_span("scheduler"):
+                self.scheduler.run(frame_start)
+
+    def _run_frame(self, dt):
+        # Handle events (race scenes expose displayed_tick for latency)
+        tracing_latency = self.latency and \
+            hasattr(self.current_scene, 'displayed_tick')
+        with trace_span("events"):
+            events = self.pending_events + pygame.event.get()
+            self.pending_events = []
+            for event in events:
                 if event.type == pygame.QUIT:
                     self.running = False
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F10 \
+                        and is_tracing():
+                    print(f"Trace written to {dump_trace()}")
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+                    self.toggle_capture()
+                elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+                    self.current_scene.invalidate()  # The window needs repainting
                 else:
+                    if tracing_latency and event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                        self.latency.input()
                     self.current_scene.handle_event(event)
 
-            # Update current scene
+        # Update current scene
+        update_span, _ = self.spans_for(self.current_scene)
+        with trace_span(update_span):
             self.current_scene.update(dt)
 
-            # Draw current scene
+        # Draw current scene (update may have switched scenes). Event-driven
+        # scenes keep the last frame on screen until they change
+        scene = self.current_scene
+        if IDLE_REDRAW and scene.event_driven and not scene.needs_redraw \
+                and not self.capture:
+            return
+        _, draw_span = self.spans_for(scene)
+        with trace_span(draw_span):
             self.screen.fill(BLACK)
-            self.current_scene.draw(self.screen)
+            scene.draw(self.screen)
+        scene.needs_redraw = False
 
+        if self.capture:
+            with trace_span("capture"):
+                self.capture.capture(self.screen)
+
+        with trace_span("flip"):
             pygame.display.flip()
+        if tracing_latency and hasattr(self.current_scene, 'displayed_tick'):
+            self.latency.flip(self.current_scene.displayed_tick)
+
+    def spans_for(self, scene):
+        """A scene's update and draw span names, formatted once per scene
+        class so traced frames build no strings."""
+        spans = self.scene_spans.get(type(scene))
+        if spans is None:
+            name = type(scene).__name__
+            spans = (f"{name}.update", f"{name}.draw")
+            self.scene_spans[type(scene)] = spans
+        return spans
 
     def quit_game(self):
         """Quit the game."""
@@ -6,9 +6,30 @@ import pygame
 
 
 class Scene:
+    # Scenes that only change on input (or in update(), saying so with
+    # invalidate()) are redrawn only when needed: Game skips drawing and
+    # flipping otherwise, and sleeps on events while such a scene is idle
+    event_driven = False
+
     def __init__(self, game):
         """Initialize the scene."""
         self.game = game
+        self.needs_redraw = True  # Dirty flag for event-driven scenes
+        self.text_cache = {}
+
+    def invalidate(self):
+        """Redraw on the next frame (event-driven scenes)."""
+        self.needs_redraw = True
+
+    def render_text(self, font, text, color):
+        """Rendered text, cached: menus keep drawing the same few strings.
+        The cache is never emptied, so render text that keeps changing
+        directly."""
+        key = (font, text, color)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = self.text_cache[key] = font.render(text, True, color)
+        return surface
 
     def handle_event(self, event):
         """Handle pygame events."""
@@ -5,9 +5,13 @@ Kart Customization Scene
 import pygame
 from src.scenes.base_scene import Scene
 from src.config import *
+from src.systems.lap_predictor import LapPredictor
+from src.systems.scheduler import PRIORITY_LOW
 
 
 class CustomizationScene(Scene):
+    event_driven = True
+
     def __init__(self, game):
         super().__init__(game)
         self.font_large = pygame.font.Font(None, 56)
@@ -25,8 +29,49 @@ class CustomizationScene(Scene):
         self.kart_config = self.game.player_kart_config.copy()
         self.selected_color = self.colors.index(self.kart_config['color'])
 
+        # Lap time and top speed of the current configuration, simulated in
+        # the background on the selected track
+        self.predictor = LapPredictor()
+
+        # Everything but the configuration never changes
+        self.bar_names = ["Speed", "Acceleration", "Handling"]
+        self.background = self.render_background()
+
+    def render_background(self):
+        """Title, bar labels and controls on one screen-sized layer."""
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        background.fill(BLACK)
+
+        # Title
+        title_text = self.font_large.render("CUSTOMIZE KART", True, YELLOW)
+        title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 80))
+        background.blit(title_text, title_rect)
+
+        # Performance bar labels
+        for i, name in enumerate(self.bar_names):
+            label_text = self.font_small.render(name, True, WHITE)
+            background.blit(label_text, (SCREEN_WIDTH // 2 - 100, 420 + i * 35))
+
+        # Controls
+        controls_text = self.font_small.render(
+            "UP/DOWN: Navigate | LEFT/RIGHT: Adjust | ENTER: Save | ESC: Cancel", True, GRAY)
+        controls_rect = controls_text.get_rect(
+            center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50))
+        background.blit(controls_text, controls_rect)
+        return background
+
+    def on_enter(self, **kwargs):
+        self.request_prediction()
+
+    def on_exit(self):
+        self.predictor.close()
+
+    def request_prediction(self):
+        self.predictor.request(self.game.selected_track, self.kart_config)
+
     def handle_event(self, event):
         if event.type == pygame.KEYDOWN:
+            self.invalidate()
             if event.key == pygame.K_UP:
                 self.selected_attribute = (
                     self.selected_attribute - 1) % len(self.attributes)
@@ -62,14 +107,17 @@ class CustomizationScene(Scene):
             self.kart_config['turn_speed'] = max(
                 2, min(8, self.kart_config['turn_speed'] + direction * 0.5))
 
+        if attribute != "Color":
+            self.request_prediction()
+
     def update(self, dt):
-        pass
+        if self.predictor.poll():
+            self.invalidate()  # Show the new prediction
+            self.game.scheduler.submit(self.predictor.save, priority=PRIORITY_LOW,
+                                       key="lap_predictions")
 
     def draw(self, screen):
-        # Draw title
-        title_text = self.font_large.render("CUSTOMIZE KART", True, YELLOW)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 80))
-        screen.blit(title_text, title_rect)
+        screen.blit(self.background, (0, 0))
 
         # Draw kart preview
         kart_center = (SCREEN_WIDTH // 2 - 200, 250)
@@ -80,7 +128,7 @@ class CustomizationScene(Scene):
         start_y = 180
         for i, attribute in enumerate(self.attributes):
             color = ORANGE if i == self.selected_attribute else WHITE
-            attr_text = self.font_medium.render(attribute + ":", True, color)
+            attr_text = self.render_text(self.font_medium, attribute + ":", color)
             screen.blit(attr_text, (SCREEN_WIDTH // 2 + 50, start_y + i * 50))
 
             # Draw attribute value
@@ -93,35 +141,31 @@ class CustomizationScene(Scene):
             elif attribute == "Turn Speed":
                 value_text = f"{self.kart_config['turn_speed']:.1f}"
 
-            value_surface = self.font_small.render(value_text, True, color)
+            value_surface = self.render_text(self.font_small, value_text, color)
             screen.blit(value_surface, (SCREEN_WIDTH //
                         2 + 250, start_y + i * 50 + 5))
 
             # Draw adjustment arrows for selected attribute
             if i == self.selected_attribute:
-                left_arrow = self.font_medium.render("<", True, ORANGE)
-                right_arrow = self.font_medium.render(">", True, ORANGE)
+                left_arrow = self.render_text(self.font_medium, "<", ORANGE)
+                right_arrow = self.render_text(self.font_medium, ">", ORANGE)
                 screen.blit(left_arrow, (SCREEN_WIDTH //
                             2 + 220, start_y + i * 50))
                 screen.blit(right_arrow, (SCREEN_WIDTH //
                             2 + 350, start_y + i * 50))
 
-        # Draw performance bars
+        # Draw performance bars (labels are on the background)
         bar_y = 420
         bar_width = 200
         bar_height = 20
 
-        attributes_with_values = [
-            ("Speed", self.kart_config['max_speed'] / 12),
-            ("Acceleration", self.kart_config['acceleration'] / 0.8),
-            ("Handling", self.kart_config['turn_speed'] / 8)
+        values = [
+            self.kart_config['max_speed'] / 12,
+            self.kart_config['acceleration'] / 0.8,
+            self.kart_config['turn_speed'] / 8
         ]
 
-        for i, (name, value) in enumerate(attributes_with_values):
-            # Draw label
-            label_text = self.font_small.render(name, True, WHITE)
-            screen.blit(label_text, (SCREEN_WIDTH // 2 - 100, bar_y + i * 35))
-
+        for i, value in enumerate(values):
             # Draw bar background
             bar_rect = pygame.Rect(SCREEN_WIDTH // 2 +
                                    20, bar_y + i * 35, bar_width, bar_height)
@@ -136,9 +180,20 @@ class CustomizationScene(Scene):
             # Draw bar border
             pygame.draw.rect(screen, WHITE, bar_rect, 2)
 
-        # Controls
-        controls_text = self.font_small.render(
-            "UP/DOWN: Navigate | LEFT/RIGHT: Adjust | ENTER: Save | ESC: Cancel", True, GRAY)
-        controls_rect = controls_text.get_rect(
-            center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50))
-        screen.blit(controls_text, controls_rect)
+        self.draw_prediction(screen, bar_y + len(values) * 35 + 15)
+
+    def draw_prediction(self, screen, y):
+        """Predicted lap time and top speed, or a note while simulating."""
+        prediction = self.predictor.get(self.game.selected_track, self.kart_config)
+        if prediction is None:
+            text = "Predicting lap time..."
+        elif prediction['lap_time'] is None:
+            text = f"No clean lap in {LAP_PREDICTION_MAX_TIME:.0f} s | Top speed: {prediction['top_speed']:.1f}"
+        else:
+            text = (f"Predicted lap: {prediction['lap_time']:.2f} s | "
+                    f"Top speed: {prediction['top_speed']:.1f}")
+        # Not cached: every configuration and track has its own line, and
+        # this only runs when the screen is redrawn
+        prediction_text = self.font_small.render(text, True, YELLOW)
+        prediction_rect = prediction_text.get_rect(center=(SCREEN_WIDTH // 2, y))
+        screen.blit(prediction_text, prediction_rect)
@@ -4,15 +4,24 @@ Main Game Scene where the racing happens.
 
 import pygame
 import math
+import time
+import threading
 from src.scenes.base_scene import Scene
 from src.config import *
-from src.entities.kart import Kart
+from src.entities.kart import Kart, read_keyboard_controls
 from src.entities.ai_kart import AIKart
+from src.entities.items import ItemSystem, ITEM_NAMES
 from src.track.track import Track
+from src.effects.particles import ParticleSystem, KartEffects
+from src.effects.audio import KartAudio
+from src.systems.pipeline import SimulationThread, RaceSnapshot, capture_kart
+from src.systems.rollback import RaceRandom, RaceStateCodec, SnapshotRing
+from src.systems.scheduler import PRIORITY_HIGH
+from src.systems.trace import traced
 
 
 class GameScene(Scene):
-    def __init__(self, game, selected_track=0):
+    def __init__(self, game, selected_track=0, track=None):
         super().__init__(game)
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 24)
@@ -24,12 +33,12 @@ class GameScene(Scene):
         self.countdown_timer = 3.0
         self.race_timer = 0.0
 
-        # Create track
-        self.track = Track(selected_track)
+        # Create track (unless an edited one was passed in)
+        self.track = track if track is not None else Track(selected_track)
 
         # Create karts
         self.karts = []
-        start_positions = self.track.get_start_positions(4)  # Player + 3 AI
+        start_positions = self.track.get_start_positions(1 + NUM_AI_KARTS)
 
         # Player kart
         player_pos = start_positions[0]
@@ -41,17 +50,48 @@ class GameScene(Scene):
         )
         self.karts.append(self.player_kart)
 
-        # AI karts
-        ai_colors = [BLUE, GREEN, PURPLE]
-        for i in range(3):
+        # AI karts share one race RNG so snapshots can capture it
+        self.rng = RaceRandom()
+        ai_colors = [BLUE, GREEN, PURPLE, ORANGE, YELLOW, BROWN, WATER_BLUE, WHITE]
+        for i in range(NUM_AI_KARTS):
             ai_pos = start_positions[i + 1]
             ai_kart = AIKart(
                 ai_pos[0], ai_pos[1],
-                color=ai_colors[i],
-                track=self.track
+                color=ai_colors[i % len(ai_colors)],
+                track=self.track,
+                rng=self.rng
             )
             self.karts.append(ai_kart)
 
+        # Visual effects
+        self.particles = ParticleSystem()
+        self.kart_effects = KartEffects(self.particles)
+        self.particle_dt = 0.0
+        self.audio = KartAudio()
+
+        # Item boxes and projectiles
+        self.items = ItemSystem(self.track, self.rng)
+
+        # AI recovery needs the flow field; build it in spare frame time
+        # during the countdown rather than the first time a kart leaves
+        # the road mid-race. Cancelled if the race is left before they run
+        self.build_jobs = []
+        if NUM_AI_KARTS and self.track.distance_field is not None:
+            self.build_jobs.append(self.game.scheduler.submit(
+                self.track.build_flow_field, priority=PRIORITY_HIGH,
+                deadline=self.countdown_timer / 2))
+        if self.track.solid_walls and self.track.distance_field is not None:
+            self.build_jobs.append(self.game.scheduler.submit(
+                self.track.build_walls, priority=PRIORITY_HIGH,
+                deadline=self.countdown_timer / 2))
+
+        # Quality-dependent rendering state
+        self.frame_index = 0  # Simulation ticks (rewinds with the race)
+        self.tick_count = 0  # Simulation ticks run, never rewound
+        self.draw_index = 0  # Rendered frames
+        self.world_surface = None  # Reduced-resolution world layer
+        self.hud_items = []  # Cached (surface, position) HUD text
+
         # Camera
         self.camera_x = 0
         self.camera_y = 0
@@ -65,52 +105,131 @@ class GameScene(Scene):
                 kart.set_respawn_point(
                     self.track.start_line[0], self.track.start_line[1], 0)
 
+        if self.game.telemetry:
+            self.game.telemetry.begin_race(self.telemetry_track_id, self.track.revision)
+
+        # Start state for instant restarts, and recent ticks for rewinding
+        self.state_codec = RaceStateCodec(self)
+        self.start_state = self.state_codec.new_buffer()
+        self.state_codec.save_into(self.start_state)
+        self.history = SnapshotRing(self.state_codec)
+
+        # Guards race state against the simulation thread (pipelined mode)
+        self.lock = threading.RLock()
+        self.pipeline = None
+
+        # What draw() shows: the live state, or interpolated pipeline output
+        self.render_snapshot = self.capture_snapshot()
+
+    def on_enter(self, **kwargs):
+        """Start the simulation thread in pipelined mode."""
+        if PIPELINED_SIMULATION and self.pipeline is None:
+            self.pipeline = SimulationThread(self)
+            self.pipeline.start()
+
+    def on_exit(self):
+        """Stop the simulation thread, if any, the kart sounds and any
+        track builds still queued."""
+        for job in self.build_jobs:
+            job.cancel()
+        self.build_jobs = []
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+        self.audio.stop()
+
     def handle_event(self, event):
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
-                self.paused = not self.paused
+                with self.lock:
+                    self.paused = not self.paused
             elif event.key == pygame.K_r and (self.paused or self.race_finished):
                 # Restart race
-                self.restart_race()
+                with self.lock:
+                    self.restart_race()
+            elif event.key == pygame.K_SPACE and self.race_started and \
+                    not self.paused and not self.race_finished:
+                with self.lock:
+                    self.items.use_item(self.karts, 0)
+            elif event.key == pygame.K_BACKSPACE and PRACTICE_REWIND and \
+                    self.race_started and not self.race_finished:
+                with self.lock:
+                    self.rewind(REWIND_SECONDS)
             elif event.key == pygame.K_m and (self.paused or self.race_finished):
-                # Return to menu
+                # Return to menu (not under the lock: leaving joins the
+                # simulation thread)
                 self.game.change_state(MENU)
 
+    @property
+    def telemetry_track_id(self):
+        """Track id telemetry files races under; None for edited tracks."""
+        return self.track.track_id if self.track.cache_key is not None else None
+
     def restart_race(self):
-        """Restart the current race."""
-        # Reset race state
-        self.race_started = False
-        self.race_finished = False
-        self.countdown_timer = 3.0
-        self.race_timer = 0.0
+        """Restart the current race from its start snapshot."""
+        self.state_codec.restore_from(self.start_state)
+        self.history.clear()
         self.paused = False
 
-        # Reset all karts
-        start_positions = self.track.get_start_positions(len(self.karts))
-        for i, kart in enumerate(self.karts):
-            pos = start_positions[i]
-            kart.x = pos[0]
-            kart.y = pos[1]
-            kart.angle = 0
-            kart.speed = 0
-            kart.velocity_x = 0
-            kart.velocity_y = 0
-            kart.current_lap = 0
-            kart.last_checkpoint = -1
-            kart.finished = False
-            kart.finish_time = 0
+        self.particles.clear()
+        self.kart_effects.reset()
 
-            if self.track.start_line:
-                kart.set_respawn_point(
-                    self.track.start_line[0], self.track.start_line[1], 0)
+        if self.game.telemetry:
+            self.game.telemetry.begin_race(self.telemetry_track_id, self.track.revision)
 
-        # Reset race manager
-        self.race_manager.reset_race()
+    def rewind(self, seconds):
+        """Roll the race back by up to seconds of recorded ticks."""
+        tick_rate = SIM_TICK_RATE if self.pipeline else FPS
+        if self.history.restore(int(seconds * tick_rate)) is not None:
+            self.particles.clear()
+            self.kart_effects.reset()
 
     def update(self, dt):
         if self.paused:
+            # Keys pressed while paused never reach the simulation
+            if self.game.latency:
+                self.game.latency.reset()
+            self.audio.set_paused(True)
             return
 
+        if self.pipeline:
+            # The simulation thread picks this sample up on its next tick
+            if not LATE_INPUT_SAMPLING:
+                self.pipeline.submit_input(read_keyboard_controls())
+                if self.game.latency:
+                    self.game.latency.sample()
+            snapshot = self.pipeline.buffer.get_interpolated(
+                self.pipeline.tick_dt)
+            if snapshot:
+                self.render_snapshot = snapshot
+        else:
+            self.simulate(dt)
+            self.render_snapshot = self.capture_snapshot()
+
+        # Update camera to follow player
+        player = self.render_snapshot.karts[0]
+        self.update_camera(player.x, player.y)
+        self.audio.update(self.render_snapshot.karts, self.camera_x, self.camera_y)
+
+    @traced()
+    def simulate(self, dt, controls=None):
+        """Advance the race by one tick.
+
+        Called from update() in serial mode and from the simulation thread
+        (holding self.lock) in pipelined mode. controls is the sampled player
+        input; None reads the keyboard directly.
+        """
+        if self.paused:
+            return
+        self.player_kart.controls = controls
+        self.tick_count += 1
+
+        latency = self.game.latency
+        if latency:
+            if controls is None:
+                latency.sample()  # The player kart reads the keyboard below
+            latency.consume(self.tick_count)
+
         # Handle countdown
         if not self.race_started:
             self.countdown_timer -= dt
@@ -125,21 +244,71 @@ class GameScene(Scene):
         if self.race_started:
             for kart in self.karts:
                 kart.update(dt, self.track)
+            self.items.update(dt, self.karts)
+            self.kart_effects.update(self.karts)
+            self.audio.collect(self.karts)
 
             # Update race management
             self.race_manager.update(dt)
 
+            if self.game.telemetry:
+                self.game.telemetry.record(self.karts)
+
             # Check for race finish
             if self.race_manager.is_race_finished():
                 self.race_finished = True
 
-        # Update camera to follow player
-        self.update_camera()
+        # Particles may update less often at lower quality
+        settings = self.game.quality.settings
+        self.frame_index += 1
+        self.particle_dt += dt
+        if self.frame_index % settings['particle_interval'] == 0:
+            self.particles.update(self.particle_dt)
+            self.particle_dt = 0.0
 
-    def update_camera(self):
+        self.update_ai_detail(settings)
+
+        # Record the finished tick for rewinding
+        if self.race_started and not self.race_finished:
+            self.history.save(self.frame_index)
+
+        if self.game.state_feed:
+            self.game.state_feed.publish(self)
+
+    @property
+    def displayed_tick(self):
+        """Simulation tick the next drawn frame shows (latency tracing)."""
+        return self.render_snapshot.tick
+
+    def capture_snapshot(self):
+        """Immutable copy of everything draw() needs from the race."""
+        return RaceSnapshot(
+            tick=self.tick_count,
+            time=time.perf_counter(),
+            karts=tuple(capture_kart(kart) for kart in self.karts),
+            race_started=self.race_started,
+            race_finished=self.race_finished,
+            countdown_timer=self.countdown_timer,
+            race_timer=self.race_timer,
+            particles=self.particles.snapshot(),
+            items=self.items.snapshot()
+        )
+
+    def update_ai_detail(self, settings):
+        """Slow down decisions of AI karts that are off screen."""
+        center_x = self.camera_x + SCREEN_WIDTH / 2
+        center_y = self.camera_y + SCREEN_HEIGHT / 2
+        for kart in self.karts:
+            if isinstance(kart, AIKart):
+                far = abs(kart.x - center_x) > SCREEN_WIDTH or \
+                    abs(kart.y - center_y) > SCREEN_HEIGHT
+                scale = settings['ai_far_reaction_scale'] if far else 1
+                kart.reaction_time = AI_REACTION_TIME * scale
+
+    def update_camera(self, player_x, player_y):
         """Update camera to follow the player kart."""
-        target_x = self.player_kart.x - SCREEN_WIDTH // 2
-        target_y = self.player_kart.y - SCREEN_HEIGHT // 2
+        target_x = player_x - SCREEN_WIDTH // 2
+        target_y = player_y - SCREEN_HEIGHT // 2
 
         # Smooth camera movement
         self.camera_x += (target_x - self.camera_x) * 0.1
@@ -152,62 +321,115 @@ class GameScene(Scene):
             0, min(self.camera_y, self.track.height - SCREEN_HEIGHT))
 
     def draw(self, screen):
-        # Draw track
-        self.track.draw(screen, self.camera_x, self.camera_y)
-
-        # Draw karts
-        for kart in self.karts:
-            kart.draw(screen, self.camera_x, self.camera_y)
+        snapshot = self.render_snapshot
+        scale = self.game.quality.settings['render_scale']
+        if scale < 1.0:
+            # Render the world at reduced resolution, then upscale it
+            size = (int(SCREEN_WIDTH * scale), int(SCREEN_HEIGHT * scale))
+            if self.world_surface is None or self.world_surface.get_size() != size:
+                self.world_surface = pygame.Surface(size)
+            self.world_surface.fill(BLACK)
+            self.draw_world(self.world_surface, snapshot, scale)
+            pygame.transform.scale(
+                self.world_surface, screen.get_size(), screen)
+        else:
+            self.draw_world(screen, snapshot)
 
-        # Draw UI
-        self.draw_ui(screen)
+        # Draw UI at full resolution
+        self.draw_ui(screen, snapshot)
 
         # Draw countdown
-        if not self.race_started:
-            self.draw_countdown(screen)
+        if not snapshot.race_started:
+            self.draw_countdown(screen, snapshot)
 
         # Draw pause screen
         if self.paused:
             self.draw_pause_screen(screen)
 
         # Draw race results
-        if self.race_finished:
-            self.draw_race_results(screen)
+        if snapshot.race_finished:
+            self.draw_race_results(screen, snapshot)
+
+    def draw_world(self, surface, snapshot, scale=1.0):
+        """Draw track, particles and karts (the part affected by render scale)."""
+        # Draw track
+        self.track.draw(surface, self.camera_x, self.camera_y, scale)
+
+        # Draw particles under the karts
+        self.particles.draw(surface, self.camera_x, self.camera_y, scale,
+                            snapshot.particles)
+
+        # Draw item boxes and projectiles
+        self.items.draw(surface, self.camera_x, self.camera_y, scale,
+                        snapshot.items)
+
+        # Draw karts
+        for kart, state in zip(self.karts, snapshot.karts):
+            kart.draw(surface, self.camera_x, self.camera_y, scale, state)
+
+    def draw_ui(self, screen, snapshot):
+        """Draw the game UI, re-rendering text every hud_interval frames."""
+        hud_interval = self.game.quality.settings['hud_interval']
+        self.draw_index += 1
+        if not self.hud_items or self.draw_index % hud_interval == 0:
+            self.hud_items = self.render_ui(snapshot)
+        screen.blits(self.hud_items, doreturn=False)
+
+    def render_ui(self, snapshot):
+        """Render the HUD text into (surface, position) pairs."""
+        items = []
+        player = snapshot.karts[0]
 
-    def draw_ui(self, screen):
-        """Draw the game UI."""
         # Race info
-        if self.race_started:
+        if snapshot.race_started:
             # Timer
-            time_text = f"Time: {self.race_timer:.1f}s"
+            time_text = f"Time: {snapshot.race_timer:.1f}s"
             time_surface = self.small_font.render(time_text, True, WHITE)
-            screen.blit(time_surface, (SCREEN_WIDTH - 150, 10))
+            items.append((time_surface, (SCREEN_WIDTH - 150, 10)))
 
             # Player position
-            position_text = f"Position: {self.player_kart.race_position}"
+            position_text = f"Position: {player.race_position}"
             position_surface = self.small_font.render(
                 position_text, True, WHITE)
-            screen.blit(position_surface, (SCREEN_WIDTH - 150, 35))
+            items.append((position_surface, (SCREEN_WIDTH - 150, 35)))
 
             # Player lap
-            lap_text = f"Lap: {self.player_kart.current_lap + 1}/{TOTAL_LAPS}"
+            lap_text = f"Lap: {player.current_lap + 1}/{TOTAL_LAPS}"
             lap_surface = self.small_font.render(lap_text, True, WHITE)
-            screen.blit(lap_surface, (SCREEN_WIDTH - 150, 60))
+            items.append((lap_surface, (SCREEN_WIDTH - 150, 60)))
+
+            # Held item
+            item_text = f"Item: {ITEM_NAMES[player.item]}"
+            item_surface = self.small_font.render(item_text, True, WHITE)
+            items.append((item_surface, (SCREEN_WIDTH - 150, 85)))
 
-        # Speed (always show for player)
-        speed_text = f"Speed: {self.player_kart.speed:.1f}"
+        # Player stats (always shown, drawn here rather than in the scaled
+        # world so they stay sharp)
+        speed_text = f"Speed: {player.speed:.1f}"
         speed_surface = self.small_font.render(speed_text, True, WHITE)
-        screen.blit(speed_surface, (10, 10))
+        items.append((speed_surface, (10, 10)))
+
+        position_text = f"Position: {player.race_position}"
+        position_surface = self.small_font.render(position_text, True, WHITE)
+        items.append((position_surface, (10, 35)))
+
+        lap_text = f"Lap: {player.current_lap + 1}/{TOTAL_LAPS}"
+        lap_surface = self.small_font.render(lap_text, True, WHITE)
+        items.append((lap_surface, (10, 60)))
 
         # Controls hint
-        controls_text = "WASD/Arrows: Move | ESC: Pause"
+        controls_text = "WASD/Arrows: Move | SPACE: Use item | ESC: Pause"
+        if PRACTICE_REWIND:
+            controls_text += " | Backspace: Rewind"
         controls_surface = self.small_font.render(controls_text, True, GRAY)
-        screen.blit(controls_surface, (10, SCREEN_HEIGHT - 30))
+        items.append((controls_surface, (10, SCREEN_HEIGHT - 30)))
+
+        return items
 
-    def draw_countdown(self, screen):
+    def draw_countdown(self, screen, snapshot):
         """Draw countdown before race starts."""
-        if self.countdown_timer > 0:
-            count = int(self.countdown_timer) + 1
+        if snapshot.countdown_timer > 0:
+            count = int(snapshot.countdown_timer) + 1
             countdown_text = str(count)
         else:
             countdown_text = "GO!"
@@ -250,7 +472,7 @@ class GameScene(Scene):
                 center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + i * 30))
             screen.blit(text, text_rect)
 
-    def draw_race_results(self, screen):
+    def draw_race_results(self, screen, snapshot):
         """Draw race results screen."""
         # Semi-transparent overlay
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -259,7 +481,8 @@ class GameScene(Scene):
         screen.blit(overlay, (0, 0))
 
         # Results title
-        if self.player_kart.race_position == 1:
+        player = snapshot.karts[0]
+        if player.race_position == 1:
             title_text = "VICTORY!"
             title_color = YELLOW
         else:
@@ -271,12 +494,12 @@ class GameScene(Scene):
         screen.blit(title_surface, title_rect)
 
         # Player results
-        result_text = f"Final Position: {self.player_kart.race_position}"
+        result_text = f"Final Position: {player.race_position}"
         result_surface = self.small_font.render(result_text, True, WHITE)
         result_rect = result_surface.get_rect(center=(SCREEN_WIDTH // 2, 250))
         screen.blit(result_surface, result_rect)
 
-        time_text = f"Race Time: {self.race_timer:.1f}s"
+        time_text = f"Race Time: {snapshot.race_timer:.1f}s"
         time_surface = self.small_font.render(time_text, True, WHITE)
         time_rect = time_surface.get_rect(center=(SCREEN_WIDTH // 2, 280))
         screen.blit(time_surface, time_rect)
@@ -301,6 +524,7 @@ class RaceManager:
         self.track = track
         self.total_laps = TOTAL_LAPS
 
+    @traced()
     def update(self, dt):
         """Update race management."""
         self.update_checkpoints()
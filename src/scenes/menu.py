@@ -8,6 +8,8 @@ from src.config import *
 
 
 class MenuScene(Scene):
+    event_driven = True
+
     def __init__(self, game):
         super().__init__(game)
         self.font_large = pygame.font.Font(None, 72)
@@ -18,6 +20,7 @@ class MenuScene(Scene):
             "Start Race",
             "Customize Kart",
             "Select Track",
+            "Track Editor",
             "Quit"
         ]
         self.selected_item = 0
@@ -27,14 +30,44 @@ class MenuScene(Scene):
         self.selected_color = ORANGE
         self.normal_color = WHITE
 
+        # Everything but the menu items never changes
+        self.background = self.render_background()
+
+    def render_background(self):
+        """Title, subtitle and controls hint on one screen-sized layer."""
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        background.fill(BLACK)
+
+        # Title
+        title_text = self.font_large.render(
+            "KART RACING", True, self.title_color)
+        title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 150))
+        background.blit(title_text, title_rect)
+
+        # Subtitle
+        subtitle_text = self.font_small.render(
+            "Race against AI opponents!", True, WHITE)
+        subtitle_rect = subtitle_text.get_rect(center=(SCREEN_WIDTH // 2, 200))
+        background.blit(subtitle_text, subtitle_rect)
+
+        # Controls hint
+        controls_text = self.font_small.render(
+            "Use UP/DOWN arrows and ENTER to navigate", True, GRAY)
+        controls_rect = controls_text.get_rect(
+            center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50))
+        background.blit(controls_text, controls_rect)
+        return background
+
     def handle_event(self, event):
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_UP:
                 self.selected_item = (
                     self.selected_item - 1) % len(self.menu_items)
+                self.invalidate()
             elif event.key == pygame.K_DOWN:
                 self.selected_item = (
                     self.selected_item + 1) % len(self.menu_items)
+                self.invalidate()
             elif event.key == pygame.K_RETURN or event.key == pygame.K_SPACE:
                 self.select_item()
 
@@ -48,6 +81,8 @@ class MenuScene(Scene):
             self.game.change_state(CUSTOMIZATION)
         elif item == "Select Track":
             self.game.change_state(TRACK_SELECT)
+        elif item == "Track Editor":
+            self.game.change_state(EDITOR)
         elif item == "Quit":
             self.game.quit_game()
 
@@ -55,30 +90,13 @@ class MenuScene(Scene):
         pass
 
     def draw(self, screen):
-        # Draw title
-        title_text = self.font_large.render(
-            "KART RACING", True, self.title_color)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 150))
-        screen.blit(title_text, title_rect)
-
-        # Draw subtitle
-        subtitle_text = self.font_small.render(
-            "Race against AI opponents!", True, WHITE)
-        subtitle_rect = subtitle_text.get_rect(center=(SCREEN_WIDTH // 2, 200))
-        screen.blit(subtitle_text, subtitle_rect)
+        screen.blit(self.background, (0, 0))
 
         # Draw menu items
         start_y = 300
         for i, item in enumerate(self.menu_items):
             color = self.selected_color if i == self.selected_item else self.normal_color
-            text = self.font_medium.render(item, True, color)
+            text = self.render_text(self.font_medium, item, color)
             text_rect = text.get_rect(
                 center=(SCREEN_WIDTH // 2, start_y + i * 60))
             screen.blit(text, text_rect)
-
-        # Draw controls hint
-        controls_text = self.font_small.render(
-            "Use UP/DOWN arrows and ENTER to navigate", True, GRAY)
-        controls_rect = controls_text.get_rect(
-            center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50))
-        screen.blit(controls_text, controls_rect)
@@ -0,0 +1,196 @@
+"""
+Track Editor Scene
+
+Edits a copy of the selected track in place. Every edit reports the rect it
+touched, and the track re-rasterizes only that region once per frame. The
+matching part of the distance field is rebuilt when a drag ends.
+"""
+
+import time
+import pygame
+from src.scenes.base_scene import Scene
+from src.config import *
+from src.track.track import Track
+
+HANDLE_RADIUS = 15
+NEW_WATER_RADIUS = 50
+PAN_SPEED = 600  # Pixels per second
+
+
+class TrackEditorScene(Scene):
+    def __init__(self, game):
+        super().__init__(game)
+        self.font = pygame.font.Font(None, 36)
+        self.small_font = pygame.font.Font(None, 24)
+
+        self.track = None
+        self.camera_x = 0
+        self.camera_y = 0
+
+        # What the mouse is dragging: ('checkpoint' | 'water', index) or None
+        self.dragging = None
+
+        # Union of everything edited since the last redraw / field rebuild
+        self.dirty_rect = None
+        self.field_dirty_rect = None
+        self.last_rebuild_ms = 0.0
+        self.last_rebuild_area = 0
+
+    def on_enter(self, **kwargs):
+        """Start editing the selected track (keeps edits to the same track)."""
+        if self.track is None or self.track.track_id != self.game.selected_track:
+            self.track = Track(self.game.selected_track)
+            self.track.make_editable()
+            self.camera_x = 0
+            self.camera_y = 0
+        self.dragging = None
+        self.dirty_rect = None
+        self.field_dirty_rect = None
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_ESCAPE:
+                self.game.change_state(MENU)
+            elif event.key == pygame.K_p:
+                # Test drive the edited track
+                self.flush_edits()
+                self.game.change_state(PLAYING, track=self.track)
+            elif event.key == pygame.K_w:
+                x, y = self.get_world_mouse()
+                self.mark_dirty(self.track.add_water(x, y, NEW_WATER_RADIUS))
+            elif event.key in (pygame.K_x, pygame.K_DELETE):
+                self.remove_water_at(*self.get_world_mouse())
+            elif event.key == pygame.K_TAB:
+                self.mark_dirty(self.track.set_start_checkpoint(1))
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            world_x, world_y = self.screen_to_world(*event.pos)
+            if event.button == 1:
+                self.dragging = self.find_handle(world_x, world_y)
+            elif event.button == 3:
+                self.remove_water_at(world_x, world_y)
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if event.button == 1:
+                self.dragging = None
+                self.flush_edits()
+        elif event.type == pygame.MOUSEMOTION:
+            if self.dragging:
+                self.drag_to(*self.screen_to_world(*event.pos))
+
+    def screen_to_world(self, x, y):
+        return x + self.camera_x, y + self.camera_y
+
+    def get_world_mouse(self):
+        return self.screen_to_world(*pygame.mouse.get_pos())
+
+    def find_handle(self, x, y):
+        """Control point or water centre under a world position."""
+        for i, (point_x, point_y) in enumerate(self.track.checkpoints):
+            if (point_x - x) ** 2 + (point_y - y) ** 2 <= HANDLE_RADIUS ** 2:
+                return ('checkpoint', i)
+        for i, (water_x, water_y, _) in enumerate(self.track.water_areas):
+            if (water_x - x) ** 2 + (water_y - y) ** 2 <= HANDLE_RADIUS ** 2:
+                return ('water', i)
+        return None
+
+    def drag_to(self, x, y):
+        """Move the dragged handle, clamped to the track."""
+        x = max(0, min(int(x), self.track.width - 1))
+        y = max(0, min(int(y), self.track.height - 1))
+        kind, index = self.dragging
+        if kind == 'checkpoint':
+            self.mark_dirty(self.track.move_checkpoint(index, x, y))
+        else:
+            self.mark_dirty(self.track.move_water(index, x, y))
+
+    def remove_water_at(self, x, y):
+        """Remove the water hazard covering a world position, if any."""
+        for i, (water_x, water_y, radius) in enumerate(self.track.water_areas):
+            if (water_x - x) ** 2 + (water_y - y) ** 2 <= radius ** 2:
+                self.dragging = None
+                self.mark_dirty(self.track.remove_water(i))
+                return
+
+    def mark_dirty(self, rect):
+        if self.dirty_rect is None:
+            self.dirty_rect = rect
+        else:
+            self.dirty_rect = self.dirty_rect.union(rect)
+        if self.field_dirty_rect is None:
+            self.field_dirty_rect = rect
+        else:
+            self.field_dirty_rect = self.field_dirty_rect.union(rect)
+
+    def redraw_edits(self):
+        """Redraw the region touched by edits since the last redraw."""
+        if self.dirty_rect is None:
+            return
+        start = time.perf_counter()
+        self.track.rebuild_region(self.dirty_rect, distance_field=False)
+        self.last_rebuild_ms = (time.perf_counter() - start) * 1000
+        self.last_rebuild_area = self.dirty_rect.width * self.dirty_rect.height
+        self.dirty_rect = None
+
+    def flush_edits(self):
+        """Redraw, and rebuild the distance field for everything edited."""
+        self.redraw_edits()
+        if self.field_dirty_rect is not None:
+            self.track.update_distance_field(self.field_dirty_rect.clip(
+                pygame.Rect(0, 0, self.track.width, self.track.height)))
+            self.field_dirty_rect = None
+
+    def update(self, dt):
+        # Pan the camera
+        keys = pygame.key.get_pressed()
+        if keys[pygame.K_LEFT]:
+            self.camera_x -= PAN_SPEED * dt
+        if keys[pygame.K_RIGHT]:
+            self.camera_x += PAN_SPEED * dt
+        if keys[pygame.K_UP]:
+            self.camera_y -= PAN_SPEED * dt
+        if keys[pygame.K_DOWN]:
+            self.camera_y += PAN_SPEED * dt
+        self.camera_x = max(0, min(self.camera_x, self.track.width - SCREEN_WIDTH))
+        self.camera_y = max(0, min(self.camera_y, self.track.height - SCREEN_HEIGHT))
+
+        # One redraw per frame, however many edits came in; the distance
+        # field waits until the drag ends
+        if self.dragging:
+            self.redraw_edits()
+        else:
+            self.flush_edits()
+
+    def draw(self, screen):
+        self.track.draw(screen, self.camera_x, self.camera_y)
+
+        # Control points and the loop they form
+        points = [(x - self.camera_x, y - self.camera_y)
+                  for x, y in self.track.checkpoints]
+        pygame.draw.lines(screen, YELLOW, True, points, 1)
+        for i, point in enumerate(points):
+            color = GREEN if i == 0 else ORANGE
+            if self.dragging == ('checkpoint', i):
+                color = WHITE
+            pygame.draw.circle(screen, color, (int(point[0]), int(point[1])), 8)
+
+        # Water centres
+        for i, (water_x, water_y, _) in enumerate(self.track.water_areas):
+            color = WHITE if self.dragging == ('water', i) else LIGHT_GRAY
+            pygame.draw.circle(screen, color,
+                               (int(water_x - self.camera_x),
+                                int(water_y - self.camera_y)), 6, 2)
+
+        # Info
+        title_text = self.font.render("TRACK EDITOR", True, YELLOW)
+        screen.blit(title_text, (10, 10))
+        stats_text = self.small_font.render(
+            f"Last rebuild: {self.last_rebuild_ms:.1f} ms "
+            f"({self.last_rebuild_area} px)", True, WHITE)
+        screen.blit(stats_text, (10, 50))
+
+        controls_text = self.small_font.render(
+            "Drag: Move points/water | W: Add water | X/Right click: Remove water | "
+            "TAB: Move start | Arrows: Pan | P: Test drive | ESC: Menu",
+            True, WHITE)
+        controls_rect = controls_text.get_rect(
+            center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 20))
+        screen.blit(controls_text, controls_rect)
@@ -4,34 +4,67 @@ Track Selection Scene
 
 import pygame
 from src.scenes.base_scene import Scene
+from src.track.packs import available_tracks
 from src.config import *
 
 
 class TrackSelectScene(Scene):
+    event_driven = True
+
     def __init__(self, game):
         super().__init__(game)
         self.font_large = pygame.font.Font(None, 56)
         self.font_medium = pygame.font.Font(None, 42)
         self.font_small = pygame.font.Font(None, 32)
 
-        self.tracks = [
-            {"name": "Oval Circuit", "description": "Simple oval track for beginners"},
-            {"name": "Forest Loop", "description": "Winding track through the forest"},
-            {"name": "Desert Challenge", "description": "Sandy track with water hazards"}
-        ]
+        # Built-in tracks and installed track packs, by id
+        self.tracks = available_tracks()
+        ids = [track["id"] for track in self.tracks]
+        self.selected_track = ids.index(self.game.selected_track) \
+            if self.game.selected_track in ids else 0
+
+        # Everything but the selected track's details never changes
+        self.background = self.render_background()
+
+    def render_background(self):
+        """Title, preview frame and controls on one screen-sized layer."""
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        background.fill(BLACK)
+
+        # Title
+        title_text = self.font_large.render("SELECT TRACK", True, YELLOW)
+        title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
+        background.blit(title_text, title_rect)
+
+        # Track preview (simple representation)
+        preview_rect = pygame.Rect(SCREEN_WIDTH // 2 - 100, 350, 200, 150)
+        pygame.draw.rect(background, DARK_GRAY, preview_rect)
+        pygame.draw.rect(background, WHITE, preview_rect, 3)
 
-        self.selected_track = self.game.selected_track
+        preview_text = self.font_small.render("Track Preview", True, WHITE)
+        preview_text_rect = preview_text.get_rect(center=preview_rect.center)
+        background.blit(preview_text, preview_text_rect)
+
+        # Controls
+        controls_text = self.font_small.render(
+            "LEFT/RIGHT: Navigate | ENTER: Select | ESC: Back", True, GRAY)
+        controls_rect = controls_text.get_rect(
+            center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50))
+        background.blit(controls_text, controls_rect)
+        return background
 
     def handle_event(self, event):
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_LEFT:
                 self.selected_track = (
                     self.selected_track - 1) % len(self.tracks)
+                self.invalidate()
             elif event.key == pygame.K_RIGHT:
                 self.selected_track = (
                     self.selected_track + 1) % len(self.tracks)
+                self.invalidate()
             elif event.key == pygame.K_RETURN or event.key == pygame.K_SPACE:
-                self.game.selected_track = self.selected_track
+                self.game.selected_track = self.tracks[self.selected_track]["id"]
                 self.game.change_state(MENU)
             elif event.key == pygame.K_ESCAPE:
                 self.game.change_state(MENU)
@@ -40,51 +73,32 @@ class TrackSelectScene(Scene):
         pass
 
     def draw(self, screen):
-        # Draw title
-        title_text = self.font_large.render("SELECT TRACK", True, YELLOW)
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, 100))
-        screen.blit(title_text, title_rect)
+        screen.blit(self.background, (0, 0))
 
         # Draw track info
         track = self.tracks[self.selected_track]
 
         # Track name
-        name_text = self.font_medium.render(track["name"], True, ORANGE)
+        name_text = self.render_text(self.font_medium, track["name"], ORANGE)
         name_rect = name_text.get_rect(center=(SCREEN_WIDTH // 2, 250))
         screen.blit(name_text, name_rect)
 
         # Track description
-        desc_text = self.font_small.render(track["description"], True, WHITE)
+        desc_text = self.render_text(self.font_small, track["description"], WHITE)
         desc_rect = desc_text.get_rect(center=(SCREEN_WIDTH // 2, 300))
         screen.blit(desc_text, desc_rect)
 
-        # Track preview (simple representation)
-        preview_rect = pygame.Rect(SCREEN_WIDTH // 2 - 100, 350, 200, 150)
-        pygame.draw.rect(screen, DARK_GRAY, preview_rect)
-        pygame.draw.rect(screen, WHITE, preview_rect, 3)
-
-        preview_text = self.font_small.render("Track Preview", True, WHITE)
-        preview_text_rect = preview_text.get_rect(center=preview_rect.center)
-        screen.blit(preview_text, preview_text_rect)
-
         # Navigation arrows
         if self.selected_track > 0:
-            left_text = self.font_medium.render("< ", True, ORANGE)
+            left_text = self.render_text(self.font_medium, "< ", ORANGE)
             screen.blit(left_text, (SCREEN_WIDTH // 2 - 200, 250))
 
         if self.selected_track < len(self.tracks) - 1:
-            right_text = self.font_medium.render(" >", True, ORANGE)
+            right_text = self.render_text(self.font_medium, " >", ORANGE)
             screen.blit(right_text, (SCREEN_WIDTH // 2 + 180, 250))
 
         # Track counter
-        counter_text = self.font_small.render(
-            f"{self.selected_track + 1} / {len(self.tracks)}", True, GRAY)
+        counter_text = self.render_text(
+            self.font_small, f"{self.selected_track + 1} / {len(self.tracks)}", GRAY)
         counter_rect = counter_text.get_rect(center=(SCREEN_WIDTH // 2, 550))
         screen.blit(counter_text, counter_rect)
-
-        # Controls
-        controls_text = self.font_small.render(
-            "LEFT/RIGHT: Navigate | ENTER: Select | ESC: Back", True, GRAY)
-        controls_rect = controls_text.get_rect(
-            center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 50))
-        screen.blit(controls_text, controls_rect)
@@ -0,0 +1 @@
+# systems package
@@ -0,0 +1,281 @@
+"""
+Offline analytics over a telemetry corpus (see src/systems/telemetry.py).
+
+analyze() reads every race recorded on one track and returns a
+TrackAnalytics with:
+
+    heatmaps      kart samples per grid cell (ANALYTICS_CELL_SIZE pixels,
+                  indexed [x, y] like the track) for all karts, the player,
+                  the AI, karts off the road, where karts left the road and
+                  where karts fell into water
+    sectors       time between consecutive checkpoints (sector i ends at
+                  checkpoint i), split into player and AI samples
+    hotspots      the busiest cells of the off-road and water heatmaps
+
+Everything is whole-array NumPy over the memory-mapped columns, a few
+million rows at a time, split at race boundaries (races are contiguous in a
+corpus). Each kart's previous sample is found by position: every sampled
+tick records all karts of a race in order, so it is kart_count rows back.
+Water respawns show up as a kart moving faster than any kart can drive
+between two samples, starting next to water.
+
+render_overlay() draws a heatmap over the track surface for saving as an
+image; tools/telemetry_report.py does all of it from the command line.
+"""
+
+import numpy as np
+import pygame
+from src.config import *
+from src.systems.telemetry import load_schema, load_telemetry
+
+HEATMAPS = ('all', 'player', 'ai', 'off_track', 'left_track', 'water')
+
+# Columns analyze() reads
+_COLUMNS = ('race', 'tick', 'kart', 'x', 'y', 'on_track', 'checkpoint')
+
+
+def races_on_track(schema, track_id, revision=None):
+    """Race ids recorded on track_id as built from revision (a pack
+    revision, None for the track built from code), and whether any race
+    lists its track.
+
+    Races on another compile of the track are left out, since their
+    positions belong to a different layout. Corpora recorded before tracks
+    (or revisions) were listed have no such information; then every race
+    (on the track) is returned.
+    """
+    info = schema.get('race_info', [])
+    if not any(race['track'] is not None for race in info):
+        return np.arange(schema['races']), False
+    return np.array([race for race, race_info in enumerate(info)
+                     if race_info['track'] == track_id and
+                     race_info.get('revision', revision) == revision],
+                    dtype=np.int64), True
+
+
+def _percentiles(samples):
+    if len(samples) == 0:
+        return {'count': 0}
+    p10, p50, p90 = np.percentile(samples, (10, 50, 90))
+    return {'count': int(len(samples)),
+            'mean': round(float(samples.mean()), 3),
+            'p10': round(float(p10), 3),
+            'p50': round(float(p50), 3),
+            'p90': round(float(p90), 3)}
+
+
+def find_hotspots(heat, cell_size, count=ANALYTICS_HOTSPOTS,
+                  radius=ANALYTICS_HOTSPOT_RADIUS):
+    """The count busiest spots of a heatmap as [{'x', 'y', 'samples'}],
+    in pixels, at least radius apart. samples counts the 3x3 cells around
+    each spot."""
+    padded = np.pad(heat, 1)
+    width, height = heat.shape
+    window = sum(padded[dx:dx + width, dy:dy + height]
+                 for dx in range(3) for dy in range(3))
+    cells = int(np.ceil(radius / cell_size))
+
+    hotspots = []
+    window = window.astype(np.float64)
+    for _ in range(count):
+        index = int(np.argmax(window))
+        i, j = divmod(index, height)
+        if window[i, j] <= 0:
+            break
+        hotspots.append({'x': (i + 0.5) * cell_size,
+                         'y': (j + 0.5) * cell_size,
+                         'samples': int(window[i, j])})
+        window[max(0, i - cells):i + cells + 1, max(0, j - cells):j + cells + 1] = 0
+    return hotspots
+
+
+class TrackAnalytics:
+    """Heatmaps, sector times and hotspots of the races on one track."""
+
+    def __init__(self, track, cell_size=ANALYTICS_CELL_SIZE):
+        self.track = track
+        self.cell_size = cell_size
+        self.width = int(np.ceil(track.width / cell_size))
+        self.height = int(np.ceil(track.height / cell_size))
+        self.heatmaps = {name: np.zeros((self.width, self.height), dtype=np.int64)
+                         for name in HEATMAPS}
+        self.races = 0
+        self.rows = 0
+        self.sector_samples = {'player': [], 'ai': []}  # Arrays per chunk
+
+    def cells(self, x, y):
+        """Flat heatmap cell index of positions."""
+        scale = np.float32(1 / self.cell_size)
+        i = np.clip((x * scale).astype(np.intp), 0, self.width - 1)
+        j = np.clip((y * scale).astype(np.intp), 0, self.height - 1)
+        return i * self.height + j
+
+    def count(self, cells, groups=1):
+        """Heatmaps of flat cell indices, groups of them interleaved."""
+        size = self.width * self.height
+        counts = np.bincount(cells, minlength=size * groups)
+        return counts.reshape(self.width, self.height, groups)
+
+    def add(self, name, x, y):
+        """Count positions into a heatmap."""
+        self.heatmaps[name] += self.count(self.cells(x, y))[..., 0]
+
+    def add_rows(self, columns, tick_rates):
+        """Analyze a block of whole races. tick_rates[race] is ticks per
+        second."""
+        race = columns['race']
+        kart = columns['kart']
+        x = columns['x']
+        y = columns['y']
+        on_track = columns['on_track']
+        checkpoint = columns['checkpoint']
+        tick = columns['tick']
+        rows = len(race)
+        self.rows += rows
+
+        player = kart == 0
+        cells = self.cells(x, y)
+        by_kart = self.count(cells * 2 + player, 2)
+        self.heatmaps['ai'] += by_kart[..., 0]
+        self.heatmaps['player'] += by_kart[..., 1]
+        self.heatmaps['all'] += by_kart[..., 0] + by_kart[..., 1]
+        self.heatmaps['off_track'] += self.count(cells[~on_track])[..., 0]
+
+        # Previous sample of the same kart: kart_count rows back in its race
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(race)) + 1))
+        lengths = np.diff(np.append(starts, rows))
+        self.races += len(starts)
+        kart_counts = np.maximum.reduceat(kart, starts).astype(np.intp) + 1
+        index = np.arange(rows)
+        previous = index - np.repeat(kart_counts, lengths)
+        valid = previous >= np.repeat(starts, lengths)
+        previous = np.where(valid, previous, index)
+        valid &= kart[previous] == kart  # Dropped rows break the pattern
+
+        left = valid & on_track[previous] & ~on_track
+        self.add('left_track', x[left], y[left])
+
+        # Water respawns: too fast to be driving, from next to water
+        ticks = (tick - tick[previous]).astype(np.float32)
+        previous_x = x[previous]
+        previous_y = y[previous]
+        limit = ticks * np.float32(ANALYTICS_TELEPORT_SPEED)
+        jumped = valid & ((x - previous_x) ** 2 + (y - previous_y) ** 2 > limit * limit)
+        from_x = previous_x[jumped]
+        from_y = previous_y[jumped]
+        reach = ticks[jumped] * MAX_SPEED  # Driven since the last sample
+        near_water = np.zeros(len(from_x), dtype=bool)
+        for water_x, water_y, radius in self.track.water_areas:
+            near_water |= np.hypot(from_x - water_x, from_y - water_y) <= radius + reach
+        self.add('water', from_x[near_water], from_y[near_water])
+
+        # Sector times: ticks between reaching consecutive checkpoints
+        reached = np.flatnonzero(valid & (checkpoint != checkpoint[previous]) &
+                                 (checkpoint >= 0))
+        order = np.lexsort((reached, kart[reached], race[reached]))
+        reached = reached[order]
+        same_kart = (race[reached][1:] == race[reached][:-1]) & \
+            (kart[reached][1:] == kart[reached][:-1])
+        count = len(self.track.checkpoints)
+        after, before = reached[1:], reached[:-1]
+        next_in_order = checkpoint[after] == (checkpoint[before] + 1) % count
+        sector = same_kart & next_in_order
+        after, before = after[sector], before[sector]
+        seconds = (tick[after] - tick[before]) / tick_rates[race[after]]
+        for group, mask in (('player', player[after]), ('ai', ~player[after])):
+            self.sector_samples[group].append(
+                np.stack((checkpoint[after][mask].astype(np.float64), seconds[mask])))
+
+    def sectors(self):
+        """{'player': [...], 'ai': [...]} with one time distribution per
+        sector, and the sectors where the player loses the most time to the
+        AI (by median) in 'slowest'."""
+        result = {}
+        for group, chunks in self.sector_samples.items():
+            samples = np.concatenate(chunks, axis=1) if chunks else np.zeros((2, 0))
+            result[group] = [_percentiles(samples[1][samples[0] == sector])
+                             for sector in range(len(self.track.checkpoints))]
+        losses = []
+        for sector, (player, ai) in enumerate(zip(result['player'], result['ai'])):
+            if player['count'] and ai['count']:
+                losses.append({'sector': sector,
+                               'player_p50': player['p50'],
+                               'ai_p50': ai['p50'],
+                               'loss': round(player['p50'] - ai['p50'], 3)})
+        result['slowest'] = sorted(losses, key=lambda loss: -loss['loss'])
+        return result
+
+    def hotspots(self):
+        return {'left_track': find_hotspots(self.heatmaps['left_track'], self.cell_size),
+                'water': find_hotspots(self.heatmaps['water'], self.cell_size)}
+
+    def report(self):
+        """JSON-ready summary."""
+        return {'track': self.track.track_id,
+                'races': self.races,
+                'rows': self.rows,
+                'cell_size': self.cell_size,
+                'samples': {name: int(heat.sum()) for name, heat in self.heatmaps.items()},
+                'sectors': self.sectors(),
+                'hotspots': self.hotspots()}
+
+
+def analyze(directory, track, races=None, chunk_rows=ANALYTICS_CHUNK_ROWS):
+    """Analyze a corpus's races on track (by default every race recorded on
+    track.track_id as built from track.revision). Returns a TrackAnalytics."""
+    schema = load_schema(directory)
+    if schema is None:
+        raise FileNotFoundError(f"No telemetry corpus in {directory}")
+    if races is None:
+        races, _ = races_on_track(schema, track.track_id, track.revision)
+    analytics = TrackAnalytics(track)
+    if schema['rows'] == 0 or len(races) == 0:
+        return analytics
+
+    columns = load_telemetry(directory)
+    info = schema.get('race_info', [])
+    tick_rates = np.array([race['tick_rate'] for race in info] +
+                          [FPS] * (schema['races'] - len(info)), dtype=np.float64)
+
+    # Races are contiguous and in order: find their rows by bisection
+    races = np.unique(races)
+    bounds = np.searchsorted(columns['race'], np.stack((races, races + 1)))
+    spans = [(start, end) for start, end in bounds.T if end > start]
+
+    # Group neighbouring races into blocks of about chunk_rows
+    blocks = [[]]
+    block_rows = 0
+    for start, end in spans:
+        if blocks[-1] and block_rows + end - start > chunk_rows:
+            blocks.append([])
+            block_rows = 0
+        blocks[-1].append((start, end))
+        block_rows += end - start
+
+    for block in blocks:
+        if len(block) == 1:
+            picked = slice(*block[0])
+        else:
+            picked = np.concatenate([np.arange(start, end) for start, end in block])
+        analytics.add_rows({name: np.asarray(columns[name][picked])
+                            for name in _COLUMNS}, tick_rates)
+    return analytics
+
+
+def render_overlay(surface, heat, cell_size, color, hotspots=()):
+    """A copy of surface with heat drawn over it in color (opacity grows with
+    the log of the count) and hotspots circled."""
+    image = surface.copy()
+    if heat.max() > 0:
+        level = np.log1p(heat) / np.log1p(heat.max())
+        layer = pygame.Surface(heat.shape, pygame.SRCALPHA)
+        layer.fill(color)
+        alpha = pygame.surfarray.pixels_alpha(layer)
+        alpha[:] = (level * 220).astype(np.uint8)
+        del alpha
+        image.blit(pygame.transform.smoothscale(layer, surface.get_size()), (0, 0))
+    for hotspot in hotspots:
+        center = (int(hotspot['x']), int(hotspot['y']))
+        pygame.draw.circle(image, WHITE, center, ANALYTICS_HOTSPOT_RADIUS, 3)
+        pygame.draw.circle(image, color[:3], center, 6)
+    return image
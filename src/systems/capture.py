@@ -0,0 +1,195 @@
+"""
+Non-blocking frame capture for highlight clips.
+
+capture() copies a finished frame (one memcpy of the display surface's
+32-bit pixels, about half a millisecond at 1200x800) into a buffer from a
+fixed pool and queues it for background writers. If every buffer is still
+waiting to be written the frame is dropped and counted, so a slow disk or
+encoder never stalls the game loop. Headless runs can block instead and
+capture every frame as fast as the writers allow.
+
+Frames are written either as a PNG sequence (frame_000123.png, numbered by
+captured frame so drops show up as gaps) or piped as raw pixels into an
+encoder process, e.g. ffmpeg (see CAPTURE_ENCODER). PNGs are encoded here
+with zlib, which releases the GIL; pygame.image.save holds it for ~70ms a
+frame.
+"""
+
+import os
+import time
+import zlib
+import queue
+import shlex
+import struct
+import threading
+import subprocess
+import numpy as np
+import pygame
+from src.config import *
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_chunk(tag, data):
+    return (struct.pack('>I', len(data)) + tag + data +
+            struct.pack('>I', zlib.crc32(tag + data)))
+
+
+def _lower_priority(native_id):
+    """Nice a writer thread or encoder process so the game loop keeps the
+    CPU when they compete for it (Linux nices threads individually)."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, native_id, CAPTURE_WRITER_NICE)
+    except (AttributeError, OSError):
+        pass  # Not supported here: writers just run at normal priority
+
+
+def pixel_layout(surface):
+    """Byte offsets of red, green and blue in a 32-bit surface's pixels."""
+    if surface.get_bytesize() != 4:
+        raise ValueError("Frame capture needs a 32-bit display surface")
+    shifts = surface.get_shifts()[:3]
+    if any(shift % 8 for shift in shifts):
+        raise ValueError(f"Unsupported pixel format (shifts {shifts})")
+    if pygame.get_sdl_byteorder() == pygame.LIL_ENDIAN:
+        return tuple(shift // 8 for shift in shifts)
+    return tuple(3 - shift // 8 for shift in shifts)
+
+
+def encoder_pixel_format(layout):
+    """ffmpeg name of the raw pixel format, e.g. 'bgr0'."""
+    names = ['0'] * 4
+    for channel, offset in zip('rgb', layout):
+        names[offset] = channel
+    return ''.join(names)
+
+
+class PngEncoder:
+    """Writes (height, width) uint32 frames as RGB PNGs (one per writer)."""
+
+    def __init__(self, width, height, layout, level=CAPTURE_PNG_LEVEL):
+        self.layout = layout
+        self.level = level
+        self.header = PNG_SIGNATURE + _png_chunk(
+            b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        # Each row starts with its filter type byte (0, none)
+        self.rows = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+        self.rgb = self.rows[:, 1:].reshape(height, width, 3)
+
+    def write(self, path, frame):
+        pixels = frame.view(np.uint8).reshape(frame.shape + (4,))
+        for channel, offset in enumerate(self.layout):
+            self.rgb[..., channel] = pixels[..., offset]
+        data = zlib.compress(self.rows, self.level)
+        with open(path, 'wb') as f:
+            f.write(self.header + _png_chunk(b'IDAT', data) + _png_chunk(b'IEND', b''))
+
+
+class FrameCapture:
+    """Copies rendered frames into pooled buffers for background writers."""
+
+    def __init__(self, screen, directory=CAPTURE_DIR, encoder=CAPTURE_ENCODER,
+                 pool_size=CAPTURE_POOL_SIZE, writers=CAPTURE_WRITERS,
+                 block=False):
+        self.width, self.height = screen.get_size()
+        self.layout = pixel_layout(screen)
+        self.block = block  # Wait for a free buffer instead of dropping
+        self.frames = 0  # Frames offered to capture()
+        self.captured = 0
+        self.dropped = 0
+        self.written = 0
+        self.error = None
+        self.lock = threading.Lock()  # Guards the counters writers update
+
+        # The encoder's output name, or the directory of PNGs
+        self.path = os.path.join(directory, time.strftime("capture-%Y%m%d-%H%M%S"))
+        self.process = None
+        if encoder:
+            os.makedirs(directory, exist_ok=True)
+            command = encoder.format(width=self.width, height=self.height,
+                                     fps=FPS, output=self.path,
+                                     pix_fmt=encoder_pixel_format(self.layout))
+            self.process = subprocess.Popen(shlex.split(command),
+                                            stdin=subprocess.PIPE)
+            _lower_priority(self.process.pid)
+            writers = 1  # Frames must reach the encoder in order
+        else:
+            os.makedirs(self.path, exist_ok=True)
+
+        self.free_buffers = queue.Queue()
+        for _ in range(pool_size):
+            self.free_buffers.put(np.empty((self.height, self.width), dtype=np.uint32))
+        self.pending_frames = queue.Queue()
+
+        self.writers = [threading.Thread(target=self._write_frames, daemon=True,
+                                         name=f"capture-writer-{i}")
+                        for i in range(writers)]
+        for writer in self.writers:
+            writer.start()
+
+    def capture(self, screen):
+        """Queue a copy of screen. Returns False if the frame was dropped."""
+        index = self.frames
+        self.frames += 1
+        try:
+            buffer = self.free_buffers.get(self.block and self.error is None)
+        except queue.Empty:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+        view = pygame.surfarray.pixels2d(screen)
+        np.copyto(buffer, view.T)
+        del view  # Unlock the surface before it is flipped
+
+        self.pending_frames.put((index, buffer))
+        self.captured += 1
+        return True
+
+    def close(self):
+        """Write everything queued, then stop the writers and the encoder."""
+        for _ in self.writers:
+            self.pending_frames.put(None)
+        for writer in self.writers:
+            writer.join()
+        if self.process:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+            self.process.wait()
+
+    def summary(self):
+        """One-line capture summary for the console."""
+        text = (f"Captured {self.written} frames to {self.path} "
+                f"({self.dropped} dropped)")
+        if self.error:
+            text += f"; writer stopped: {self.error}"
+        return text
+
+    def _write_frames(self):
+        """Writer thread: encode or pipe queued frames, recycling buffers."""
+        _lower_priority(threading.get_native_id())
+        encoder = None if self.process else \
+            PngEncoder(self.width, self.height, self.layout)
+        while True:
+            item = self.pending_frames.get()
+            if item is None:
+                break
+            index, buffer = item
+            if self.error is None:
+                try:
+                    if self.process:
+                        self.process.stdin.write(buffer.data)
+                    else:
+                        encoder.write(os.path.join(self.path, f"frame_{index:06d}.png"),
+                                      buffer)
+                    with self.lock:
+                        self.written += 1
+                except OSError as error:
+                    # Disk full or the encoder exited: drop from here on
+                    self.error = error
+            if self.error is not None:
+                with self.lock:
+                    self.dropped += 1
+            self.free_buffers.put(buffer)
@@ -0,0 +1,239 @@
+"""
+Predicted lap times for kart configurations.
+
+predict_lap() drives one kart with a given configuration around a track
+without a display and reports its standing-start lap time and top speed.
+The driver is an AI that follows the track's flow field through the same
+throttle/steer controls as the player, so acceleration and turn speed
+matter exactly as they do in a race (AIKart steers directly and would hide
+the turn speed).
+LapPredictor runs those simulations in a worker process so the menu keeps
+its frame rate (a thread would compete with it for the GIL):
+
+    request()  remember the newest configuration and hand it to the worker;
+               a job still running for an older one gives up at its next
+               check, so holding an arrow key never queues up stale work
+    poll()     collect finished predictions (save() writes the memo; the
+               customization screen defers it to the frame scheduler)
+
+Results are memoized by (track, pack revision, driving attributes) in a
+JSON file, so a configuration is only ever simulated once per track, and
+once more whenever the track's pack is recompiled or replaced.
+"""
+
+import os
+import math
+import json
+import signal
+import multiprocessing
+from src.config import *
+from src.entities.kart import Kart
+from src.scenes.game_scene import RaceManager
+from src.track.track import Track
+from src.track.packs import track_revision
+
+# Bump when kart physics or AI driving change, to ignore older predictions
+PREDICTION_VERSION = 2
+
+# Attributes that change how a kart drives (the color does not)
+PREDICTION_ATTRIBUTES = ('max_speed', 'acceleration', 'turn_speed')
+
+
+def prediction_key(track_id, revision, config):
+    """Memo key of a (track, configuration) pair; revision is the track's
+    pack revision (None for tracks built from code)."""
+    values = ":".join(f"{float(config[name]):.3f}" for name in PREDICTION_ATTRIBUTES)
+    return f"v{PREDICTION_VERSION}:{track_id}:{revision or 'code'}:{values}"
+
+
+def flow_controls(kart, flow_field):
+    """(throttle, steer) toward a point a look-ahead along the flow field,
+    braking before the road bends further on."""
+    x, y = kart.x, kart.y
+    step = LAP_PREDICTION_LOOK_AHEAD / 3
+    first_dx, first_dy = flow_field.direction_at(x, y)
+    aim_x, aim_y = x, y
+    for i in range(6):
+        dx, dy = flow_field.direction_at(x, y)
+        x += dx * step
+        y += dy * step
+        if i == 2:
+            aim_x, aim_y = x, y
+
+    angle_diff = math.degrees(math.atan2(aim_y - kart.y, aim_x - kart.x)) - kart.angle
+    angle_diff = (angle_diff + 180) % 360 - 180
+    steer = max(-1.0, min(1.0, angle_diff / kart.turn_speed))
+
+    # Cosine of how far the flow turns over two look-aheads
+    bend = first_dx * dx + first_dy * dy
+    target_speed = kart.max_speed * max(LAP_PREDICTION_CORNER_SPEED, bend)
+    if kart.speed > target_speed + kart.acceleration:
+        return -1, steer
+    return (1 if kart.speed < target_speed else 0), steer
+
+
+def predict_lap(track, config, cancelled=None):
+    """Race one kart with config until it completes a lap.
+
+    Returns {'lap_time': seconds or None if no lap within
+    LAP_PREDICTION_MAX_TIME, 'top_speed': pixels per tick}, or None if
+    cancelled() became true first.
+    """
+    # Standing start on the start line, facing the next checkpoint, so the
+    # lap begins on the first tick (the grid slots can miss the line and
+    # leave a whole out-lap before lap 1). The flow field's cell at the
+    # line can point across a bend, which would steer the kart off the road
+    flow_field = track.get_flow_field()
+    x, y = track.start_line
+    kart = Kart(x, y, is_player=True, config=config)
+    next_x, next_y = track.checkpoints[1 % len(track.checkpoints)]
+    kart.angle = math.degrees(math.atan2(next_y - y, next_x - x))
+    kart.set_respawn_point(x, y, kart.angle)
+    race_manager = RaceManager([kart], track)
+
+    dt = 1.0 / FPS
+    top_speed = 0.0
+    lap_start = None
+    for tick in range(int(LAP_PREDICTION_MAX_TIME * FPS)):
+        if cancelled is not None and tick % LAP_PREDICTION_CHECK_TICKS == 0 \
+                and cancelled():
+            return None
+        kart.controls = flow_controls(kart, flow_field)
+        kart.update(dt, track)
+        race_manager.update(dt)
+        top_speed = max(top_speed, kart.speed)
+
+        # The first start-line crossing (the first tick) begins lap 1
+        if lap_start is None and kart.current_lap >= 1:
+            lap_start = tick
+        elif kart.current_lap >= 2:
+            return {'lap_time': (tick - lap_start) * dt, 'top_speed': top_speed}
+    return {'lap_time': None, 'top_speed': top_speed}
+
+
+def _prediction_worker(conn, latest):
+    """Worker loop: predict requested laps until told to stop.
+
+    latest holds the id of the newest request; anything older is skipped or
+    abandoned.
+    """
+    # SDL's handler (inherited through fork) turns SIGTERM into a quit
+    # event nobody reads here, which would stop terminate() at exit
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    tracks = {}
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+            job_id, track_id, revision, config = request
+            if job_id != latest.value:
+                continue  # Superseded while queued
+            if (track_id, revision) not in tracks:
+                tracks[track_id, revision] = Track(track_id, render=False)
+            result = predict_lap(tracks[track_id, revision], config,
+                                 lambda: latest.value != job_id)
+            if result is not None:
+                conn.send((track_id, revision, config, result))
+    finally:
+        conn.close()
+
+
+class LapPredictor:
+    """Memoized lap predictions computed in a background process."""
+
+    def __init__(self, cache_path=LAP_PREDICTION_CACHE):
+        self.cache_path = cache_path  # None keeps predictions in memory only
+        self.results = self.load()
+        self.pending = None  # Key of the newest request still simulating
+
+        # Started on the first request that misses the memo
+        self.process = None
+        self.conn = None
+        self.latest = None
+        self.job_id = 0
+
+    def load(self):
+        if self.cache_path and os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass  # Corrupt or unreadable: start over
+        return {}
+
+    def save(self):
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = self.cache_path + ".tmp"
+        with open(temporary, 'w') as f:
+            json.dump(self.results, f)
+        os.replace(temporary, self.cache_path)
+
+    def start(self):
+        if self.process is not None:
+            return
+        self.latest = multiprocessing.Value('q', 0, lock=False)
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_prediction_worker, args=(child_conn, self.latest),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def request(self, track_id, config):
+        """Predict config on a track, superseding any earlier request.
+
+        Returns the memoized prediction, or None if it is being simulated.
+        """
+        revision = track_revision(track_id)
+        key = prediction_key(track_id, revision, config)
+        if key in self.results:
+            self.pending = None
+            return self.results[key]
+        if key == self.pending:
+            return None
+        self.start()
+        self.job_id += 1
+        self.latest.value = self.job_id
+        self.conn.send((self.job_id, track_id, revision,
+                        {name: config[name] for name in PREDICTION_ATTRIBUTES}))
+        self.pending = key
+        return None
+
+    def poll(self):
+        """Store predictions the worker has finished since the last poll.
+        Returns True if there were any."""
+        if self.conn is None:
+            return False
+        finished = False
+        while self.conn.poll():
+            track_id, revision, config, result = self.conn.recv()
+            key = prediction_key(track_id, revision, config)
+            self.results[key] = result
+            if key == self.pending:
+                self.pending = None
+            finished = True
+        return finished
+
+    def get(self, track_id, config):
+        """Memoized prediction, or None if not simulated yet."""
+        return self.results.get(prediction_key(track_id, track_revision(track_id), config))
+
+    def close(self):
+        """Stop the worker (abandoning any running job)."""
+        if self.process is None:
+            return
+        self.latest.value = -1
+        self.conn.send(None)
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+        self.pending = None
@@ -0,0 +1,107 @@
+"""
+Input-to-display latency tracing.
+
+Every key event is followed through three points:
+
+    input     the event was pumped from SDL (pygame 2 does not expose SDL's
+              own event timestamps, so this is when the game first saw it)
+    sampled   keyboard state was read for the simulation
+    flip      the first frame showing a tick that consumed the sample was
+              flipped
+
+Samples are (input -> sampled, sampled -> flip, input -> flip) in
+milliseconds, kept in a preallocated ring. The simulation may run on another
+thread (pipelined mode), so the hand-offs are guarded by a lock; the lists it
+guards hold only the few events of the current frame.
+"""
+
+import time
+import threading
+import numpy as np
+from src.config import *
+
+LATENCY_STAGES = ('input_to_sample', 'sample_to_flip', 'input_to_flip')
+
+
+class LatencyTracer:
+    """Tags input events with the tick that consumed them and the flip that
+    showed it, and reports latency percentiles."""
+
+    def __init__(self, capacity=LATENCY_SAMPLES):
+        self.lock = threading.Lock()
+        self.pending = []  # Input times not sampled yet
+        self.sampled = []  # (input time, sample time) awaiting a tick
+        self.consumed = []  # (tick, input time, sample time) awaiting a flip
+
+        self.samples = np.zeros((capacity, len(LATENCY_STAGES)), dtype=np.float32)
+        self.capacity = capacity
+        self.count = 0
+
+    def input(self, timestamp=None):
+        """An input event was pumped."""
+        with self.lock:
+            self.pending.append(time.perf_counter() if timestamp is None
+                                else timestamp)
+
+    def sample(self):
+        """Keyboard state was read for the simulation."""
+        now = time.perf_counter()
+        with self.lock:
+            self.sampled.extend((input_time, now) for input_time in self.pending)
+            self.pending.clear()
+
+    def consume(self, tick):
+        """A simulation tick applied everything sampled so far."""
+        with self.lock:
+            self.consumed.extend((tick, input_time, sample_time)
+                                 for input_time, sample_time in self.sampled)
+            self.sampled.clear()
+
+    def flip(self, displayed_tick):
+        """A frame showing displayed_tick was flipped."""
+        now = time.perf_counter()
+        with self.lock:
+            waiting = []
+            for entry in self.consumed:
+                tick, input_time, sample_time = entry
+                if tick > displayed_tick:
+                    waiting.append(entry)
+                    continue
+                row = self.samples[self.count % self.capacity]
+                row[0] = (sample_time - input_time) * 1000
+                row[1] = (now - sample_time) * 1000
+                row[2] = (now - input_time) * 1000
+                self.count += 1
+            self.consumed = waiting
+
+    def reset(self):
+        """Forget everything in flight (e.g. on scene changes)."""
+        with self.lock:
+            self.pending.clear()
+            self.sampled.clear()
+            self.consumed.clear()
+
+    def report(self):
+        """Percentiles per stage, in milliseconds."""
+        samples = self.samples[:min(self.count, self.capacity)]
+        report = {'samples': int(self.count)}
+        for column, stage in enumerate(LATENCY_STAGES):
+            values = samples[:, column]
+            if len(values) == 0:
+                report[stage] = None
+                continue
+            p50, p90, p99 = np.percentile(values, (50, 90, 99))
+            report[stage] = {'p50_ms': round(float(p50), 3),
+                             'p90_ms': round(float(p90), 3),
+                             'p99_ms': round(float(p99), 3),
+                             'max_ms': round(float(values.max()), 3)}
+        return report
+
+    def summary(self):
+        """One-line input-to-flip summary for the console."""
+        total = self.report()['input_to_flip']
+        if total is None:
+            return "Input latency: no samples"
+        return (f"Input-to-flip latency over {self.count} inputs: "
+                f"p50 {total['p50_ms']:.1f} ms, p90 {total['p90_ms']:.1f} ms, "
+                f"p99 {total['p99_ms']:.1f} ms, max {total['max_ms']:.1f} ms")
@@ -0,0 +1,197 @@
+"""
+Memory diagnostics across scene transitions.
+
+With MEMORY_DIAGNOSTICS on, Game snapshots memory after every scene change
+(and at startup and exit):
+
+    traced   bytes Python has allocated since tracemalloc started, and the
+             peak since the previous snapshot
+    sites    the allocation sites (file:line) that grew or shrank the most
+             since the previous snapshot
+    live     how many Surface, Kart and Track objects are reachable, and the
+             bytes of surface pixels they own
+
+Each snapshot is printed as a short summary and appended to a per-session
+timeline (memory-<date>-<time>.jsonl in MEMORY_DIR, one JSON record per
+line, flushed as it goes) so soak tests can chart growth over hours and
+still keep what was written if the process dies.
+
+Tracing every allocation slows Python down noticeably and a snapshot takes
+a fraction of a second, so this is a diagnostics mode, not something to
+leave on.
+"""
+
+import gc
+import os
+import json
+import time
+import tracemalloc
+import pygame
+from src.config import *
+
+# Allocations made by the diagnostics themselves are not interesting
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>")
+]
+
+
+def resident_bytes():
+    """Resident set size of this process, or None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def count_live_objects():
+    """Reachable Surface, Kart and Track objects and the surface bytes.
+
+    Karts and tracks are found among the objects the garbage collector
+    tracks. Surfaces are not tracked themselves, and neither are dicts and
+    tuples holding only untracked values (e.g. a cache of rendered text), so
+    surfaces are found by following references out of the tracked objects
+    through any untracked containers. Subsurfaces share their parent's
+    pixels and add no bytes.
+    """
+    from src.entities.kart import Kart
+    from src.track.track import Track
+
+    gc.collect()
+    objects = gc.get_objects()
+    karts = sum(1 for obj in objects if isinstance(obj, Kart))
+    tracks = sum(1 for obj in objects if isinstance(obj, Track))
+
+    # Tracked objects are all in objects already; only untracked ones can
+    # lead anywhere new
+    surfaces = {}
+    seen = set()
+    frontier = objects
+    while frontier:
+        referents = gc.get_referents(*frontier)
+        frontier = []
+        for obj in referents:
+            if gc.is_tracked(obj) or id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            if isinstance(obj, pygame.Surface):
+                surfaces[id(obj)] = obj
+            elif isinstance(obj, (dict, tuple)):
+                frontier.append(obj)
+    del objects, referents
+
+    surface_bytes = 0
+    for surface in surfaces.values():
+        if surface.get_parent() is None:
+            surface_bytes += surface.get_pitch() * surface.get_height()
+    return {'Surface': len(surfaces), 'Kart': karts, 'Track': tracks}, surface_bytes
+
+
+class MemoryTracker:
+    """Snapshots memory at scene transitions into a session timeline."""
+
+    def __init__(self, directory=MEMORY_DIR, top_sites=MEMORY_TOP_SITES,
+                 frames=MEMORY_TRACEBACK_FRAMES):
+        self.top_sites = top_sites
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.started = time.perf_counter()
+        self.previous = None  # Last tracemalloc snapshot
+        self.records = []
+
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(
+            directory, time.strftime("memory-%Y%m%d-%H%M%S.jsonl"))
+        self.timeline = open(self.path, 'w')
+        self.snapshot("start")
+
+    def snapshot(self, label):
+        """Record memory now, diffed against the previous snapshot.
+        Returns the timeline record."""
+        live, surface_bytes = count_live_objects()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        traced, peak = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+
+        sites = []
+        if self.previous is not None:
+            for stat in snapshot.compare_to(self.previous, 'lineno')[:self.top_sites]:
+                if not stat.size_diff:
+                    break
+                frame = stat.traceback[0]
+                sites.append({'site': f"{frame.filename}:{frame.lineno}",
+                              'size_diff': stat.size_diff,
+                              'count_diff': stat.count_diff,
+                              'size': stat.size})
+        self.previous = snapshot
+
+        last = self.records[-1] if self.records else None
+        record = {'label': label,
+                  'elapsed': round(time.perf_counter() - self.started, 3),
+                  'traced_bytes': traced,
+                  'traced_diff': traced - last['traced_bytes'] if last else 0,
+                  'peak_bytes': peak,
+                  'rss_bytes': resident_bytes(),
+                  'live': live,
+                  'surface_bytes': surface_bytes,
+                  'top_sites': sites}
+        self.records.append(record)
+        self.timeline.write(json.dumps(record) + "\n")
+        self.timeline.flush()
+        print(self.describe(record))
+        return record
+
+    def describe(self, record, sites=3):
+        """Console summary of a record with its largest changes."""
+        live = record['live']
+        lines = [f"Memory [{record['label']}]: traced "
+                 f"{record['traced_bytes'] / 1e6:.1f} MB "
+                 f"({record['traced_diff'] / 1e6:+.2f} MB), "
+                 f"{live['Surface']} surfaces "
+                 f"({record['surface_bytes'] / 1e6:.1f} MB), "
+                 f"{live['Kart']} karts, {live['Track']} tracks"]
+        for site in record['top_sites'][:sites]:
+            lines.append(f"  {site['size_diff'] / 1e3:+9.1f} KB "
+                         f"{site['count_diff']:+7d} blocks  {site['site']}")
+        return "\n".join(lines)
+
+    def report(self):
+        """Growth per label and the latest live counts, for the frame harness.
+
+        Growth runs from the middle snapshot with a label to the last one:
+        early passes through a transition include one-off warm-up (fonts,
+        per-track caches), which would hide a steady leak behind a big jump.
+        """
+        seen = {}
+        growth = {}
+        for record in self.records:
+            seen.setdefault(record['label'], []).append(record)
+        for label, records in seen.items():
+            if len(records) < 2:
+                continue
+            start, end = records[len(records) // 2], records[-1]
+            growth[label] = {
+                'snapshots': len(records),
+                'traced_bytes': end['traced_bytes'] - start['traced_bytes'],
+                'surfaces': end['live']['Surface'] - start['live']['Surface'],
+                'karts': end['live']['Kart'] - start['live']['Kart'],
+                'tracks': end['live']['Track'] - start['live']['Track']}
+        return {'timeline': self.path,
+                'snapshots': len(self.records),
+                'traced_bytes': self.records[-1]['traced_bytes'],
+                'live': self.records[-1]['live'],
+                'growth': growth}
+
+    def close(self):
+        """Take the exit snapshot and stop tracing."""
+        if self.timeline.closed:
+            return
+        self.snapshot("exit")
+        self.timeline.close()
+        self.previous = None
+        tracemalloc.stop()
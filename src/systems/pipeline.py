@@ -0,0 +1,152 @@
+"""
+Pipelined simulation: race ticks on a worker thread, rendering on the main one.
+
+The simulation thread advances a scene at a fixed rate and publishes an
+immutable RaceSnapshot after every tick. SnapshotBuffer keeps the last two
+(double buffering) and swaps them with a single reference assignment, so the
+renderer always sees a consistent pair without taking a lock and can
+interpolate between them.
+"""
+
+import time
+import threading
+from collections import namedtuple
+from src.config import *
+from src.entities.kart import read_keyboard_controls
+
+KartState = namedtuple('KartState', [
+    'x', 'y', 'angle', 'speed', 'current_lap', 'race_position', 'item',
+    'on_track'
+])
+
+RaceSnapshot = namedtuple('RaceSnapshot', [
+    'tick',
+    'time',  # perf_counter() when the tick finished
+    'karts',  # Tuple of KartState, in scene kart order
+    'race_started',
+    'race_finished',
+    'countdown_timer',
+    'race_timer',
+    'particles',  # ParticleSystem.snapshot()
+    'items'  # ItemSystem.snapshot()
+])
+
+
+def capture_kart(kart):
+    """Immutable copy of the kart fields the renderer needs."""
+    return KartState(kart.x, kart.y, kart.angle, kart.speed,
+                     kart.current_lap, kart.race_position, kart.item,
+                     kart.on_track)
+
+
+def interpolate(previous, current, alpha):
+    """Blend kart poses between two snapshots (alpha 0 -> previous, 1 -> current).
+
+    Everything else comes from the current snapshot. Karts that moved further
+    than SNAPSHOT_TELEPORT_DISTANCE (respawns, restarts) snap to it.
+    """
+    if previous is None or alpha >= 1.0 or len(previous.karts) != len(current.karts):
+        return current
+
+    karts = []
+    for before, after in zip(previous.karts, current.karts):
+        dx = after.x - before.x
+        dy = after.y - before.y
+        if dx * dx + dy * dy > SNAPSHOT_TELEPORT_DISTANCE ** 2:
+            karts.append(after)
+            continue
+        karts.append(after._replace(
+            x=before.x + dx * alpha,
+            y=before.y + dy * alpha,
+            angle=before.angle + (after.angle - before.angle) * alpha))
+    return current._replace(karts=tuple(karts))
+
+
+class SnapshotBuffer:
+    """The latest two snapshots, published by one writer thread."""
+
+    def __init__(self):
+        self.pair = (None, None)
+
+    def publish(self, snapshot):
+        # Rebinding one attribute is atomic, so readers never see a torn pair
+        self.pair = (self.pair[1], snapshot)
+
+    def latest(self):
+        return self.pair[1]
+
+    def get_interpolated(self, tick_dt, now=None):
+        """Snapshot for rendering now, one tick behind the simulation."""
+        previous, current = self.pair
+        if current is None:
+            return None
+        if now is None:
+            now = time.perf_counter()
+        alpha = min(1.0, max(0.0, (now - current.time) / tick_dt))
+        return interpolate(previous, current, alpha)
+
+
+class SimulationThread(threading.Thread):
+    """Ticks scene.simulate(dt) at a fixed rate and publishes snapshots.
+
+    The scene provides simulate(dt), capture_snapshot() and a lock that
+    guards its state against the main thread's event handling.
+    """
+
+    def __init__(self, scene, tick_rate=SIM_TICK_RATE):
+        super().__init__(name="simulation", daemon=True)
+        self.scene = scene
+        self.tick_dt = 1.0 / tick_rate
+        self.buffer = SnapshotBuffer()
+        self.running = False
+        self.ticks = 0
+        self.skipped_ticks = 0
+
+        # Latest sampled (throttle, steer), handed over by the main thread
+        self.controls = (0, 0)
+
+    def start(self):
+        # Set before the thread exists, so a stop() right after start()
+        # cannot be undone by the worker starting late
+        self.running = True
+        super().start()
+
+    def run(self):
+        next_tick = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            if now < next_tick:
+                time.sleep(next_tick - now)
+                continue
+
+            controls = self.controls
+            if LATE_INPUT_SAMPLING:
+                # Read the keyboard right before the tick instead of waiting
+                # for the main thread's hand-off
+                controls = read_keyboard_controls()
+                if self.scene.game.latency:
+                    self.scene.game.latency.sample()
+
+            with self.scene.lock:
+                self.scene.simulate(self.tick_dt, controls)
+                self.ticks += 1
+                snapshot = self.scene.capture_snapshot()
+            self.buffer.publish(snapshot)
+
+            # Fall behind by too much (e.g. a stall) and skip ahead instead
+            # of running a burst of catch-up ticks
+            next_tick += self.tick_dt
+            behind = int((time.perf_counter() - next_tick) / self.tick_dt)
+            if behind > SIM_MAX_CATCH_UP_TICKS:
+                self.skipped_ticks += behind
+                next_tick += behind * self.tick_dt
+
+    def submit_input(self, controls):
+        """Hand the latest (throttle, steer) sample to the next tick."""
+        self.controls = controls
+
+    def stop(self):
+        """Stop ticking and wait for the current tick to finish."""
+        self.running = False
+        if self.is_alive():
+            self.join()
@@ -0,0 +1,96 @@
+"""
+Adaptive quality controller that trades visual detail for frame rate.
+"""
+
+import numpy as np
+from src.config import *
+
+
+class QualityController:
+    """Watches frame work time and steps through QUALITY_LEVELS.
+
+    Downgrades quickly when the 90th percentile of recent frame work time
+    eats into the frame budget, and only upgrades after a sustained period of
+    headroom. An upgrade that is followed by a quick downgrade doubles the
+    hold time, so quality settles instead of oscillating.
+    """
+
+    def __init__(self, target_fps=FPS, levels=QUALITY_LEVELS, enabled=ADAPTIVE_QUALITY):
+        self.levels = levels
+        self.enabled = enabled
+        self.budget_ms = 1000.0 / target_fps
+
+        self.frame_times = np.zeros(QUALITY_WINDOW, dtype=np.float32)
+        self.frame_count = 0
+        self.level = 0
+        self.frames_since_change = 0
+        self.upgrade_hold = QUALITY_UPGRADE_HOLD
+        self.last_change_was_upgrade = False
+        self.p50_ms = 0.0
+        self.p90_ms = 0.0
+
+        # (frame, old level name, new level name, p90 ms) for logging
+        self.changes = []
+
+    @property
+    def settings(self):
+        """Settings dict of the current quality level."""
+        return self.levels[self.level]
+
+    def record(self, work_ms):
+        """Record one frame's work time (excluding the frame-cap sleep)."""
+        self.frame_times[self.frame_count % QUALITY_WINDOW] = work_ms
+        self.frame_count += 1
+        self.frames_since_change += 1
+
+        if self.frame_count % QUALITY_EVAL_INTERVAL == 0:
+            self.evaluate()
+
+    def evaluate(self):
+        """Decide whether to change quality level."""
+        samples = self.frame_times[:min(self.frame_count, QUALITY_WINDOW)]
+        self.p50_ms, self.p90_ms = np.percentile(samples, (50, 90))
+
+        if not self.enabled or self.frame_count < QUALITY_WINDOW:
+            return
+
+        if self.p90_ms > self.budget_ms * QUALITY_DOWNGRADE_RATIO:
+            if self.frames_since_change >= QUALITY_COOLDOWN and \
+                    self.level < len(self.levels) - 1:
+                # Back off harder if the last upgrade did not stick
+                if self.last_change_was_upgrade and \
+                        self.frames_since_change < self.upgrade_hold:
+                    self.upgrade_hold = min(self.upgrade_hold * 2,
+                                            QUALITY_MAX_UPGRADE_HOLD)
+                self.set_level(self.level + 1)
+        elif self.p90_ms < self.budget_ms * QUALITY_UPGRADE_RATIO:
+            if self.frames_since_change >= self.upgrade_hold and self.level > 0:
+                self.set_level(self.level - 1)
+
+    def set_level(self, level):
+        """Switch to a quality level and log the decision."""
+        level = max(0, min(level, len(self.levels) - 1))
+        if level == self.level:
+            return
+
+        self.changes.append((self.frame_count, self.levels[self.level]['name'],
+                             self.levels[level]['name'], float(self.p90_ms)))
+        self.last_change_was_upgrade = level < self.level
+        self.level = level
+        self.frames_since_change = 0
+        # Restart the window so stale frames do not trigger another change
+        self.frame_times[:] = self.budget_ms * QUALITY_UPGRADE_RATIO
+        self.frame_count = max(self.frame_count, QUALITY_WINDOW)
+
+    def get_decisions(self):
+        """Current decisions and frame-time stats, for logging."""
+        decisions = dict(self.settings)
+        decisions.update({
+            'level': self.level,
+            'p50_ms': round(float(self.p50_ms), 2),
+            'p90_ms': round(float(self.p90_ms), 2),
+            'budget_ms': round(self.budget_ms, 2),
+            'upgrade_hold': self.upgrade_hold,
+            'changes': len(self.changes)
+        })
+        return decisions
@@ -0,0 +1,242 @@
+"""
+Versioned race state snapshots and a ring of recent ones for rollback.
+
+A snapshot is a flat little-endian byte record packed with struct:
+
+    header   magic, format version, kart count, tick
+    race     started/finished flags, countdown and race timers, tick counters
+    karts    physics, respawn and race progress fields of every kart
+    ai       decision timers and waypoint progress of every AI kart
+    rng      state of the race RNG (a RaceRandom)
+    items    raw bytes of the item system's arrays (boxes and projectiles)
+
+RaceStateCodec packs a scene into a caller-provided buffer and unpacks it
+back without allocating per-field objects beyond what struct does, so saving
+and restoring a four-kart race takes a few microseconds. SnapshotRing keeps
+the last N snapshots in one preallocated bytearray.
+
+Track, waypoints and kart configuration are fixed for a race and are not
+stored; particles are purely visual and are cleared on restore.
+"""
+
+import os
+import random
+import hashlib
+import struct
+import numpy as np
+from operator import attrgetter
+from src.config import *
+from src.entities.ai_kart import AIKart
+
+SNAPSHOT_MAGIC = b'KRSS'
+SNAPSHOT_VERSION = 3
+
+_HEADER = struct.Struct('<4sHHI')
+
+RACE_FIELDS = ['race_started', 'race_finished', 'countdown_timer',
+               'race_timer', 'frame_index', 'particle_dt']
+_RACE = struct.Struct('<??ddId')
+
+KART_FIELDS = ['x', 'y', 'angle', 'speed', 'velocity_x', 'velocity_y',
+               'respawn_x', 'respawn_y', 'respawn_angle', 'finish_time',
+               'spin_timer', 'current_lap', 'last_checkpoint', 'race_position',
+               'item', 'finished', 'on_track']
+_KART = struct.Struct('<11d4i2?')
+
+AI_FIELDS = ['reaction_timer', 'reaction_time', 'ai_speed_multiplier',
+             'stuck_timer', 'stuck_check_timer', 'target_speed',
+             'turn_decision', 'current_waypoint', 'recovering']
+_AI = struct.Struct('<6d2i?2d')  # ... plus last_position (x, y)
+
+# RaceRandom.getstate(): (64-bit state, gauss_next)
+_RNG = struct.Struct('<Q?d')
+
+_MASK64 = (1 << 64) - 1
+
+
+class RaceRandom(random.Random):
+    """random.Random driven by SplitMix64 instead of the Mersenne Twister.
+
+    Its whole state is one 64-bit integer, so snapshotting it costs next to
+    nothing (the Twister's 2.5 KB state took longer to copy than the rest of
+    the race). All the usual methods (uniform, choice, ...) work unchanged.
+    """
+
+    def seed(self, a=None, version=2):
+        if a is None:
+            a = int.from_bytes(os.urandom(8), 'little')
+        elif not isinstance(a, int):
+            a = int.from_bytes(
+                hashlib.sha256(repr(a).encode()).digest()[:8], 'little')
+        self.state = a & _MASK64
+        self.gauss_next = None
+
+    def _next(self):
+        self.state = z = (self.state + 0x9E3779B97F4A7C15) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        return z ^ (z >> 31)
+
+    def random(self):
+        return (self._next() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k):
+        bits = 0
+        for shift in range(0, k, 64):
+            bits |= self._next() << shift
+        return bits & ((1 << k) - 1)
+
+    def getstate(self):
+        return self.state, self.gauss_next
+
+    def setstate(self, state):
+        self.state, self.gauss_next = state
+
+
+class RaceStateCodec:
+    """Packs and unpacks the simulation state of one GameScene-like race.
+
+    The scene provides karts, rng (a RaceRandom), items (an ItemSystem)
+    and the RACE_FIELDS attributes. The layout depends on the number of karts and which of them
+    are AI, so a codec (and its snapshots) belong to one race.
+    """
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.ai_karts = [kart for kart in scene.karts if isinstance(kart, AIKart)]
+        self.item_arrays = scene.items.state_arrays()
+        self.size = (_HEADER.size + _RACE.size + _KART.size * len(scene.karts) +
+                     _AI.size * len(self.ai_karts) + _RNG.size +
+                     sum(array.nbytes for array in self.item_arrays))
+
+        self._race_getter = attrgetter(*RACE_FIELDS)
+        self._kart_getter = attrgetter(*KART_FIELDS)
+        self._ai_getter = attrgetter(*AI_FIELDS)
+
+    def new_buffer(self):
+        """A zeroed buffer large enough for one snapshot."""
+        return bytearray(self.size)
+
+    def save_into(self, buffer, tick=0, offset=0):
+        """Pack the scene's current state into buffer at offset."""
+        scene = self.scene
+        _HEADER.pack_into(buffer, offset, SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                          len(scene.karts), tick)
+        offset += _HEADER.size
+        _RACE.pack_into(buffer, offset, *self._race_getter(scene))
+        offset += _RACE.size
+
+        pack_kart = _KART.pack_into
+        get_kart = self._kart_getter
+        for kart in scene.karts:
+            pack_kart(buffer, offset, *get_kart(kart))
+            offset += _KART.size
+
+        pack_ai = _AI.pack_into
+        get_ai = self._ai_getter
+        for kart in self.ai_karts:
+            pack_ai(buffer, offset, *get_ai(kart), *kart.last_position)
+            offset += _AI.size
+
+        state, gauss_next = scene.rng.getstate()
+        _RNG.pack_into(buffer, offset, state, gauss_next is not None,
+                       gauss_next or 0.0)
+        offset += _RNG.size
+
+        for array in self.item_arrays:
+            end = offset + array.nbytes
+            buffer[offset:end] = array.data.cast('B')
+            offset = end
+
+    def restore_from(self, buffer, offset=0):
+        """Unpack a snapshot into the scene and return its tick."""
+        scene = self.scene
+        magic, version, kart_count, tick = _HEADER.unpack_from(buffer, offset)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a race state snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {version} "
+                             f"(expected {SNAPSHOT_VERSION})")
+        if kart_count != len(scene.karts):
+            raise ValueError(f"Snapshot has {kart_count} karts, "
+                             f"race has {len(scene.karts)}")
+        offset += _HEADER.size
+
+        scene.__dict__.update(zip(RACE_FIELDS, _RACE.unpack_from(buffer, offset)))
+        offset += _RACE.size
+
+        for kart in scene.karts:
+            kart.__dict__.update(zip(KART_FIELDS, _KART.unpack_from(buffer, offset)))
+            kart.events.clear()
+            offset += _KART.size
+
+        for kart in self.ai_karts:
+            values = _AI.unpack_from(buffer, offset)
+            kart.__dict__.update(zip(AI_FIELDS, values))
+            kart.last_position = values[-2:]
+            offset += _AI.size
+
+        state, has_gauss, gauss_next = _RNG.unpack_from(buffer, offset)
+        scene.rng.setstate((state, gauss_next if has_gauss else None))
+        offset += _RNG.size
+
+        for array in self.item_arrays:
+            array[...] = np.frombuffer(buffer, array.dtype, array.size, offset)
+            offset += array.nbytes
+        return tick
+
+
+class SnapshotRing:
+    """The most recent snapshots of a race in one preallocated buffer."""
+
+    def __init__(self, codec, capacity=SNAPSHOT_RING_SIZE):
+        self.codec = codec
+        self.capacity = capacity
+        self.buffer = bytearray(codec.size * capacity)
+        self.ticks = [None] * capacity  # Tick stored in each slot
+        self.next_slot = 0
+        self.count = 0
+
+    def save(self, tick):
+        """Snapshot the race into the oldest slot."""
+        slot = self.next_slot
+        self.codec.save_into(self.buffer, tick, slot * self.codec.size)
+        self.ticks[slot] = tick
+        self.next_slot = (slot + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _slot(self, age):
+        """Slot of the snapshot saved age saves ago (0 = newest)."""
+        return (self.next_slot - 1 - age) % self.capacity
+
+    def restore(self, age=0):
+        """Roll back to the snapshot saved age saves ago (clamped to the
+        oldest) and drop everything newer. Returns its tick, or None if the
+        ring is empty."""
+        if self.count == 0:
+            return None
+        age = min(age, self.count - 1)
+        slot = self._slot(age)
+        tick = self.codec.restore_from(self.buffer, slot * self.codec.size)
+        # Newer snapshots belong to the abandoned timeline
+        self.next_slot = (slot + 1) % self.capacity
+        self.count -= age
+        return tick
+
+    def restore_tick(self, tick):
+        """Roll back to the newest snapshot at or before tick (for rollback
+        netcode). Returns the restored tick, or None if none is that old."""
+        for age in range(self.count):
+            saved = self.ticks[self._slot(age)]
+            if saved <= tick:
+                return self.restore(age)
+        return None
+
+    def get_bytes(self, age=0):
+        """Copy of a stored snapshot, e.g. to send over the network."""
+        start = self._slot(age) * self.codec.size
+        return bytes(self.buffer[start:start + self.codec.size])
+
+    def clear(self):
+        self.next_slot = 0
+        self.count = 0
@@ -0,0 +1,211 @@
+"""
+Cooperative frame-budget scheduler for deferred background work.
+
+Game runs it after every flip with whatever is left of the 1/FPS frame
+budget, so saving, flushing and precomputing happen in the slack instead of
+inline:
+
+    scheduler.submit(save_results, priority=PRIORITY_LOW, key="results")
+    scheduler.submit(build_thumbnails())     # generator: a step per yield
+    scheduler.submit(track.get_flow_field, deadline=3.0)
+
+Jobs run in priority order (lower first, then oldest first) while slack
+remains, and never for more than SCHEDULER_MAX_FRAME_MS in one frame. A
+generator job (or a callable returning a generator) runs one step per yield
+and resumes on later frames. Once a job's deadline has passed it runs even
+when there is no slack, still within the per-frame cap. Nothing preempts a
+step, so long work should yield often. After the first step of a frame, a
+step is only started if the job's previous one would fit in the time left.
+"""
+
+import time
+import inspect
+import traceback
+from src.config import *
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class Job:
+    """A queued task; cancel() drops it before its next step."""
+
+    __slots__ = ('function', 'args', 'generator', 'priority', 'deadline',
+                 'sequence', 'name', 'key', 'cancelled', 'step_time')
+
+    def __init__(self, task, args, priority, deadline, sequence, name, key):
+        if inspect.isgenerator(task):
+            self.function = None
+            self.generator = task
+        else:
+            self.function = task
+            self.generator = None
+        self.args = args
+        self.priority = priority
+        self.deadline = deadline  # perf_counter() time, or None
+        self.sequence = sequence
+        self.name = name or getattr(task, '__qualname__', repr(task))
+        self.key = key
+        self.cancelled = False
+        self.step_time = 0.0  # Duration of the last step, in seconds
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FrameScheduler:
+    """Runs queued jobs in the time left over after update and draw."""
+
+    def __init__(self, fps=FPS, max_frame_ms=SCHEDULER_MAX_FRAME_MS,
+                 margin_ms=SCHEDULER_MARGIN_MS):
+        self.frame_budget = 1.0 / fps
+        self.max_frame = max_frame_ms / 1000
+        self.margin = margin_ms / 1000
+        self.jobs = []
+        self.keys = {}  # Coalescing key -> queued job
+        self.sequence = 0
+        self.frame_ms = 0.0  # Time spent in the last run()
+
+        # Stats
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.steps = 0
+        self.overdue_steps = 0  # Steps run without slack because of a deadline
+        self.frames_with_work = 0
+        self.deferred_frames = 0  # Frames with queued work but no slack for it
+        self.overruns = 0  # Frames where one step ran past the cap
+        self.max_depth = 0
+        self.busy_ms = 0.0
+
+    def submit(self, task, *args, priority=PRIORITY_NORMAL, deadline=None,
+               name=None, key=None):
+        """Queue a callable (called with args) or a generator.
+
+        deadline is in seconds from now. A job submitted with the key of one
+        still queued replaces it (e.g. repeated "save" requests).
+        """
+        if key is not None and key in self.keys:
+            self.keys.pop(key).cancel()
+        if deadline is not None:
+            deadline = time.perf_counter() + deadline
+        job = Job(task, args, priority, deadline, self.sequence, name, key)
+        self.sequence += 1
+        self.jobs.append(job)
+        if key is not None:
+            self.keys[key] = job
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, len(self.jobs))
+        return job
+
+    @property
+    def depth(self):
+        return len(self.jobs)
+
+    def next_job(self, now):
+        """Most overdue job past its deadline, else the most urgent one."""
+        overdue = [job for job in self.jobs
+                   if job.deadline is not None and job.deadline <= now]
+        if overdue:
+            return min(overdue, key=lambda job: job.deadline)
+        return min(self.jobs, key=lambda job: (job.priority, job.sequence))
+
+    def run(self, frame_start):
+        """Run jobs in the slack of a frame that started at frame_start
+        (a perf_counter() time)."""
+        start = time.perf_counter()
+        self.frame_ms = 0.0
+        self.drop_cancelled()
+        if not self.jobs:
+            return
+        self.frames_with_work += 1
+
+        cap_end = start + self.max_frame
+        slack_end = min(frame_start + self.frame_budget - self.margin, cap_end)
+        now = start
+        ran = 0
+        while self.jobs:
+            job = self.next_job(now)
+            overdue = job.deadline is not None and job.deadline <= now
+            # The first step always gets a chance, so long steps cannot starve
+            expected_end = now + job.step_time if ran else now
+            if expected_end < slack_end:
+                pass
+            elif overdue and expected_end < cap_end:
+                self.overdue_steps += 1
+            else:
+                break
+            self.step(job)
+            after = time.perf_counter()
+            job.step_time = after - now
+            now = after
+            ran += 1
+
+        if ran == 0:
+            self.deferred_frames += 1
+        elif now > cap_end + 0.001:
+            self.overruns += 1
+        self.frame_ms = (now - start) * 1000
+        self.busy_ms += self.frame_ms
+
+    def step(self, job):
+        """Run one step of job, retiring it when it is finished."""
+        if job.cancelled:  # By an earlier step this frame
+            self.finish(job, completed=False)
+            return
+        self.steps += 1
+        try:
+            if job.generator is None:
+                result = job.function(*job.args)
+                if not inspect.isgenerator(result):
+                    self.finish(job)
+                    return
+                job.generator = result  # Incremental from the next step on
+            next(job.generator)
+        except StopIteration:
+            self.finish(job)
+        except Exception:
+            # Background work must not take the game down
+            print(f"Scheduled job {job.name} failed:")
+            traceback.print_exc()
+            self.failed += 1
+            self.finish(job, completed=False)
+
+    def finish(self, job, completed=True):
+        self.jobs.remove(job)
+        if job.key is not None and self.keys.get(job.key) is job:
+            del self.keys[job.key]
+        if completed:
+            self.completed += 1
+
+    def drop_cancelled(self):
+        if any(job.cancelled for job in self.jobs):
+            self.jobs = [job for job in self.jobs if not job.cancelled]
+
+    def flush(self):
+        """Run everything still queued to completion (e.g. at exit)."""
+        self.drop_cancelled()
+        while self.jobs:
+            self.step(self.next_job(time.perf_counter()))
+
+    def report(self):
+        return {'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'queued': len(self.jobs),
+                'max_depth': self.max_depth,
+                'steps': self.steps,
+                'overdue_steps': self.overdue_steps,
+                'frames_with_work': self.frames_with_work,
+                'deferred_frames': self.deferred_frames,
+                'overruns': self.overruns,
+                'busy_ms': round(self.busy_ms, 3)}
+
+    def summary(self):
+        """One-line summary for the console."""
+        return (f"Scheduler: {self.completed}/{self.submitted} jobs in "
+                f"{self.steps} steps ({self.busy_ms:.1f} ms), max depth "
+                f"{self.max_depth}, deferred {self.deferred_frames} of "
+                f"{self.frames_with_work} frames with work, "
+                f"{self.overdue_steps} overdue steps, {self.overruns} overruns")
@@ -0,0 +1,290 @@
+"""
+Shared-memory race state feed for external tools.
+
+With STATE_FEED_NAME set, GameScene publishes every simulation tick into a
+ring of fixed-size frames in a named shared-memory segment, so spectator
+screens and dashboards on the same machine read live race state straight
+out of memory: no sockets, no serialization, and nothing a slow reader can
+do to hold the game up. The writer never waits for readers; a reader that
+falls more than a ring's worth of ticks behind skips ahead and counts what
+it missed.
+
+Layout (little-endian, see HEADER_DTYPE and frame_dtype()):
+
+    header   magic b'KSTF', version, max_karts, slots, frame_bytes, flags
+             (1 = the game has closed the feed), sequence of the newest
+             complete frame (0 = none yet), process id of the game,
+             padded to 64 bytes
+    frames   slots frames; frame n is in slot n % slots:
+                 begin        sequence, written first
+                 tick         simulation tick (never rewound)
+                 flags        1 = race started, 2 = race finished
+                 kart_count   karts in use (the player is kart 0)
+                 race_timer   seconds
+                 karts        max_karts records of x, y, angle (degrees),
+                              speed, lap, race_position, checkpoint, finished
+                 end          sequence, written last
+
+A frame is consistent when end, then the body, then begin are read and
+begin == end == its sequence: the writer fills begin, the body and end in
+that order. StateFeedReader does this; a reader in another language only
+needs the layout above.
+
+A game only replaces a segment of the same name that is provably stale: a
+feed closed by its game, or one whose game process is gone. Anything else
+(another running game, an unrelated segment) is left alone and StateFeed
+raises FileExistsError.
+"""
+
+import os
+import sys
+import numpy as np
+from multiprocessing import shared_memory
+from src.config import *
+
+FEED_MAGIC = b'KSTF'
+# Bump when the layout changes
+FEED_VERSION = 2
+
+FEED_CLOSED = 1
+FRAME_STARTED = 1
+FRAME_FINISHED = 2
+
+# Reads of a slot the writer keeps changing before giving up on it
+_READ_ATTEMPTS = 3
+
+HEADER_DTYPE = np.dtype({
+    'names': ['magic', 'version', 'max_karts', 'slots', 'frame_bytes',
+              'flags', 'sequence', 'pid'],
+    'formats': ['S4', '<u2', '<u2', '<u4', '<u4', '<u4', '<u8', '<u4'],
+    'offsets': [0, 4, 6, 8, 12, 16, 24, 32],
+    'itemsize': 64})
+
+KART_DTYPE = np.dtype([
+    ('x', '<f4'),
+    ('y', '<f4'),
+    ('angle', '<f4'),
+    ('speed', '<f4'),
+    ('lap', '<i2'),
+    ('race_position', '<i2'),
+    ('checkpoint', '<i2'),
+    ('finished', 'u1'),
+    ('_pad', 'u1')
+])
+
+
+def frame_dtype(max_karts):
+    """One ring slot for up to max_karts karts."""
+    return np.dtype([
+        ('begin', '<u8'),
+        ('tick', '<u4'),
+        ('flags', '<u2'),
+        ('kart_count', '<u2'),
+        ('race_timer', '<f8'),
+        ('karts', KART_DTYPE, (max_karts,)),
+        ('end', '<u8')
+    ])
+
+
+def _attach(name):
+    """Open an existing segment without handing it to this process's
+    resource tracker, which would unlink it (for every other reader and the
+    game too) when this process exits. Readers belong in other processes
+    than the game's."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    memory = shared_memory.SharedMemory(name)
+    from multiprocessing import resource_tracker
+    resource_tracker.unregister(memory._name, 'shared_memory')
+    return memory
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Someone else's process
+    return True
+
+
+def _remove_stale(name):
+    """Unlink the existing segment name if it is a feed whose game closed
+    it or is no longer running; raise FileExistsError otherwise."""
+    memory = _attach(name)
+    try:
+        stale = False
+        owner = "an unknown process"
+        if memory.size >= HEADER_DTYPE.itemsize:
+            header = np.ndarray((), HEADER_DTYPE, buffer=memory.buf).copy()
+            if header['magic'] == FEED_MAGIC:
+                if header['flags'] & FEED_CLOSED:
+                    stale = True
+                elif header['version'] >= 2:  # Version 1 did not record pids
+                    pid = int(header['pid'])
+                    stale = not _process_alive(pid)
+                    owner = f"process {pid}"
+    finally:
+        memory.close()
+    if not stale:
+        raise FileExistsError(
+            f"Shared memory {name!r} is in use by {owner}; stop it or set "
+            f"a different STATE_FEED_NAME")
+
+    # Left behind by a game that did not exit cleanly. Opened tracked,
+    # since unlink() also unregisters it from the resource tracker
+    segment = shared_memory.SharedMemory(name)
+    segment.close()
+    segment.unlink()
+
+
+class StateFeed:
+    """Publishes race state into a shared-memory ring once per tick."""
+
+    def __init__(self, name=STATE_FEED_NAME, slots=STATE_FEED_SLOTS,
+                 max_karts=STATE_FEED_MAX_KARTS):
+        self.name = name
+        self.slots = slots
+        self.max_karts = max_karts
+        dtype = frame_dtype(max_karts)
+        size = HEADER_DTYPE.itemsize + slots * dtype.itemsize
+        try:
+            self.memory = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            _remove_stale(name)
+            self.memory = shared_memory.SharedMemory(name, create=True, size=size)
+
+        self.header = np.ndarray((), HEADER_DTYPE, buffer=self.memory.buf)
+        self.frames = np.ndarray((slots,), dtype, buffer=self.memory.buf,
+                                 offset=HEADER_DTYPE.itemsize)
+        self.frames[:] = 0
+        self.header[()] = (FEED_MAGIC, FEED_VERSION, max_karts, slots,
+                           dtype.itemsize, 0, 0, os.getpid())
+
+        # Field views, so publishing never builds a record
+        self._begin = self.frames['begin']
+        self._tick = self.frames['tick']
+        self._flags = self.frames['flags']
+        self._kart_count = self.frames['kart_count']
+        self._race_timer = self.frames['race_timer']
+        self._karts = self.frames['karts']
+        self._end = self.frames['end']
+        self._sequence = self.header['sequence']
+        self.sequence = 0
+
+    def publish(self, scene):
+        """Write the scene's current race state as the next frame."""
+        self.sequence += 1
+        slot = self.sequence % self.slots
+        karts = scene.karts[:self.max_karts]
+
+        self._begin[slot] = self.sequence
+        self._tick[slot] = scene.tick_count
+        self._flags[slot] = (FRAME_STARTED if scene.race_started else 0) | \
+            (FRAME_FINISHED if scene.race_finished else 0)
+        self._kart_count[slot] = len(karts)
+        self._race_timer[slot] = scene.race_timer
+        self._karts[slot, :len(karts)] = [
+            (kart.x, kart.y, kart.angle, kart.speed, kart.current_lap,
+             kart.race_position, kart.last_checkpoint, kart.finished, 0)
+            for kart in karts]
+        self._end[slot] = self.sequence
+        self._sequence[()] = self.sequence
+
+    def close(self):
+        """Mark the feed closed for readers and remove the segment."""
+        if self.memory is None:
+            return
+        self.header['flags'] |= FEED_CLOSED
+        del self.header, self.frames, self._sequence
+        del self._begin, self._tick, self._flags, self._kart_count
+        del self._race_timer, self._karts, self._end
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+
+class StateFeedReader:
+    """Reads frames from a running game's state feed.
+
+    poll() returns every frame published since the previous call that is
+    still in the ring, oldest first; latest() just the newest. Frames are
+    copies (a few hundred bytes each) with the fields of frame_dtype();
+    karts(frame) gives the karts in use.
+    """
+
+    def __init__(self, name=STATE_FEED_NAME):
+        self.memory = _attach(name)
+        self.header = np.ndarray((), HEADER_DTYPE, buffer=self.memory.buf)
+        if self.header['magic'] != FEED_MAGIC:
+            self.close()
+            raise ValueError(f"{name} is not a race state feed")
+        if self.header['version'] != FEED_VERSION:
+            version = int(self.header['version'])
+            self.close()
+            raise ValueError(f"{name}: unsupported state feed version {version} "
+                             f"(expected {FEED_VERSION})")
+        self.slots = int(self.header['slots'])
+        self.frames = np.ndarray((self.slots,), frame_dtype(int(self.header['max_karts'])),
+                                 buffer=self.memory.buf,
+                                 offset=HEADER_DTYPE.itemsize)
+        # Start at the oldest frame still in the ring
+        self.next_sequence = max(1, self.sequence - self.slots + 2)
+        self.missed = 0  # Frames overwritten before they were read
+        self.torn = 0  # Reads that raced the writer and were retried
+
+    @property
+    def closed(self):
+        """True once the game has shut the feed down."""
+        return bool(self.header['flags'] & FEED_CLOSED)
+
+    @property
+    def sequence(self):
+        return int(self.header['sequence'])
+
+    def read(self, sequence):
+        """Frame sequence, or None if it has been overwritten (or not
+        written yet)."""
+        slot = sequence % self.slots
+        for _ in range(_READ_ATTEMPTS):
+            end = int(self.frames['end'][slot])
+            frame = self.frames[slot].copy()
+            if int(self.frames['begin'][slot]) == end:
+                return frame if end == sequence else None
+            self.torn += 1  # The writer was filling the slot; look again
+        return None
+
+    def latest(self):
+        """The newest frame, or None before the first one."""
+        sequence = self.sequence
+        if sequence == 0:
+            return None
+        self.next_sequence = sequence + 1
+        return self.read(sequence)
+
+    def poll(self):
+        """Frames published since the previous poll, oldest first."""
+        newest = self.sequence
+        oldest = max(self.next_sequence, newest - self.slots + 2)
+        self.missed += oldest - self.next_sequence
+        frames = []
+        for sequence in range(oldest, newest + 1):
+            frame = self.read(sequence)
+            if frame is None:
+                self.missed += 1
+            else:
+                frames.append(frame)
+        self.next_sequence = newest + 1
+        return frames
+
+    @staticmethod
+    def karts(frame):
+        """The kart records in use in a frame."""
+        return frame['karts'][:frame['kart_count']]
+
+    def close(self):
+        del self.header
+        if hasattr(self, 'frames'):
+            del self.frames
+        self.memory.close()
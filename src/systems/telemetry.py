@@ -0,0 +1,203 @@
+"""
+Per-tick, per-kart telemetry written as a columnar corpus.
+
+The game thread appends rows into preallocated column buffers. Full chunks
+are handed to a writer thread, which appends each column to its own raw file
+and then updates schema.json. Recording never blocks: if every chunk buffer
+is still waiting for the writer, rows are dropped and counted.
+
+A corpus directory can hold any number of races (the race column tells them
+apart) and load_telemetry() memory-maps all of it in one call. The schema
+also lists each race's track, the track's pack revision and the tick rate
+(see src/systems/analytics.py).
+"""
+
+import os
+import json
+import math
+import queue
+import threading
+import numpy as np
+from src.config import *
+
+TELEMETRY_COLUMNS = [
+    ('race', np.int32),
+    ('tick', np.int32),
+    ('kart', np.int16),
+    ('x', np.float32),
+    ('y', np.float32),
+    ('speed', np.float32),
+    ('angle', np.float32),
+    ('on_track', np.bool_),
+    ('checkpoint', np.int16),
+    ('lap', np.int16),
+    ('ai_target_speed', np.float32),  # NaN for non-AI karts
+    ('ai_turn', np.int8)  # -1 left, 0 straight, 1 right
+]
+
+SCHEMA_FILE = 'schema.json'
+
+
+def load_schema(directory):
+    """Read a corpus schema, or None if the directory has no corpus yet."""
+    path = os.path.join(directory, SCHEMA_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_telemetry(directory):
+    """Memory-map every column of a corpus. Returns {column: array}."""
+    schema = load_schema(directory)
+    if schema is None:
+        raise FileNotFoundError(f"No telemetry corpus in {directory}")
+
+    rows = schema['rows']
+    columns = {}
+    for name, dtype in schema['columns']:
+        if rows == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(os.path.join(directory, name + '.bin'),
+                                      dtype=dtype, mode='r', shape=(rows,))
+    return columns
+
+
+class TelemetrySink:
+    """Collects kart state every sampled tick and writes it in the background."""
+
+    def __init__(self, directory, sample_every=TELEMETRY_SAMPLE_EVERY,
+                 chunk_rows=TELEMETRY_CHUNK_ROWS, pool_size=TELEMETRY_POOL_SIZE):
+        self.directory = directory
+        self.sample_every = sample_every
+        self.chunk_rows = chunk_rows
+        os.makedirs(directory, exist_ok=True)
+
+        # Append to an existing corpus, continuing its race numbering
+        schema = load_schema(directory)
+        self.rows_written = schema['rows'] if schema else 0
+        self.next_race = schema['races'] if schema else 0
+        # Per race: {'track': track id or None, 'revision': pack revision
+        # (None: built from code), 'tick_rate': ticks per second}
+        self.race_info = list(schema.get('race_info', [])) if schema else []
+        self.race_info += [{'track': None, 'tick_rate': FPS}] * \
+            (self.next_race - len(self.race_info))
+        self.race = -1
+        self.tick = 0
+        self.dropped_rows = 0
+
+        self.free_chunks = queue.Queue()
+        for _ in range(pool_size):
+            self.free_chunks.put({name: np.zeros(chunk_rows, dtype=dtype)
+                                  for name, dtype in TELEMETRY_COLUMNS})
+        self.pending_chunks = queue.Queue()
+        self.chunk = self.free_chunks.get_nowait()
+        self.chunk_fill = 0
+
+        self.writer = threading.Thread(target=self._write_chunks, daemon=True)
+        self.writer.start()
+
+    def begin_race(self, track_id=None, revision=None):
+        """Start numbering ticks for a new race on track_id (None for an
+        edited or generated track), compiled as pack revision (None for a
+        track built from code)."""
+        self.race = self.next_race
+        self.next_race += 1
+        self.tick = 0
+        self.race_info.append({
+            'track': track_id,
+            'revision': revision,
+            'tick_rate': SIM_TICK_RATE if PIPELINED_SIMULATION else FPS})
+
+    def record(self, karts):
+        """Record one simulation tick (sampled every sample_every ticks)."""
+        self.tick += 1
+        if self.tick % self.sample_every:
+            return
+
+        if self.chunk is not None and self.chunk_fill + len(karts) > self.chunk_rows:
+            self._submit()
+        if self.chunk is None:
+            try:
+                self.chunk = self.free_chunks.get_nowait()
+            except queue.Empty:
+                self.dropped_rows += len(karts)
+                return
+
+        chunk = self.chunk
+        row = self.chunk_fill
+        for i, kart in enumerate(karts):
+            chunk['race'][row] = self.race
+            chunk['tick'][row] = self.tick
+            chunk['kart'][row] = i
+            chunk['x'][row] = kart.x
+            chunk['y'][row] = kart.y
+            chunk['speed'][row] = kart.speed
+            chunk['angle'][row] = kart.angle
+            chunk['on_track'][row] = kart.on_track
+            chunk['checkpoint'][row] = kart.last_checkpoint
+            chunk['lap'][row] = kart.current_lap
+            chunk['ai_target_speed'][row] = getattr(
+                kart, 'target_speed', math.nan)
+            chunk['ai_turn'][row] = getattr(kart, 'turn_decision', 0)
+            row += 1
+        self.chunk_fill = row
+
+    def _submit(self):
+        """Hand the current chunk to the writer without waiting."""
+        if self.chunk is None or self.chunk_fill == 0:
+            return
+        self.pending_chunks.put((self.chunk, self.chunk_fill))
+        self.chunk_fill = 0
+        try:
+            self.chunk = self.free_chunks.get_nowait()
+        except queue.Empty:
+            self.chunk = None
+
+    def flush(self):
+        """Queue whatever has been recorded so far."""
+        self._submit()
+
+    def close(self):
+        """Flush and wait for the writer to finish."""
+        self._submit()
+        self.pending_chunks.put(None)
+        self.writer.join()
+
+    def _write_chunks(self):
+        """Writer thread: append chunks column by column, then the schema."""
+        files = {name: open(os.path.join(self.directory, name + '.bin'), 'ab')
+                 for name, _ in TELEMETRY_COLUMNS}
+        try:
+            while True:
+                item = self.pending_chunks.get()
+                if item is None:
+                    self._write_schema()
+                    break
+                chunk, rows = item
+                for name, _ in TELEMETRY_COLUMNS:
+                    files[name].write(chunk[name][:rows].tobytes())
+                    files[name].flush()
+                self.free_chunks.put(chunk)
+
+                # Publish the new row count only once the data is on disk
+                self.rows_written += rows
+                self._write_schema()
+        finally:
+            for f in files.values():
+                f.close()
+
+    def _write_schema(self):
+        """Atomically replace schema.json."""
+        schema = {
+            'columns': [(name, np.dtype(dtype).str)
+                        for name, dtype in TELEMETRY_COLUMNS],
+            'rows': self.rows_written,
+            'races': self.next_race,
+            'race_info': list(self.race_info)  # Appended to by the game thread
+        }
+        path = os.path.join(self.directory, SCHEMA_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(schema, f)
+        os.replace(path + '.tmp', path)
@@ -0,0 +1,218 @@
+"""
+Scoped timing spans exported as Chrome trace JSON.
+
+    with trace_span("Track.rasterize"):
+        ...
+
+    @traced()
+    def update(self, dt):
+        ...
+
+Spans record begin/end events into a preallocated ring of NumPy arrays
+(name id, phase, thread, timestamp), so tracing a frame allocates nothing
+beyond interning a span name the first time it is seen. While tracing is
+disabled a span is a shared no-op and a traced function costs one extra
+call. dump_trace() writes the ring as Chrome trace event JSON, which
+chrome://tracing and Perfetto open directly, one track per thread.
+
+GC pauses are recorded as "gc" spans.
+"""
+
+import os
+import gc
+import json
+import time
+import itertools
+import threading
+import functools
+import numpy as np
+from src.config import *
+
+PHASE_BEGIN = 0
+PHASE_END = 1
+
+_buffer = None
+
+
+class TraceBuffer:
+    """Fixed-capacity ring of trace events."""
+
+    def __init__(self, capacity=TRACE_CAPACITY):
+        self.capacity = capacity
+        self.name_ids = np.zeros(capacity, dtype=np.int32)
+        self.phases = np.zeros(capacity, dtype=np.int8)
+        self.threads = np.zeros(capacity, dtype=np.int64)
+        self.timestamps = np.zeros(capacity, dtype=np.int64)  # perf_counter_ns
+
+        self.names = {}  # Span name -> id
+        self.name_list = []
+        self.names_lock = threading.Lock()
+        self.thread_names = {}
+        # next() on a count is atomic under the GIL, so threads never share
+        # a slot
+        self.counter = itertools.count()
+
+    def name_id(self, name):
+        index = self.names.get(name)
+        if index is None:
+            with self.names_lock:
+                index = self.names.get(name)
+                if index is None:
+                    index = len(self.name_list)
+                    self.name_list.append(name)
+                    self.names[name] = index
+        return index
+
+    def record(self, name, phase):
+        slot = next(self.counter) % self.capacity
+        thread = threading.get_ident()
+        if thread not in self.thread_names:
+            self.thread_names[thread] = threading.current_thread().name
+        self.name_ids[slot] = self.name_id(name)
+        self.phases[slot] = phase
+        self.threads[slot] = thread
+        self.timestamps[slot] = time.perf_counter_ns()
+
+    def events(self):
+        """Recorded events, oldest first, as Chrome trace dicts.
+
+        After the ring wraps, ends whose begin was overwritten are dropped so
+        every thread's spans stay properly nested.
+        """
+        total = next(self.counter)
+        # That slot is never written; mark it so later dumps skip it
+        self.name_ids[total % self.capacity] = -1
+        count = min(total, self.capacity)
+        first = total - count
+        order = (np.arange(first, total) % self.capacity)
+
+        pid = os.getpid()
+        depth = {}
+        events = []
+        names = self.name_list
+        start = int(self.timestamps[order[0]]) if count else 0
+        for name_id, phase, thread, timestamp in zip(
+                self.name_ids[order].tolist(), self.phases[order].tolist(),
+                self.threads[order].tolist(), self.timestamps[order].tolist()):
+            if name_id < 0:
+                continue
+            level = depth.get(thread, 0)
+            if phase == PHASE_END:
+                if level == 0:
+                    continue
+                depth[thread] = level - 1
+            else:
+                depth[thread] = level + 1
+            events.append({'name': names[name_id],
+                           'ph': 'B' if phase == PHASE_BEGIN else 'E',
+                           'ts': (timestamp - start) / 1000.0,
+                           'pid': pid, 'tid': thread})
+
+        for thread, name in self.thread_names.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                           'tid': thread, 'args': {'name': name}})
+        return events
+
+
+class Span:
+    """Context manager recording one named span (reusable and reentrant)."""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        buffer = _buffer
+        if buffer is not None:
+            buffer.record(self.name, PHASE_BEGIN)
+        return self
+
+    def __exit__(self, *exc):
+        buffer = _buffer
+        if buffer is not None:
+            buffer.record(self.name, PHASE_END)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_spans = {}
+
+
+def trace_span(name):
+    """Context manager timing the enclosed block as a span called name."""
+    if _buffer is None:
+        return _NULL_SPAN
+    span = _spans.get(name)
+    if span is None:
+        span = _spans.setdefault(name, Span(name))
+    return span
+
+
+def traced(name=None):
+    """Decorator timing every call of a function (named by its qualname)."""
+    def decorate(function):
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            buffer = _buffer
+            if buffer is None:
+                return function(*args, **kwargs)
+            buffer.record(label, PHASE_BEGIN)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                buffer.record(label, PHASE_END)
+        return wrapper
+    return decorate
+
+
+def _on_gc(phase, info):
+    buffer = _buffer
+    if buffer is not None:
+        buffer.record('gc', PHASE_BEGIN if phase == 'start' else PHASE_END)
+
+
+def enable_tracing(capacity=TRACE_CAPACITY):
+    """Start recording spans (keeps the existing buffer if already on)."""
+    global _buffer
+    if _buffer is None:
+        _buffer = TraceBuffer(capacity)
+        gc.callbacks.append(_on_gc)
+
+
+def disable_tracing():
+    """Stop recording and drop the buffer."""
+    global _buffer
+    if _buffer is not None:
+        gc.callbacks.remove(_on_gc)
+        _buffer = None
+
+
+def is_tracing():
+    return _buffer is not None
+
+
+def dump_trace(path=None):
+    """Write everything in the ring as Chrome trace JSON and return the path
+    (TRACE_DIR/trace-<time>.json by default), or None if tracing is off."""
+    if _buffer is None:
+        return None
+    if path is None:
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        path = os.path.join(TRACE_DIR, time.strftime("trace-%Y%m%d-%H%M%S.json"))
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': _buffer.events(),
+                   'displayTimeUnit': 'ms'}, f)
+    return path
@@ -0,0 +1,395 @@
+"""
+Seeded procedural track generator.
+
+A layout is a closed loop of control points with a road width at each point,
+plus water hazards and a theme. Layouts are plain dicts (JSON friendly) so
+they can be cached on disk and handed to Track(layout=...).
+
+Rasterization works on whole pixel regions with NumPy: the road is a chain of
+capsules whose radius varies linearly along each segment, so widths blend
+smoothly between control points and joins are always round.
+
+    python -m src.track.generator --count 5000 --processes 8
+"""
+
+import os
+import json
+import math
+import argparse
+import multiprocessing
+import numpy as np
+from src.config import *
+
+# Surface classes produced by rasterize_layout
+SURFACE_GRASS = 0
+SURFACE_ROAD = 1
+SURFACE_WATER = 2
+
+TRACK_THEMES = {
+    'forest': {'background': DARK_GREEN, 'road': DARK_GRAY},
+    'desert': {'background': YELLOW, 'road': BROWN}
+}
+
+TRACK_WIDTH_PX = 2000
+TRACK_HEIGHT_PX = 1500
+RASTER_PIECE_LENGTH = 96  # Long segments are split to keep bounding boxes tight
+START_MAX_ANGLE = 35  # The start straight must head within this of +y (degrees)
+
+
+def _segment_distance(px, py, ax, ay, bx, by):
+    """Distance from points to segments, and the clamped segment parameter."""
+    dx = bx - ax
+    dy = by - ay
+    length_sq = np.maximum(dx * dx + dy * dy, 1e-6)
+    t = np.clip(((px - ax) * dx + (py - ay) * dy) / length_sq, 0.0, 1.0)
+    return np.hypot(px - ax - t * dx, py - ay - t * dy), t
+
+
+def _segments_intersect(a, b, c, d):
+    """Whether segment ab properly crosses segment cd."""
+    def cross(o, p, q):
+        return (p[0] - o[0]) * (q[1] - o[1]) - (p[1] - o[1]) * (q[0] - o[0])
+    return (cross(a, b, c) * cross(a, b, d) < 0 and
+            cross(c, d, a) * cross(c, d, b) < 0)
+
+
+def _segment_gap(a, b, c, d):
+    """Shortest distance between segments ab and cd."""
+    if _segments_intersect(a, b, c, d):
+        return 0.0
+    return float(min(
+        _segment_distance(a[0], a[1], c[0], c[1], d[0], d[1])[0],
+        _segment_distance(b[0], b[1], c[0], c[1], d[0], d[1])[0],
+        _segment_distance(c[0], c[1], a[0], a[1], b[0], b[1])[0],
+        _segment_distance(d[0], d[1], a[0], a[1], b[0], b[1])[0]))
+
+
+def road_depth(layout, xs, ys):
+    """How far points are inside the road (negative outside), in pixels."""
+    points = np.asarray(layout['checkpoints'], dtype=np.float64)
+    half_widths = np.asarray(layout['road_widths'], dtype=np.float64) / 2
+    xs = np.asarray(xs, dtype=np.float64)[..., None]
+    ys = np.asarray(ys, dtype=np.float64)[..., None]
+    ends = np.roll(points, -1, axis=0)
+    distance, t = _segment_distance(xs, ys, points[:, 0], points[:, 1],
+                                    ends[:, 0], ends[:, 1])
+    radius = half_widths + (np.roll(half_widths, -1) - half_widths) * t
+    return np.max(radius - distance, axis=-1)
+
+
+def _road_pieces(checkpoints, road_widths):
+    """Split the loop into short capsules (ax, ay, bx, by, ra, rb)."""
+    pieces = []
+    count = len(checkpoints)
+    for i in range(count):
+        ax, ay = checkpoints[i]
+        bx, by = checkpoints[(i + 1) % count]
+        ra = road_widths[i] / 2
+        rb = road_widths[(i + 1) % count] / 2
+        steps = max(1, int(math.hypot(bx - ax, by - ay) // RASTER_PIECE_LENGTH))
+        for k in range(steps):
+            t0, t1 = k / steps, (k + 1) / steps
+            pieces.append((ax + (bx - ax) * t0, ay + (by - ay) * t0,
+                           ax + (bx - ax) * t1, ay + (by - ay) * t1,
+                           ra + (rb - ra) * t0, ra + (rb - ra) * t1))
+    return pieces
+
+
+def rasterize_layout(checkpoints, road_widths, water_areas, rect, out=None,
+                     values=(SURFACE_GRASS, SURFACE_ROAD, SURFACE_WATER)):
+    """Rasterize the pixels in rect (x, y, w, h) into an [x, y] array.
+
+    Writes values[SURFACE_*] per pixel; by default that is the surface class.
+    Pass out (e.g. a pixels2d view) and mapped colors to draw straight into a
+    surface.
+    """
+    x0, y0, width, height = rect
+    grass, road, water = values
+    if out is None:
+        classes = np.empty((width, height), dtype=np.uint8)
+    else:
+        classes = out
+    classes[...] = grass
+
+    def region(min_x, min_y, max_x, max_y):
+        """Clip a bounding box to rect; returns pixel ranges or None."""
+        left = max(int(math.floor(min_x)), x0)
+        top = max(int(math.floor(min_y)), y0)
+        right = min(int(math.ceil(max_x)) + 1, x0 + width)
+        bottom = min(int(math.ceil(max_y)) + 1, y0 + height)
+        if left >= right or top >= bottom:
+            return None
+        return left, top, right, bottom
+
+    for ax, ay, bx, by, ra, rb in _road_pieces(checkpoints, road_widths):
+        radius = max(ra, rb)
+        box = region(min(ax, bx) - radius, min(ay, by) - radius,
+                     max(ax, bx) + radius, max(ay, by) + radius)
+        if box is None:
+            continue
+        left, top, right, bottom = box
+        px = np.arange(left - ax, right - ax, dtype=np.float32)[:, None]
+        py = np.arange(top - ay, bottom - ay, dtype=np.float32)[None, :]
+        dx = bx - ax
+        dy = by - ay
+        length_sq = max(dx * dx + dy * dy, 1e-6)
+
+        # Squared distance to the segment, computed in place
+        t = px * np.float32(dx / length_sq) + py * np.float32(dy / length_sq)
+        np.clip(t, 0.0, 1.0, out=t)
+        ex = px - t * np.float32(dx)
+        ey = py - t * np.float32(dy)
+        ex *= ex
+        ey *= ey
+        ex += ey
+        if ra == rb:
+            inside = ex <= np.float32(ra * ra)
+        else:
+            radius = t * np.float32(rb - ra)
+            radius += np.float32(ra)
+            radius *= radius
+            inside = ex <= radius
+        np.copyto(classes[left - x0:right - x0, top - y0:bottom - y0], road,
+                  where=inside, casting='unsafe')
+
+    for water_x, water_y, water_radius in water_areas:
+        box = region(water_x - water_radius, water_y - water_radius,
+                     water_x + water_radius, water_y + water_radius)
+        if box is None:
+            continue
+        left, top, right, bottom = box
+        px = np.arange(left, right, dtype=np.float32)[:, None] - water_x
+        py = np.arange(top, bottom, dtype=np.float32)[None, :] - water_y
+        inside = px * px + py * py <= water_radius * water_radius
+        classes[left - x0:right - x0, top - y0:bottom - y0][inside] = water
+
+    return classes
+
+
+def get_start_grid(start_x, start_y, num_karts=4):
+    """Start positions as placed by Track.get_start_positions."""
+    return [(start_x + (i % 2 - 0.5) * 40, start_y - (i // 2) * 50 - 50)
+            for i in range(num_karts)]
+
+
+def validate_layout(layout, width=TRACK_WIDTH_PX, height=TRACK_HEIGHT_PX):
+    """Return why a layout is not raceable, or None if it is."""
+    points = [tuple(p) for p in layout['checkpoints']]
+    widths = layout['road_widths']
+    count = len(points)
+    if count < 3:
+        return "too few control points"
+
+    for i in range(count):
+        x, y = points[i]
+        margin = widths[i] / 2 + 10
+        if not (margin <= x <= width - margin and margin <= y <= height - margin):
+            return f"control point {i} too close to the border"
+
+        next_x, next_y = points[(i + 1) % count]
+        if math.hypot(next_x - x, next_y - y) < GENERATOR_MIN_SEGMENT:
+            return f"segment {i} too short"
+
+        prev_x, prev_y = points[i - 1]
+        turn = math.degrees(abs(
+            (math.atan2(next_y - y, next_x - x) -
+             math.atan2(y - prev_y, x - prev_x) + math.pi) % (2 * math.pi) - math.pi))
+        if turn > GENERATOR_MAX_TURN:
+            return f"turn at control point {i} too sharp"
+
+    # Non-adjacent stretches of road must not touch
+    for i in range(count):
+        for j in range(i + 2, count):
+            if i == 0 and j == count - 1:
+                continue
+            needed = (max(widths[i], widths[(i + 1) % count]) +
+                      max(widths[j], widths[(j + 1) % count])) / 2 + GENERATOR_CLEARANCE
+            if _segment_gap(points[i], points[(i + 1) % count],
+                            points[j], points[(j + 1) % count]) < needed:
+                return f"segments {i} and {j} too close"
+
+    # The start grid sits behind the start line in -y, so it needs a
+    # straight heading down the screen into checkpoint 0
+    start_x, start_y = points[0]
+    prev_x, prev_y = points[-1]
+    heading = math.degrees(math.atan2(start_y - prev_y, start_x - prev_x))
+    if abs(heading - 90) > START_MAX_ANGLE:
+        return "start straight does not head down"
+    grid = get_start_grid(start_x, start_y)
+    grid_xs = [x for x, _ in grid]
+    grid_ys = [y for _, y in grid]
+    if np.min(road_depth(layout, grid_xs, grid_ys)) < KART_SIZE / 2:
+        return "start grid not on the road"
+
+    for k, (water_x, water_y, water_radius) in enumerate(layout['water_areas']):
+        for x, y in points + grid:
+            if math.hypot(x - water_x, y - water_y) < water_radius + CHECKPOINT_RADIUS:
+                return f"water {k} covers a checkpoint or the start grid"
+
+    return None
+
+
+def _random_loop(rng, width, height):
+    """Control points and widths for a star-shaped loop around the centre."""
+    count = int(rng.integers(GENERATOR_MIN_POINTS, GENERATOR_MAX_POINTS + 1))
+    angles = (np.arange(count) + rng.uniform(-0.3, 0.3, count)) * 2 * math.pi / count
+    margin = GENERATOR_MAX_ROAD_WIDTH / 2 + 20
+    radii = rng.uniform(0.45, 1.0, count)
+    xs = width / 2 + (width / 2 - margin) * radii * np.cos(angles)
+    ys = height / 2 + (height / 2 - margin) * radii * np.sin(angles)
+    widths = rng.integers(GENERATOR_MIN_ROAD_WIDTH, GENERATOR_MAX_ROAD_WIDTH + 1, count)
+
+    points = [(int(x), int(y)) for x, y in zip(xs, ys)]
+    widths = [int(w) for w in widths]
+
+    # Start at the end of the segment that heads most directly down
+    headings = [(points[i][1] - points[i - 1][1]) /
+                max(1.0, math.hypot(points[i][0] - points[i - 1][0],
+                                    points[i][1] - points[i - 1][1]))
+                for i in range(count)]
+    start = int(np.argmax(headings))
+    return points[start:] + points[:start], widths[start:] + widths[:start]
+
+
+def _place_water(rng, layout, width, height):
+    """Add water hazards along the road edge, overlapping it a little."""
+    points = layout['checkpoints']
+    widths = layout['road_widths']
+    count = len(points)
+    water_areas = layout['water_areas']
+
+    for _ in range(int(rng.integers(0, GENERATOR_MAX_WATER + 1))):
+        for _attempt in range(10):
+            i = int(rng.integers(count))
+            t = rng.uniform(0.25, 0.75)
+            (ax, ay), (bx, by) = points[i], points[(i + 1) % count]
+            length = math.hypot(bx - ax, by - ay)
+            normal_x, normal_y = -(by - ay) / length, (bx - ax) / length
+            half_width = (widths[i] + (widths[(i + 1) % count] - widths[i]) * t) / 2
+            radius = int(rng.integers(35, 71))
+            offset = (half_width + radius * rng.uniform(-0.3, 0.6)) * rng.choice((-1, 1))
+            x = int(ax + (bx - ax) * t + normal_x * offset)
+            y = int(ay + (by - ay) * t + normal_y * offset)
+
+            if not (radius <= x <= width - radius and radius <= y <= height - radius):
+                continue
+            # Only the chosen stretch of road may be flooded
+            others = [j for j in range(count) if j != i]
+            depth = max(
+                (widths[j] / 2 - _segment_distance(
+                    x, y, *points[j], *points[(j + 1) % count])[0]) for j in others)
+            if depth > -radius - GENERATOR_CLEARANCE:
+                continue
+            if any(math.hypot(x - wx, y - wy) < radius + wr + GENERATOR_CLEARANCE
+                   for wx, wy, wr in water_areas):
+                continue
+            if any(math.hypot(x - px, y - py) < radius + CHECKPOINT_RADIUS
+                   for px, py in points + get_start_grid(*points[0])):
+                continue
+            water_areas.append((x, y, radius))
+            break
+
+
+def generate_layout(seed, width=TRACK_WIDTH_PX, height=TRACK_HEIGHT_PX):
+    """Generate a valid layout; the same seed always gives the same track."""
+    rng = np.random.default_rng(seed)
+    for attempt in range(1, GENERATOR_MAX_ATTEMPTS + 1):
+        checkpoints, road_widths = _random_loop(rng, width, height)
+        layout = {
+            'seed': seed,
+            'theme': str(rng.choice(sorted(TRACK_THEMES))),
+            'checkpoints': checkpoints,
+            'road_widths': road_widths,
+            'water_areas': []
+        }
+        if validate_layout(layout, width, height) is not None:
+            continue
+        _place_water(rng, layout, width, height)
+        layout['attempts'] = attempt
+        return layout
+    raise ValueError(f"No valid track found for seed {seed} "
+                     f"in {GENERATOR_MAX_ATTEMPTS} attempts")
+
+
+def validate_raster(layout, width=TRACK_WIDTH_PX, height=TRACK_HEIGHT_PX):
+    """Rasterize a layout and check that every checkpoint and start slot is road."""
+    classes = rasterize_layout(layout['checkpoints'], layout['road_widths'],
+                               layout['water_areas'], (0, 0, width, height))
+    points = layout['checkpoints'] + get_start_grid(*layout['checkpoints'][0])
+    for x, y in points:
+        if classes[int(x), int(y)] != SURFACE_ROAD:
+            return f"({int(x)}, {int(y)}) is not on the road"
+    return None
+
+
+def _generate_checked(seed):
+    """Batch worker: generate a layout and validate its raster."""
+    try:
+        layout = generate_layout(seed)
+    except ValueError as error:
+        return seed, None, str(error)
+    problem = validate_raster(layout)
+    return seed, (layout if problem is None else None), problem
+
+
+def get_cache_path(cache_dir):
+    return os.path.join(cache_dir, 'layouts.jsonl')
+
+
+def load_layouts(cache_dir=TRACK_CACHE_DIR):
+    """Load every cached layout. Returns {seed: layout}."""
+    path = get_cache_path(cache_dir)
+    layouts = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                layout = json.loads(line)
+                layouts[layout['seed']] = layout
+    return layouts
+
+
+def generate_batch(seeds, cache_dir=TRACK_CACHE_DIR, processes=None, chunksize=16):
+    """Generate and validate layouts across processes into the cache.
+
+    Seeds already in the cache are skipped. Returns (generated, failures)
+    where failures maps seed to the reason it was rejected.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    cached = load_layouts(cache_dir)
+    todo = [seed for seed in seeds if seed not in cached]
+    generated = 0
+    failures = {}
+    if not todo:
+        return generated, failures
+
+    with multiprocessing.Pool(processes) as pool, \
+            open(get_cache_path(cache_dir), 'a') as f:
+        for seed, layout, problem in pool.imap_unordered(
+                _generate_checked, todo, chunksize):
+            if layout is None:
+                failures[seed] = problem
+                continue
+            f.write(json.dumps(layout) + '\n')
+            generated += 1
+    return generated, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate procedural tracks into a cache.")
+    parser.add_argument('--count', type=int, default=1000, help="number of seeds")
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--cache-dir', default=TRACK_CACHE_DIR)
+    args = parser.parse_args()
+
+    seeds = range(args.first_seed, args.first_seed + args.count)
+    generated, failures = generate_batch(seeds, args.cache_dir, args.processes)
+    print(f"Generated {generated} tracks into {args.cache_dir} "
+          f"({args.count - generated - len(failures)} already cached)")
+    for seed, problem in sorted(failures.items()):
+        print(f"  seed {seed}: {problem}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Analytic track geometry: a closed centreline with a width profile.
+
+The centreline is a centripetal Catmull-Rom spline through the control points
+(or the control polygon itself with smooth=False), sampled into short
+segments. A bounding volume hierarchy over those segments answers on-road,
+nearest-point and progress queries in O(log n) without any raster.
+
+The road is the set of points within the interpolated half width of some
+segment, which is exactly what generator.rasterize_layout draws for the same
+samples, so rendered pixels and queries agree.
+"""
+
+import math
+import numpy as np
+from src.config import *
+
+
+def _catmull_rom(p0, p1, p2, p3, steps):
+    """Sample the centripetal Catmull-Rom span p1 -> p2 (excluding p2)."""
+    def knot(t, a, b):
+        return t + max(math.hypot(b[0] - a[0], b[1] - a[1]) ** 0.5, 1e-3)
+
+    t0 = 0.0
+    t1 = knot(t0, p0, p1)
+    t2 = knot(t1, p1, p2)
+    t3 = knot(t2, p2, p3)
+    p0, p1, p2, p3 = (np.asarray(p, dtype=np.float64) for p in (p0, p1, p2, p3))
+
+    t = np.linspace(t1, t2, steps, endpoint=False)[:, None]
+    a1 = (t1 - t) / (t1 - t0) * p0 + (t - t0) / (t1 - t0) * p1
+    a2 = (t2 - t) / (t2 - t1) * p1 + (t - t1) / (t2 - t1) * p2
+    a3 = (t3 - t) / (t3 - t2) * p2 + (t - t2) / (t3 - t2) * p3
+    b1 = (t2 - t) / (t2 - t0) * a1 + (t - t0) / (t2 - t0) * a2
+    b2 = (t3 - t) / (t3 - t1) * a2 + (t - t1) / (t3 - t1) * a3
+    return (t2 - t) / (t2 - t1) * b1 + (t - t1) / (t2 - t1) * b2
+
+
+class TrackGeometry:
+    """Sampled closed centreline with a per-sample half width and a BVH."""
+
+    def __init__(self, control_points, road_widths, smooth=True,
+                 spacing=TRACK_SPLINE_SPACING):
+        self.control_points = [tuple(point) for point in control_points]
+        self.road_widths = list(road_widths)
+        self.smooth = smooth
+
+        count = len(self.control_points)
+        points = []
+        widths = []
+        # First sample of each control segment, for edit dirty rects
+        self.control_starts = []
+        for i in range(count):
+            p1 = self.control_points[i]
+            p2 = self.control_points[(i + 1) % count]
+            w1 = self.road_widths[i]
+            w2 = self.road_widths[(i + 1) % count]
+            steps = max(1, int(math.ceil(math.hypot(p2[0] - p1[0], p2[1] - p1[1]) / spacing)))
+            if smooth:
+                span = _catmull_rom(self.control_points[i - 1], p1, p2,
+                                    self.control_points[(i + 2) % count], steps)
+            else:
+                span = np.asarray(p1, dtype=np.float64) + np.outer(
+                    np.arange(steps) / steps, np.subtract(p2, p1))
+            self.control_starts.append(len(points))
+            points.extend(map(tuple, span))
+            widths.extend(w1 + (w2 - w1) * np.arange(steps) / steps)
+        self.control_starts.append(len(points))
+
+        self.points = np.array(points, dtype=np.float64)
+        self.road_widths_sampled = np.array(widths, dtype=np.float64)
+        self.half_widths = self.road_widths_sampled / 2
+        self.max_half_width = float(self.half_widths.max())
+
+        # Segment i runs from sample i to sample i + 1 (wrapping)
+        ends = np.roll(self.points, -1, axis=0)
+        lengths = np.hypot(*(ends - self.points).T)
+        self.arc_lengths = np.concatenate(([0.0], np.cumsum(lengths)))
+        self.total_length = float(self.arc_lengths[-1])
+
+        # Plain lists: per-query scalar access is much faster than NumPy's
+        self._ax = self.points[:, 0].tolist()
+        self._ay = self.points[:, 1].tolist()
+        self._bx = ends[:, 0].tolist()
+        self._by = ends[:, 1].tolist()
+        self._ra = self.half_widths.tolist()
+        self._rb = np.roll(self.half_widths, -1).tolist()
+        self._arc = self.arc_lengths.tolist()
+
+        self._build_bvh()
+
+    def _build_bvh(self):
+        """Build a BVH over contiguous runs of segments.
+
+        Consecutive samples are spatially coherent, so halving index ranges
+        gives tight boxes without any sorting. Each node keeps a box around
+        its centreline (for nearest-point bounds) and one inflated by the half
+        width (bounding the road itself).
+        """
+        self.node_box = []  # Road box (min_x, min_y, max_x, max_y)
+        self.node_line_box = []  # Centreline box
+        self.node_children = []  # (left, right) or None for leaves
+        self.node_range = []  # (first, last) segment indices
+
+        def build(first, last):
+            radius = max(max(self._ra[first:last]), max(self._rb[first:last]))
+            xs = self._ax[first:last] + self._bx[first:last]
+            ys = self._ay[first:last] + self._by[first:last]
+            index = len(self.node_box)
+            self.node_line_box.append((min(xs), min(ys), max(xs), max(ys)))
+            self.node_box.append((min(xs) - radius, min(ys) - radius,
+                                  max(xs) + radius, max(ys) + radius))
+            self.node_range.append((first, last))
+            self.node_children.append(None)
+            if last - first > TRACK_BVH_LEAF_SIZE:
+                middle = (first + last) // 2
+                left = build(first, middle)
+                right = build(middle, last)
+                self.node_children[index] = (left, right)
+            return index
+
+        build(0, len(self._ax))
+
+    def _segment(self, i, x, y):
+        """Distance from (x, y) to segment i and the clamped parameter t."""
+        ax, ay = self._ax[i], self._ay[i]
+        dx = self._bx[i] - ax
+        dy = self._by[i] - ay
+        length_sq = dx * dx + dy * dy
+        t = ((x - ax) * dx + (y - ay) * dy) / length_sq if length_sq else 0.0
+        t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+        return math.hypot(x - ax - t * dx, y - ay - t * dy), t
+
+    def contains(self, x, y):
+        """Whether (x, y) is on the road."""
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            min_x, min_y, max_x, max_y = self.node_box[node]
+            if x < min_x or x > max_x or y < min_y or y > max_y:
+                continue
+            children = self.node_children[node]
+            if children:
+                stack.extend(children)
+                continue
+            first, last = self.node_range[node]
+            for i in range(first, last):
+                distance, t = self._segment(i, x, y)
+                if distance <= self._ra[i] + (self._rb[i] - self._ra[i]) * t:
+                    return True
+        return False
+
+    def nearest(self, x, y):
+        """Nearest centreline point to (x, y).
+
+        Returns (point_x, point_y, distance, arc_length, half_width).
+        """
+        boxes = self.node_line_box
+        ax, ay, bx, by = self._ax, self._ay, self._bx, self._by
+        best_sq = math.inf
+        best_segment = 0
+        best_t = 0.0
+
+        # Branch and bound; entries are (squared gap to the node's box, node)
+        stack = [(0.0, 0)]
+        while stack:
+            gap, node = stack.pop()
+            if gap >= best_sq:
+                continue
+            children = self.node_children[node]
+            if children:
+                order = []
+                for child in children:
+                    min_x, min_y, max_x, max_y = boxes[child]
+                    dx = min_x - x if x < min_x else x - max_x if x > max_x else 0.0
+                    dy = min_y - y if y < min_y else y - max_y if y > max_y else 0.0
+                    # Ties (point inside both boxes) go to the nearer centre
+                    centre = ((min_x + max_x) * 0.5 - x) ** 2 + ((min_y + max_y) * 0.5 - y) ** 2
+                    order.append((dx * dx + dy * dy, centre, child))
+                # Visit the closer child first (it is popped last)
+                if order[1] < order[0]:
+                    order.reverse()
+                stack.append(order[1][::2])
+                stack.append(order[0][::2])
+                continue
+
+            first, last = self.node_range[node]
+            for i in range(first, last):
+                dx = bx[i] - ax[i]
+                dy = by[i] - ay[i]
+                length_sq = dx * dx + dy * dy
+                t = ((x - ax[i]) * dx + (y - ay[i]) * dy) / length_sq if length_sq else 0.0
+                t = 0.0 if t < 0.0 else 1.0 if t > 1.0 else t
+                ex = x - ax[i] - t * dx
+                ey = y - ay[i] - t * dy
+                distance_sq = ex * ex + ey * ey
+                if distance_sq < best_sq:
+                    best_sq, best_segment, best_t = distance_sq, i, t
+
+        i, t = best_segment, best_t
+        point_x = ax[i] + (bx[i] - ax[i]) * t
+        point_y = ay[i] + (by[i] - ay[i]) * t
+        arc_length = self._arc[i] + (self._arc[i + 1] - self._arc[i]) * t
+        half_width = self._ra[i] + (self._rb[i] - self._ra[i]) * t
+        return point_x, point_y, math.sqrt(best_sq), arc_length, half_width
+
+    def signed_distance(self, x, y):
+        """Distance to the road edge via the nearest centreline point (+ on road)."""
+        _, _, distance, _, half_width = self.nearest(x, y)
+        return half_width - distance
+
+    def progress(self, x, y):
+        """Fraction of a lap (0 at checkpoint 0) at the nearest centreline point."""
+        return self.nearest(x, y)[3] / self.total_length
+
+    def get_span_box(self, first, last):
+        """Bounding box (min_x, min_y, max_x, max_y) of control segments
+        first..last (inclusive, wrapping), including the road width."""
+        count = len(self.control_points)
+        xs = []
+        ys = []
+        for k in range(first, last + 1):
+            i = k % count
+            start, stop = self.control_starts[i], self.control_starts[i + 1]
+            xs += self._ax[start:stop] + self._bx[start:stop]
+            ys += self._ay[start:stop] + self._by[start:stop]
+        radius = self.max_half_width
+        return (min(xs) - radius, min(ys) - radius,
+                max(xs) + radius, max(ys) + radius)
+
+    def get_affected_segments(self, index):
+        """Control segments whose shape depends on control point index."""
+        if self.smooth:
+            return index - 2, index + 1  # Catmull-Rom spans use 4 points
+        return index - 1, index
@@ -0,0 +1,195 @@
+"""
+Precomputed flow field for AI recovery.
+
+A coarse grid over the track stores one unit direction per cell:
+
+    on the road   forward along the racing line, pulled toward the middle of
+                  the road by the distance field gradient
+    off the road  toward the nearest road cell along a grid path that avoids
+                  water, blended with the forward direction so karts rejoin
+                  heading the right way
+
+The racing line is the track's centreline samples (or its checkpoint loop
+for the pixel-tested oval). Building the field takes a few milliseconds and
+is cached per track like the distance field; looking up a direction is two
+list indexings. FlowField.build_steps() builds it a couple of milliseconds
+at a time for the frame scheduler. The grid path length back to the road is
+kept too, so AI can tell a short drive back from one that is slower than a
+respawn.
+"""
+
+import math
+from collections import deque
+import numpy as np
+from src.config import *
+
+# 8-connected grid steps and their lengths
+_NEIGHBOURS = [(dx, dy, math.hypot(dx, dy))
+               for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+# Work between yields of an incremental build (about 2ms each)
+_SEGMENTS_PER_STEP = 32
+_CELLS_PER_STEP = 256
+
+
+def _segment_tangents(line, xs, ys):
+    """Unit tangent of the closed polyline segment nearest to each point
+    (a generator returning (tangent_x, tangent_y))."""
+    starts = line
+    ends = np.roll(line, -1, axis=0)
+    directions = ends - starts
+    lengths_sq = np.maximum((directions ** 2).sum(axis=1), 1e-9)
+
+    nearest = np.zeros(len(xs), dtype=np.intp)
+    best = np.full(len(xs), np.inf)
+    # Segment by segment keeps memory at O(cells)
+    for i in range(len(line)):
+        if i and i % _SEGMENTS_PER_STEP == 0:
+            yield
+        ax, ay = starts[i]
+        dx, dy = directions[i]
+        t = np.clip(((xs - ax) * dx + (ys - ay) * dy) / lengths_sq[i], 0, 1)
+        distance_sq = (xs - ax - t * dx) ** 2 + (ys - ay - t * dy) ** 2
+        closer = distance_sq < best
+        best[closer] = distance_sq[closer]
+        nearest[closer] = i
+
+    tangents = directions[nearest] / np.sqrt(lengths_sq[nearest])[:, None]
+    return tangents[:, 0], tangents[:, 1]
+
+
+class FlowField:
+    """Per-cell unit directions that lead any position back onto the road
+    and around the track."""
+
+    def __init__(self, track, cell_size=NAV_CELL_SIZE):
+        for _ in self.build(track, cell_size):
+            pass
+
+    @classmethod
+    def build_steps(cls, track, cell_size=NAV_CELL_SIZE):
+        """Generator building a field a few milliseconds per step; returns
+        the field."""
+        field = cls.__new__(cls)
+        yield from field.build(track, cell_size)
+        return field
+
+    @classmethod
+    def from_arrays(cls, cell_size, road, flow_x, flow_y, road_distance):
+        """A field from baked arrays (see track.packs)."""
+        field = cls.__new__(cls)
+        field.cell_size = cell_size
+        field.width, field.height = road.shape
+        field.road = np.array(road)
+        field.flow_x = flow_x.tolist()
+        field.flow_y = flow_y.tolist()
+        field.road_distance = road_distance.tolist()
+        return field
+
+    def build(self, track, cell_size):
+        """Compute the field, yielding between chunks of work."""
+        self.cell_size = cell_size
+        self.width = int(math.ceil(track.width / cell_size))
+        self.height = int(math.ceil(track.height / cell_size))
+
+        centres_x = (np.arange(self.width) + 0.5) * cell_size
+        centres_y = (np.arange(self.height) + 0.5) * cell_size
+        grid_x, grid_y = np.meshgrid(centres_x, centres_y, indexing='ij')
+        xs = grid_x.ravel()
+        ys = grid_y.ravel()
+
+        # Road and water at cell centres
+        distance = track.distances_at(xs, ys)
+        road = (distance > 0).reshape(self.width, self.height)
+        water = np.zeros(len(xs), dtype=bool)
+        for water_x, water_y, radius in track.water_areas:
+            water |= (xs - water_x) ** 2 + (ys - water_y) ** 2 <= \
+                (radius + cell_size / 2) ** 2
+        water = water.reshape(self.width, self.height)
+        yield
+
+        # Forward along the racing line
+        if track.geometry is not None:
+            line = track.geometry.points
+        else:
+            line = np.array(track.checkpoints, dtype=np.float64)
+        forward_x, forward_y = yield from _segment_tangents(line, xs, ys)
+
+        # Toward the middle of the road: the distance field grows inward
+        step = NAV_GRADIENT_STEP
+        gradient_x = (track.distances_at(xs + step, ys) -
+                      track.distances_at(xs - step, ys)) / (2 * step)
+        gradient_y = (track.distances_at(xs, ys + step) -
+                      track.distances_at(xs, ys - step)) / (2 * step)
+        flow_x = forward_x + NAV_CENTER_PULL * gradient_x
+        flow_y = forward_y + NAV_CENTER_PULL * gradient_y
+        flow_x = flow_x.reshape(self.width, self.height)
+        flow_y = flow_y.reshape(self.width, self.height)
+        forward_x = forward_x.reshape(self.width, self.height)
+        forward_y = forward_y.reshape(self.width, self.height)
+        yield
+
+        # Off the road: follow the grid path back to the nearest road cell
+        to_road_x, to_road_y, steps = yield from self.paths_to_road(road, water)
+        self.road_distance = (steps * cell_size).tolist()
+        off_road = ~road
+        flow_x[off_road] = to_road_x[off_road] + NAV_OFFROAD_FORWARD * forward_x[off_road]
+        flow_y[off_road] = to_road_y[off_road] + NAV_OFFROAD_FORWARD * forward_y[off_road]
+
+        length = np.maximum(np.hypot(flow_x, flow_y), 1e-6)
+        self.road = road
+        # Nested lists: scalar lookups are much faster than NumPy indexing
+        self.flow_x = (flow_x / length).tolist()
+        self.flow_y = (flow_y / length).tolist()
+
+    def paths_to_road(self, road, water):
+        """Unit step from each off-road cell toward the nearest road cell,
+        and the path length in cells.
+
+        Breadth-first search outward from every road cell (through grass and
+        sand, not water); each cell points at the neighbour it was reached
+        from. Cells the search never reaches point nowhere and are infinitely
+        far. A generator, like build().
+        """
+        width, height = road.shape
+        to_road_x = np.zeros(road.shape, dtype=np.float64)
+        to_road_y = np.zeros(road.shape, dtype=np.float64)
+        steps = np.where(road, 0.0, np.inf)
+        visited = road | water
+        queue = deque(zip(*np.nonzero(road)))
+
+        visits = 0
+        while queue:
+            visits += 1
+            if visits % _CELLS_PER_STEP == 0:
+                yield
+            x, y = queue.popleft()
+            for dx, dy, length in _NEIGHBOURS:
+                nx = x + dx
+                ny = y + dy
+                if nx < 0 or ny < 0 or nx >= width or ny >= height or visited[nx, ny]:
+                    continue
+                visited[nx, ny] = True
+                to_road_x[nx, ny] = -dx / length
+                to_road_y[nx, ny] = -dy / length
+                steps[nx, ny] = steps[x, y] + length
+                queue.append((nx, ny))
+        return to_road_x, to_road_y, steps
+
+    def cell_at(self, x, y):
+        """Grid cell of a world position, clamped to the grid."""
+        i = int(x // self.cell_size)
+        j = int(y // self.cell_size)
+        i = 0 if i < 0 else self.width - 1 if i >= self.width else i
+        j = 0 if j < 0 else self.height - 1 if j >= self.height else j
+        return i, j
+
+    def direction_at(self, x, y):
+        """Unit (dx, dy) to follow from a world position."""
+        i, j = self.cell_at(x, y)
+        return self.flow_x[i][j], self.flow_y[i][j]
+
+    def distance_to_road(self, x, y):
+        """Approximate driving distance (pixels) back to the road."""
+        i, j = self.cell_at(x, y)
+        return self.road_distance[i][j]
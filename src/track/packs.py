@@ -0,0 +1,288 @@
+"""
+Compiled track packs.
+
+A track definition is a JSON file in the generator's layout format (see
+track.generator) with an id, a name and a description, so a new track needs
+no code:
+
+    {"id": 3, "name": "Lakeside", "description": "...", "theme": "forest",
+     "smooth": true, "checkpoints": [[x, y], ...], "road_widths": [...],
+     "water_areas": [[x, y, radius], ...]}
+
+smooth draws the road as a spline through the checkpoints instead of
+straight segments. The compiler builds each track once and bakes what a race
+would otherwise compute on every start into a binary pack:
+
+    terrain          surface class of every pixel (grass, road, water)
+    distance_field   signed distance to the road edge
+    flow_*           the AI recovery flow field
+
+    python -m src.track.packs tracks/*.json --builtin
+
+--builtin also compiles the three tracks defined in code. A pack is a
+small header (magic, format version, JSON metadata holding the definition
+and a table of sections) followed by the raw arrays, each 64-byte aligned.
+TrackPack maps the file and hands out read-only NumPy views, so opening one
+reads only its header, and a race only pages in what it touches: headless
+races never touch the terrain layer. Installed packs are found by reading
+just their headers.
+"""
+
+import os
+import json
+import mmap
+import struct
+import argparse
+import numpy as np
+from src.config import *
+from src.track.generator import (TRACK_THEMES, SURFACE_GRASS, SURFACE_ROAD,
+                                 SURFACE_WATER, rasterize_layout)
+
+PACK_MAGIC = b'KTPK'
+# Bump when the layout of packs or what is baked into them changes
+PACK_VERSION = 1
+PACK_SUFFIX = '.trackpack'
+
+_HEADER = struct.Struct('<4sHHI')  # magic, version, reserved, metadata bytes
+_ALIGN = 64
+
+# Tracks defined in code (see Track.generate_track)
+BUILTIN_TRACKS = [
+    {'id': 0, 'name': "Oval Circuit", 'description': "Simple oval track for beginners"},
+    {'id': 1, 'name': "Forest Loop", 'description': "Winding track through the forest"},
+    {'id': 2, 'name': "Desert Challenge", 'description': "Sandy track with water hazards"}
+]
+
+# Installed packs per directory: {track_id: path}
+_installed = {}
+
+
+def load_definition(path):
+    """Read and check a track definition file."""
+    with open(path) as f:
+        definition = json.load(f)
+    for key in ('id', 'name', 'theme', 'checkpoints', 'road_widths'):
+        if key not in definition:
+            raise ValueError(f"{path}: missing '{key}'")
+    if definition['theme'] not in TRACK_THEMES:
+        raise ValueError(f"{path}: unknown theme '{definition['theme']}' "
+                         f"(one of {', '.join(TRACK_THEMES)})")
+    if len(definition['checkpoints']) < 3:
+        raise ValueError(f"{path}: a track needs at least 3 checkpoints")
+    if len(definition['road_widths']) != len(definition['checkpoints']):
+        raise ValueError(f"{path}: one road width per checkpoint is needed")
+    definition.setdefault('description', "")
+    definition.setdefault('water_areas', [])
+    return definition
+
+
+def describe_track(track, info):
+    """Everything Track.load_pack() needs besides the baked arrays."""
+    return {'id': info['id'],
+            'name': info['name'],
+            'description': info.get('description', ""),
+            'layout': track.layout,
+            'background': list(track.background_color),
+            'road': list(track.road_color),
+            'checkpoints': [list(point) for point in track.checkpoints],
+            'road_widths': list(track.road_widths),
+            'road_width': track.road_width,
+            'water_areas': [list(water) for water in track.water_areas],
+            'start_line_size': list(track.start_line_size),
+            # The oval's road is two ellipses rather than a centreline
+            'boundaries': [list(boundary) for boundary in track.track_boundaries]
+            if track.layout == "oval" else None}
+
+
+def terrain_layer(track):
+    """Surface class of every pixel of a track, indexed [x, y]."""
+    water_areas = track.water_areas
+    if track.geometry is not None:
+        return rasterize_layout(track.geometry.points,
+                                track.geometry.road_widths_sampled,
+                                water_areas, (0, 0, track.width, track.height))
+
+    # Pixel-drawn tracks: classify the rendered surface
+    terrain = np.where(track.get_road_mask(), SURFACE_ROAD,
+                       SURFACE_GRASS).astype(np.uint8)
+    xs = np.arange(track.width, dtype=np.float32)[:, None]
+    ys = np.arange(track.height, dtype=np.float32)[None, :]
+    for water_x, water_y, radius in water_areas:
+        terrain[(xs - water_x) ** 2 + (ys - water_y) ** 2 <= radius * radius] = \
+            SURFACE_WATER
+    return terrain
+
+
+def compile_pack(track, info, path):
+    """Bake a built track into a pack file at path."""
+    flow_field = track.get_flow_field()
+    sections = {
+        'terrain': terrain_layer(track),
+        'distance_field': track.distance_field,
+        'flow_road': flow_field.road,
+        'flow_x': np.array(flow_field.flow_x, dtype=np.float64),
+        'flow_y': np.array(flow_field.flow_y, dtype=np.float64),
+        'road_distance': np.array(flow_field.road_distance, dtype=np.float64)
+    }
+    metadata = {'definition': describe_track(track, info),
+                'width': track.width,
+                'height': track.height,
+                'flow_cell_size': flow_field.cell_size,
+                'sections': {}}
+
+    # Section offsets are relative to the data, which starts after the
+    # metadata (padded to the alignment)
+    offset = 0
+    for name, array in sections.items():
+        array = np.ascontiguousarray(array)
+        sections[name] = array
+        metadata['sections'][name] = {'dtype': array.dtype.str,
+                                      'shape': list(array.shape),
+                                      'offset': offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    encoded = json.dumps(metadata).encode()
+    data_start = -(-(_HEADER.size + len(encoded)) // _ALIGN) * _ALIGN
+    encoded = encoded.ljust(data_start - _HEADER.size)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, 'wb') as f:
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(encoded)))
+        f.write(encoded)
+        for name, array in sections.items():
+            f.seek(data_start + metadata['sections'][name]['offset'])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(temporary, path)
+
+
+def read_pack_metadata(f, path):
+    """Read and check the header of an open pack file."""
+    magic, version, _, length = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != PACK_MAGIC:
+        raise ValueError(f"{path} is not a track pack")
+    if version != PACK_VERSION:
+        raise ValueError(f"{path}: unsupported track pack version {version} "
+                         f"(expected {PACK_VERSION}, recompile it)")
+    metadata = json.loads(f.read(length))
+    metadata['data_start'] = _HEADER.size + length
+    return metadata
+
+
+def pack_revision(path, mtime_ns):
+    """Identity of one compile of a pack, for keying anything derived from
+    the track (a recompiled pack, or one installed over a built-in track,
+    gets a new one)."""
+    return f"{os.path.abspath(path)}@{mtime_ns}"
+
+
+class TrackPack:
+    """A memory-mapped compiled track."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.metadata = read_pack_metadata(f, path)
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.revision = pack_revision(path, os.fstat(f.fileno()).st_mtime_ns)
+        self.definition = self.metadata['definition']
+        self.track_id = self.definition['id']
+
+    def array(self, name):
+        """Read-only view of a baked section (pages are read on access)."""
+        section = self.metadata['sections'][name]
+        shape = tuple(section['shape'])
+        return np.frombuffer(self.map, dtype=np.dtype(section['dtype']),
+                             count=int(np.prod(shape)),
+                             offset=self.metadata['data_start'] +
+                             section['offset']).reshape(shape)
+
+
+def installed_packs(directory=TRACK_PACK_DIR, refresh=False):
+    """Installed packs as {track_id: {'id', 'name', 'description', 'path'}},
+    reading only their headers.
+
+    Packs that cannot be read are skipped with a warning.
+    """
+    if directory in _installed and not refresh:
+        return _installed[directory]
+    packs = {}
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(PACK_SUFFIX):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path, 'rb') as f:
+                    definition = read_pack_metadata(f, path)['definition']
+                packs[definition['id']] = {'id': definition['id'],
+                                           'name': definition['name'],
+                                           'description': definition['description'],
+                                           'path': path}
+            except (OSError, ValueError, KeyError, struct.error) as error:
+                print(f"Skipping track pack {path}: {error}")
+    _installed[directory] = packs
+    return packs
+
+
+def find_pack(track_id, directory=TRACK_PACK_DIR):
+    """Open the installed pack for track_id, or None if there is none."""
+    info = installed_packs(directory).get(track_id)
+    return TrackPack(info['path']) if info else None
+
+
+def track_revision(track_id, directory=TRACK_PACK_DIR):
+    """Revision of the installed pack for track_id, or None for a track
+    built from code."""
+    info = installed_packs(directory).get(track_id)
+    if info is None:
+        return None
+    try:
+        return pack_revision(info['path'], os.stat(info['path']).st_mtime_ns)
+    except OSError:
+        return None
+
+
+def available_tracks(directory=TRACK_PACK_DIR):
+    """[{'id', 'name', 'description'}] of the built-in and installed
+    tracks, by id. A pack with a built-in's id replaces it."""
+    tracks = {info['id']: info for info in BUILTIN_TRACKS}
+    tracks.update(installed_packs(directory))
+    return [tracks[track_id] for track_id in sorted(tracks)]
+
+
+def main():
+    from src.track.track import Track
+
+    parser = argparse.ArgumentParser(description="Compile track definitions into packs.")
+    parser.add_argument('definitions', nargs='*', help="track definition JSON files")
+    parser.add_argument('--builtin', action='store_true',
+                        help="also compile the tracks defined in code")
+    parser.add_argument('--output', default=TRACK_PACK_DIR,
+                        help="pack directory (default: %(default)s)")
+    args = parser.parse_args()
+
+    jobs = []
+    if args.builtin:
+        for info in BUILTIN_TRACKS:
+            jobs.append((info, lambda info=info: Track(info['id'], pack=False)))
+    for path in args.definitions:
+        definition = load_definition(path)
+        jobs.append((definition,
+                     lambda definition=definition: Track(definition['id'],
+                                                         layout=definition, pack=False)))
+    if not jobs:
+        parser.error("nothing to compile (give definitions or --builtin)")
+
+    for info, build in jobs:
+        slug = "".join(c if c.isalnum() else "-" for c in info['name'].lower())
+        path = os.path.join(args.output, f"{info['id']:03d}-{slug}{PACK_SUFFIX}")
+        compile_pack(build(), info, path)
+        print(f"Compiled {info['name']} (id {info['id']}) to {path} "
+              f"({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,31 +2,130 @@
 Track class for creating racing tracks with checkpoints and hazards.
 """
 
+import os
 import pygame
 import math
+import numpy as np
 from src.config import *
+from src.track.generator import (TRACK_THEMES, SURFACE_GRASS, SURFACE_ROAD,
+                                 SURFACE_WATER, rasterize_layout)
+from src.track.geometry import TrackGeometry
+from src.track.navigation import FlowField
+from src.track.walls import TrackWalls
+from src.track.packs import TrackPack, find_pack
+from src.systems.trace import traced
+
+# Distance fields only depend on the layout, so share them between races
+_distance_field_cache = {}
+_flow_field_cache = {}
+_walls_cache = {}
+
+
+def _distance_to_feature(feature, max_cells):
+    """Euclidean distance (in cells) from each cell to the nearest feature cell.
+
+    Separable exact transform clamped to max_cells: a vertical pass finds the
+    nearest feature in each column, then a horizontal pass combines columns.
+    """
+    limit = max_cells + 1
+    vertical = np.where(feature, 0, limit).astype(np.float32)
+    for offset in range(1, max_cells + 1):
+        np.minimum(vertical[:, :-offset], offset, out=vertical[:, :-offset],
+                   where=feature[:, offset:])
+        np.minimum(vertical[:, offset:], offset, out=vertical[:, offset:],
+                   where=feature[:, :-offset])
+
+    vertical *= vertical
+    squared = vertical.copy()
+    for offset in range(1, max_cells + 1):
+        shift = offset * offset
+        np.minimum(squared[:-offset], vertical[offset:] + shift,
+                   out=squared[:-offset])
+        np.minimum(squared[offset:], vertical[:-offset] + shift,
+                   out=squared[offset:])
+
+    return np.sqrt(np.minimum(squared, limit * limit))
+
+
+def compute_distance_field(road, max_cells):
+    """Signed distance (in cells) to the road edge: positive on the road.
+
+    road is a boolean grid indexed [x, y]; everything outside it is off-road.
+    """
+    padded = np.zeros((road.shape[0] + 2, road.shape[1] + 2), dtype=bool)
+    padded[1:-1, 1:-1] = road
+    inside = _distance_to_feature(~padded, max_cells)
+    outside = _distance_to_feature(padded, max_cells)
+    field = np.where(padded, inside - 0.5, 0.5 - outside)
+    return np.clip(field[1:-1, 1:-1], -max_cells, max_cells)
 
 
 class Track:
-    def __init__(self, track_id=0):
-        """Initialize a track."""
-        self.track_id = track_id
+    @traced()
+    def __init__(self, track_id=0, layout=None, render=True, pack=None):
+        """Initialize a track, or build one from a generated layout.
+
+        Tracks with an installed pack (see track.packs) are loaded from it;
+        pack can also be a TrackPack or its path, or False to build the
+        track from code. With render=False tracks that have analytic
+        geometry skip the track surface entirely (e.g. for headless
+        training).
+        """
+        if pack is None and layout is None:
+            pack = find_pack(track_id)
+        elif isinstance(pack, str):
+            pack = TrackPack(pack)
+        self.pack = pack or None
+        self.track_id = self.pack.track_id if self.pack is not None else track_id
+        # Which compile of a pack the track came from (None: built from code)
+        self.revision = self.pack.revision if self.pack is not None else None
+        self.generated_layout = layout
+        self.render = render
         self.checkpoints = []
         self.start_line = None
         self.track_surface = None
         self.water_areas = []
         self.track_boundaries = []
 
+        # Analytic centreline and width profile (None for the pixel-tested oval)
+        self.geometry = None
+        self.road_widths = []
+
         # Track dimensions
         self.width = 2000
         self.height = 1500
 
+        # Signed distance to the road edge, in pixels, indexed [x, y]
+        self.distance_field = None
+        # AI recovery directions, built on first use (see get_flow_field)
+        self.flow_field = None
+        # Solid road edges (see get_walls), only when walls are enabled
+        self.solid_walls = TRACK_WALLS
+        self.walls = None
+        # None once edited; generated tracks are usually used once, so
+        # their fields are not cached
+        self.cache_key = track_id if layout is None else None
+        if self.pack is not None:
+            self.cache_key = ('pack', self.revision)
+
+        # Downscaled copies of track_surface for reduced render quality
+        self.scaled_surfaces = {}
+
+        # Scratch target for partial re-rasterization while editing
+        self.scratch_surface = None
+
         # Generate track based on ID
-        self.generate_track()
+        if self.pack is not None:
+            self.load_pack()
+        else:
+            self.generate_track()
+            self.build_distance_field()
 
     def generate_track(self):
         """Generate track layout based on track_id."""
-        if self.track_id == 0:
+        if self.generated_layout is not None:
+            self.create_generated_track(self.generated_layout)
+        elif self.track_id == 0:
             self.create_oval_track()
         elif self.track_id == 1:
             self.create_forest_track()
@@ -60,21 +159,13 @@ class Track:
 
         # Set start line (first checkpoint)
         self.start_line = self.checkpoints[0]
+        self.start_line_size = (30, 10)
 
-        # Create track surface
-        self.track_surface = pygame.Surface((self.width, self.height))
-        self.track_surface.fill(DARK_GREEN)  # Grass background
-
-        # Draw track
-        # Outer boundary
-        pygame.draw.ellipse(self.track_surface, DARK_GRAY,
-                            (center_x - outer_radius_x, center_y - outer_radius_y,
-                             outer_radius_x * 2, outer_radius_y * 2))
-
-        # Inner boundary (grass island)
-        pygame.draw.ellipse(self.track_surface, DARK_GREEN,
-                            (center_x - inner_radius_x, center_y - inner_radius_y,
-                             inner_radius_x * 2, inner_radius_y * 2))
+        # Road between two ellipses on grass
+        self.layout = "oval"
+        self.background_color = DARK_GREEN
+        self.road_color = DARK_GRAY
+        self.road_width = outer_radius_x - inner_radius_x
 
         # Draw track boundaries for collision detection
         self.track_boundaries = [
@@ -84,12 +175,7 @@ class Track:
             (center_x, center_y, inner_radius_x, inner_radius_y, "inner")
         ]
 
-        # Draw start line
-        start_x, start_y = self.start_line
-        pygame.draw.line(self.track_surface, WHITE,
-                         (start_x - 30, start_y - 10), (start_x - 30, start_y + 10), 3)
-        pygame.draw.line(self.track_surface, WHITE,
-                         (start_x + 30, start_y - 10), (start_x + 30, start_y + 10), 3)
+        self.rasterize()
 
     def create_forest_track(self):
         """Create a winding forest track."""
@@ -102,19 +188,14 @@ class Track:
 
         self.checkpoints = track_points.copy()
         self.start_line = track_points[0]
+        self.start_line_size = (20, 15)
 
-        # Create track surface
-        self.track_surface = pygame.Surface((self.width, self.height))
-        self.track_surface.fill(DARK_GREEN)  # Forest background
-
-        # Draw track segments
-        for i in range(len(track_points)):
-            start_point = track_points[i]
-            end_point = track_points[(i + 1) % len(track_points)]
-
-            # Draw thick line for track
-            pygame.draw.line(self.track_surface, DARK_GRAY,
-                             start_point, end_point, TRACK_WIDTH)
+        # Smooth road through the checkpoints on a forest background
+        self.layout = "spline"
+        self.background_color = DARK_GREEN
+        self.road_color = DARK_GRAY
+        self.road_widths = [TRACK_WIDTH] * len(self.checkpoints)
+        self.build_geometry()
 
         # Add some water hazards
         self.water_areas = [
@@ -123,19 +204,10 @@ class Track:
             (700, 900, 70)
         ]
 
-        for water_x, water_y, water_radius in self.water_areas:
-            pygame.draw.circle(self.track_surface, WATER_BLUE,
-                               (int(water_x), int(water_y)), water_radius)
-
         # Create track boundaries (simplified for winding track)
-        self.track_boundaries = track_points
+        self.track_boundaries = self.checkpoints
 
-        # Draw start line
-        start_x, start_y = self.start_line
-        pygame.draw.line(self.track_surface, WHITE,
-                         (start_x - 20, start_y - 15), (start_x - 20, start_y + 15), 3)
-        pygame.draw.line(self.track_surface, WHITE,
-                         (start_x + 20, start_y - 15), (start_x + 20, start_y + 15), 3)
+        self.rasterize()
 
     def create_desert_track(self):
         """Create a desert track with sand and water hazards."""
@@ -155,17 +227,14 @@ class Track:
         ]
 
         self.start_line = self.checkpoints[0]
+        self.start_line_size = (25, 10)
 
-        # Create track surface
-        self.track_surface = pygame.Surface((self.width, self.height))
-        self.track_surface.fill(YELLOW)  # Sand background
-
-        # Draw figure-8 track
-        for i in range(len(self.checkpoints)):
-            start_point = self.checkpoints[i]
-            end_point = self.checkpoints[(i + 1) % len(self.checkpoints)]
-            pygame.draw.line(self.track_surface, BROWN,
-                             start_point, end_point, TRACK_WIDTH)
+        # Figure-8 of brown road on sand
+        self.layout = "spline"
+        self.background_color = YELLOW
+        self.road_color = BROWN
+        self.road_widths = [TRACK_WIDTH] * len(self.checkpoints)
+        self.build_geometry()
 
         # Add water hazards in center and corners
         self.water_areas = [
@@ -174,28 +243,196 @@ class Track:
             (center_x + 300, center_y + 300, 50)  # Bottom right corner
         ]
 
-        for water_x, water_y, water_radius in self.water_areas:
-            pygame.draw.circle(self.track_surface, WATER_BLUE,
-                               (int(water_x), int(water_y)), water_radius)
+        self.track_boundaries = self.checkpoints
+
+        self.rasterize()
 
+    def create_generated_track(self, layout):
+        """Create a track from a procedural layout (see track.generator)."""
+        theme = TRACK_THEMES[layout['theme']]
+        self.checkpoints = [tuple(point) for point in layout['checkpoints']]
+        self.road_widths = list(layout['road_widths'])
+        self.start_line = self.checkpoints[0]
+        self.start_line_size = tuple(layout.get('start_line_size', (20, 15)))
+
+        # Straight road segments of varying width, or a spline through them
+        self.layout = "spline" if layout.get('smooth') else "generated"
+        self.background_color = theme['background']
+        self.road_color = theme['road']
+        self.build_geometry()
+
+        self.water_areas = [tuple(water) for water in layout['water_areas']]
         self.track_boundaries = self.checkpoints
 
-        # Draw start line
+        self.rasterize()
+
+    @traced()
+    def load_pack(self):
+        """Set the track up from its pack: the definition gives the layout,
+        and the baked arrays stand in for rasterizing and precomputing."""
+        definition = self.pack.definition
+        self.layout = definition['layout']
+        self.checkpoints = [tuple(point) for point in definition['checkpoints']]
+        self.road_widths = list(definition['road_widths'])
+        self.road_width = definition['road_width']
+        self.water_areas = [tuple(water) for water in definition['water_areas']]
+        self.start_line = self.checkpoints[0]
+        self.start_line_size = tuple(definition['start_line_size'])
+        self.background_color = tuple(definition['background'])
+        self.road_color = tuple(definition['road'])
+        if self.layout == "oval":
+            self.track_boundaries = [tuple(boundary)
+                                     for boundary in definition['boundaries']]
+        else:
+            self.track_boundaries = self.checkpoints
+            self.build_geometry()
+
+        self.distance_field = self.pack.array('distance_field')
+        self.flow_field = FlowField.from_arrays(
+            self.pack.metadata['flow_cell_size'], self.pack.array('flow_road'),
+            self.pack.array('flow_x'), self.pack.array('flow_y'),
+            self.pack.array('road_distance'))
+
+        if self.render or self.geometry is None:
+            # Color the baked terrain instead of drawing the layout
+            self.track_surface = pygame.Surface((self.width, self.height))
+            colors = [None] * 3
+            colors[SURFACE_GRASS] = self.background_color
+            colors[SURFACE_ROAD] = self.road_color
+            colors[SURFACE_WATER] = WATER_BLUE
+            palette = np.array([self.track_surface.map_rgb(color) for color in colors],
+                               dtype=np.uint32)
+            pixels = pygame.surfarray.pixels2d(self.track_surface)
+            np.take(palette, self.pack.array('terrain'), out=pixels)
+            del pixels  # Unlock the surface
+            self.draw_start_line(self.track_surface)
+
+    def build_geometry(self):
+        """(Re)build the analytic geometry from checkpoints and road widths."""
+        self.geometry = TrackGeometry(self.checkpoints, self.road_widths,
+                                      smooth=self.layout == "spline")
+        self.road_width = max(self.road_widths)
+
+    def rasterize(self, rect=None):
+        """Draw the layout into track_surface, only inside rect if given."""
+        if not self.render and self.geometry is not None:
+            return  # Queries are analytic, nothing needs pixels
+        if self.track_surface is None:
+            self.track_surface = pygame.Surface((self.width, self.height))
+        if rect is None:
+            self.draw_layout(self.track_surface)
+            return
+
+        # pygame clips thick lines by their centre line, so a clipped draw can
+        # lose road edges. Draw whole shapes on a scratch surface instead and
+        # copy back only the dirty rect.
+        if self.scratch_surface is None:
+            self.scratch_surface = pygame.Surface((self.width, self.height))
+        self.draw_layout(self.scratch_surface, rect)
+        self.track_surface.blit(self.scratch_surface, rect, rect)
+
+    def draw_layout(self, surface, rect=None):
+        """Draw background, road, water and start line (shapes touching rect)."""
+        if self.geometry is not None:
+            # Render the centreline samples in one pass of array operations,
+            # written straight into the surface's pixels (surfaces are 32-bit)
+            region = rect if rect is not None else surface.get_rect()
+            pixels = pygame.surfarray.pixels2d(surface.subsurface(region))
+            colors = (self.background_color, self.road_color, WATER_BLUE)
+            rasterize_layout(self.geometry.points, self.geometry.road_widths_sampled,
+                             self.water_areas, region, out=pixels,
+                             values=[surface.map_rgb(color) for color in colors])
+            del pixels  # Unlock the surface
+        else:
+            self.draw_shapes(surface, rect)
+
+        self.draw_start_line(surface)
+
+    def draw_start_line(self, surface):
+        """Draw the start line markings."""
         start_x, start_y = self.start_line
-        pygame.draw.line(self.track_surface, WHITE,
-                         (start_x - 25, start_y - 10), (start_x - 25, start_y + 10), 3)
-        pygame.draw.line(self.track_surface, WHITE,
-                         (start_x + 25, start_y - 10), (start_x + 25, start_y + 10), 3)
+        half_width, half_height = self.start_line_size
+        pygame.draw.line(surface, WHITE,
+                         (start_x - half_width, start_y - half_height),
+                         (start_x - half_width, start_y + half_height), 3)
+        pygame.draw.line(surface, WHITE,
+                         (start_x + half_width, start_y - half_height),
+                         (start_x + half_width, start_y + half_height), 3)
+
+    def draw_shapes(self, surface, rect=None):
+        """Draw background, road and water with pygame.draw calls."""
+        surface.fill(self.background_color, rect)
+
+        # Draw track
+        if self.layout == "oval":
+            for center_x, center_y, radius_x, radius_y, kind in self.track_boundaries:
+                color = self.road_color if kind == "outer" else self.background_color
+                pygame.draw.ellipse(surface, color,
+                                    (center_x - radius_x, center_y - radius_y,
+                                     radius_x * 2, radius_y * 2))
+        else:
+            for i in range(len(self.checkpoints)):
+                if rect is None or self.get_segment_rect(i).colliderect(rect):
+                    start_point = self.checkpoints[i]
+                    end_point = self.checkpoints[(i + 1) % len(self.checkpoints)]
+                    pygame.draw.line(surface, self.road_color,
+                                     start_point, end_point, self.road_width)
+
+        # Draw water hazards
+        for i, (water_x, water_y, water_radius) in enumerate(self.water_areas):
+            if rect is None or self.get_water_rect(i).colliderect(rect):
+                pygame.draw.circle(surface, WATER_BLUE,
+                                   (int(water_x), int(water_y)), water_radius)
+
+    def get_segment_rect(self, index):
+        """Bounding rect of the road segment from checkpoint index to the next."""
+        if self.geometry is not None:
+            return self.get_span_rect(index, index)
+        x1, y1 = self.checkpoints[index]
+        x2, y2 = self.checkpoints[(index + 1) % len(self.checkpoints)]
+        rect = pygame.Rect(min(x1, x2), min(y1, y2),
+                           abs(x2 - x1) + 1, abs(y2 - y1) + 1)
+        return rect.inflate(self.road_width + 4, self.road_width + 4)
+
+    def get_span_rect(self, first, last):
+        """Bounding rect of the geometry's road from segment first to last."""
+        min_x, min_y, max_x, max_y = self.geometry.get_span_box(first, last)
+        return pygame.Rect(int(min_x) - 2, int(min_y) - 2,
+                           int(max_x - min_x) + 5, int(max_y - min_y) + 5)
+
+    def get_control_rect(self, index):
+        """Bounding rect of the road whose shape depends on checkpoint index."""
+        if self.geometry is not None:
+            return self.get_span_rect(*self.geometry.get_affected_segments(index))
+        return self.get_segment_rect(index).union(
+            self.get_segment_rect((index - 1) % len(self.checkpoints)))
+
+    def get_water_rect(self, index):
+        """Bounding rect of a water hazard."""
+        water_x, water_y, water_radius = self.water_areas[index]
+        return pygame.Rect(int(water_x) - water_radius - 1, int(water_y) - water_radius - 1,
+                           water_radius * 2 + 3, water_radius * 2 + 3)
+
+    def get_start_line_rect(self):
+        """Bounding rect of the start line markings."""
+        start_x, start_y = self.start_line
+        half_width, half_height = self.start_line_size
+        return pygame.Rect(int(start_x) - half_width - 3, int(start_y) - half_height - 3,
+                           half_width * 2 + 7, half_height * 2 + 7)
 
     def is_on_track(self, x, y):
         """Check if a position is on the track."""
-        if not self.track_surface:
-            return True
-
         # Check bounds
         if x < 0 or y < 0 or x >= self.width or y >= self.height:
             return False
 
+        if self.geometry is not None:
+            # Water covers the road, as it does on screen
+            return self.geometry.contains(x, y) and not self.is_in_water(x, y)
+
+        if not self.track_surface:
+            return True
+
         # Get pixel color at position
         try:
             color = self.track_surface.get_at((int(x), int(y)))
@@ -204,6 +441,321 @@ class Track:
         except IndexError:
             return False
 
+    def get_road_mask(self, rect=None, step=1):
+        """Get a boolean road mask (indexed [x, y]) from the surface.
+
+        With step > 1 only the centre pixel of each step x step cell is read.
+        """
+        surface = self.track_surface
+        if rect is not None:
+            surface = surface.subsurface(rect)
+        pixels = pygame.surfarray.pixels3d(surface)
+        sampled = pixels[step // 2::step, step // 2::step]
+        r, g, b = sampled[:, :, 0], sampled[:, :, 1], sampled[:, :, 2]
+        # Same rule as is_on_track: dark gray, brown or any dark color
+        dark = (r < 100) & (g < 100) & (b < 100)
+        brown = (r == BROWN[0]) & (g == BROWN[1]) & (b == BROWN[2])
+        del pixels, sampled, r, g, b  # Unlock the surface
+        return dark | brown
+
+    def get_road_cells(self, x0, y0, x1, y1):
+        """Road mask at the centres of distance field cells [x0, x1) x [y0, y1)."""
+        cell = TRACK_FIELD_CELL_SIZE
+        if self.geometry is None:
+            pixel_rect = pygame.Rect(x0 * cell, y0 * cell,
+                                     (x1 - x0) * cell, (y1 - y0) * cell)
+            pixel_rect = pixel_rect.clip(self.track_surface.get_rect())
+            return self.get_road_mask(pixel_rect, step=cell)
+
+        # Rasterize the geometry directly at cell resolution, in cell units
+        offset = cell // 2
+        water_areas = [((x - offset) / cell, (y - offset) / cell, radius / cell)
+                       for x, y, radius in self.water_areas]
+        classes = rasterize_layout((self.geometry.points - offset) / cell,
+                                   self.geometry.road_widths_sampled / cell,
+                                   water_areas, (x0, y0, x1 - x0, y1 - y0))
+        return classes == SURFACE_ROAD
+
+    @traced()
+    def build_distance_field(self):
+        """Precompute (or fetch from cache) the signed distance field."""
+        if self.cache_key is not None and self.cache_key in _distance_field_cache:
+            self.distance_field = _distance_field_cache[self.cache_key]
+            return
+
+        cell = TRACK_FIELD_CELL_SIZE
+        road = self.get_road_cells(0, 0, self.width // cell, self.height // cell)
+        max_cells = int(math.ceil(TRACK_FIELD_MAX_DISTANCE / cell))
+        field = compute_distance_field(road, max_cells) * cell
+        self.distance_field = np.ascontiguousarray(field, dtype=np.float32)
+        if self.cache_key is not None:
+            _distance_field_cache[self.cache_key] = self.distance_field
+
+    def get_flow_field(self):
+        """Flow field for AI recovery, built once per track and cached."""
+        if self.flow_field is None:
+            for _ in self.build_flow_field():
+                pass
+        return self.flow_field
+
+    def build_flow_field(self):
+        """Generator building the flow field in small steps (for the frame
+        scheduler), unless it is already built or cached."""
+        if self.flow_field is not None:
+            return
+        if self.cache_key is not None and self.cache_key in _flow_field_cache:
+            self.flow_field = _flow_field_cache[self.cache_key]
+            return
+        cache_key = self.cache_key
+        field = yield from FlowField.build_steps(self)
+        if self.flow_field is None and self.cache_key == cache_key:
+            # Not built meanwhile by get_flow_field() or edited since
+            self.flow_field = field
+            if cache_key is not None:
+                _flow_field_cache[cache_key] = field
+
+    def get_walls(self):
+        """Wall segments along the road edges, built once per track and
+        cached."""
+        if self.walls is None:
+            for _ in self.build_walls():
+                pass
+        return self.walls
+
+    def build_walls(self):
+        """Generator building the walls in small steps (for the frame
+        scheduler), unless they are already built or cached."""
+        if self.walls is not None:
+            return
+        if self.cache_key is not None and self.cache_key in _walls_cache:
+            self.walls = _walls_cache[self.cache_key]
+            return
+        cache_key = self.cache_key
+        walls = yield from TrackWalls.build_steps(self)
+        if self.walls is None and self.cache_key == cache_key:
+            # Not built meanwhile by get_walls() or edited since
+            self.walls = walls
+            if cache_key is not None:
+                _walls_cache[cache_key] = walls
+
+    def move_circle(self, x, y, dx, dy, radius):
+        """Move a circle by (dx, dy), sliding along the walls if they are
+        solid. Returns (x, y, impact) as TrackWalls.slide() does."""
+        if not self.solid_walls or self.distance_field is None:
+            return x + dx, y + dy, 0.0
+        # Walls follow the distance field's zero contour, so far from it
+        # there is nothing to hit. They only keep karts on the road: one
+        # that is off it drives back freely
+        distance = self.distance_at(x, y)
+        if distance < 0 or distance > radius + abs(dx) + abs(dy) + WALL_FIELD_MARGIN:
+            return x + dx, y + dy, 0.0
+        return self.get_walls().slide(x, y, dx, dy, radius)
+
+    def update_distance_field(self, rect):
+        """Recompute the distance field only where a change in rect reaches.
+
+        Distances are clamped, so cells further than the clamp from rect keep
+        their values and only a margin of road mask around them is needed.
+        """
+        cell = TRACK_FIELD_CELL_SIZE
+        max_cells = int(math.ceil(TRACK_FIELD_MAX_DISTANCE / cell))
+        margin = max_cells + 2
+        field_w, field_h = self.distance_field.shape
+
+        # Cells whose distance may change
+        x0 = max(0, rect.left // cell - margin)
+        y0 = max(0, rect.top // cell - margin)
+        x1 = min(field_w, rect.right // cell + margin + 1)
+        y1 = min(field_h, rect.bottom // cell + margin + 1)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        # Road mask they depend on
+        mx0 = max(0, x0 - margin)
+        my0 = max(0, y0 - margin)
+        mx1 = min(field_w, x1 + margin)
+        my1 = min(field_h, y1 + margin)
+        road = self.get_road_cells(mx0, my0, mx1, my1)
+
+        field = compute_distance_field(road, max_cells) * cell
+        self.distance_field[x0:x1, y0:y1] = \
+            field[x0 - mx0:x1 - mx0, y0 - my0:y1 - my0]
+        self.flow_field = None
+        self.walls = None
+
+    def make_editable(self):
+        """Detach from shared caches so the layout can be changed in place."""
+        if self.cache_key is not None:
+            self.cache_key = None
+            self.distance_field = self.distance_field.copy()
+            self.flow_field = None
+            self.walls = None
+        self.scaled_surfaces.clear()
+
+    def smooth_oval(self):
+        """Turn the oval's ellipses into a spline road through its
+        checkpoints, which (unlike the ellipses) can follow them when they
+        move. Done at the first move, so an unchanged oval stays exact."""
+        self.layout = "spline"
+        self.track_boundaries = self.checkpoints
+        self.road_widths = [self.road_width] * len(self.checkpoints)
+        self.build_geometry()
+        self.flow_field = None
+        self.walls = None
+        self.rasterize()
+        self.build_distance_field()
+        self.scaled_surfaces.clear()
+
+    def rebuild_region(self, rect, distance_field=True):
+        """Re-rasterize a changed region and its derived data.
+
+        Pass distance_field=False to only redraw, and rebuild the field for
+        the same rect later.
+        """
+        rect = rect.clip(pygame.Rect(0, 0, self.width, self.height))
+        if rect.width == 0 or rect.height == 0:
+            return
+        self.flow_field = None  # Rebuilt on next use
+        self.walls = None
+        self.rasterize(rect)
+        if distance_field:
+            self.update_distance_field(rect)
+        self.scaled_surfaces.clear()
+
+    def move_checkpoint(self, index, x, y):
+        """Move a control point. Returns the dirty rect."""
+        if self.layout == "oval":
+            self.smooth_oval()
+        dirty = self.get_control_rect(index)
+        if index == 0:
+            dirty.union_ip(self.get_start_line_rect())
+
+        self.checkpoints[index] = (x, y)
+        self.start_line = self.checkpoints[0]
+        if self.geometry is not None:
+            self.build_geometry()
+
+        dirty.union_ip(self.get_control_rect(index))
+        if index == 0:
+            dirty.union_ip(self.get_start_line_rect())
+        return dirty
+
+    def set_start_checkpoint(self, index):
+        """Make checkpoint index the start line. Returns the dirty rect."""
+        dirty = self.get_start_line_rect()
+        self.checkpoints[:] = self.checkpoints[index:] + self.checkpoints[:index]
+        if self.geometry is not None:
+            self.road_widths[:] = self.road_widths[index:] + self.road_widths[:index]
+            self.build_geometry()
+        self.start_line = self.checkpoints[0]
+        return dirty.union(self.get_start_line_rect())
+
+    def add_water(self, x, y, radius):
+        """Add a water hazard. Returns the dirty rect."""
+        self.water_areas.append((x, y, radius))
+        return self.get_water_rect(len(self.water_areas) - 1)
+
+    def move_water(self, index, x, y):
+        """Move a water hazard. Returns the dirty rect."""
+        dirty = self.get_water_rect(index)
+        self.water_areas[index] = (x, y, self.water_areas[index][2])
+        return dirty.union(self.get_water_rect(index))
+
+    def remove_water(self, index):
+        """Remove a water hazard. Returns the dirty rect."""
+        dirty = self.get_water_rect(index)
+        del self.water_areas[index]
+        return dirty
+
+    def distance_at(self, x, y):
+        """Signed distance to the road edge at a point (bilinear, in pixels)."""
+        field = self.distance_field
+        gx = x / TRACK_FIELD_CELL_SIZE - 0.5
+        gy = y / TRACK_FIELD_CELL_SIZE - 0.5
+        ix = int(math.floor(gx))
+        iy = int(math.floor(gy))
+        if ix < 0 or iy < 0 or ix >= field.shape[0] - 1 or iy >= field.shape[1] - 1:
+            return -TRACK_FIELD_MAX_DISTANCE
+
+        fx = gx - ix
+        fy = gy - iy
+        top = field.item(ix, iy) * (1 - fx) + field.item(ix + 1, iy) * fx
+        bottom = field.item(ix, iy + 1) * (1 - fx) + \
+            field.item(ix + 1, iy + 1) * fx
+        return top * (1 - fy) + bottom * fy
+
+    def distances_at(self, xs, ys):
+        """Vectorized distance_at for arrays of points."""
+        field = self.distance_field
+        gx = np.asarray(xs, dtype=np.float32) / TRACK_FIELD_CELL_SIZE - 0.5
+        gy = np.asarray(ys, dtype=np.float32) / TRACK_FIELD_CELL_SIZE - 0.5
+        outside = (gx < 0) | (gy < 0) | (gx >= field.shape[0] - 1) | \
+            (gy >= field.shape[1] - 1)
+
+        gx = np.clip(gx, 0, field.shape[0] - 1.001)
+        gy = np.clip(gy, 0, field.shape[1] - 1.001)
+        ix = gx.astype(np.intp)
+        iy = gy.astype(np.intp)
+        fx = gx - ix
+        fy = gy - iy
+        top = field[ix, iy] * (1 - fx) + field[ix + 1, iy] * fx
+        bottom = field[ix, iy + 1] * (1 - fx) + field[ix + 1, iy + 1] * fx
+        distances = top * (1 - fy) + bottom * fy
+        distances[outside] = -TRACK_FIELD_MAX_DISTANCE
+        return distances
+
+    def raycast(self, x, y, angle, max_distance):
+        """Distance along a ray (angle in degrees) to the road edge.
+
+        Sphere tracing: each step advances by the distance to the nearest
+        edge, so a ray takes a handful of samples instead of one per pixel.
+        Rays grazing along an edge take more, down to TRACK_RAY_MIN_STEP,
+        but always reach the edge or max_distance. Returns 0 when starting
+        off the road.
+        """
+        dx = math.cos(math.radians(angle))
+        dy = math.sin(math.radians(angle))
+        travelled = 0.0
+        while travelled < max_distance:
+            distance = self.distance_at(x + dx * travelled, y + dy * travelled)
+            if distance <= TRACK_RAY_EPSILON:
+                return travelled
+            travelled += max(distance, TRACK_RAY_MIN_STEP)
+        return max_distance
+
+    def raycast_many(self, xs, ys, angles, max_distance):
+        """Vectorized raycast for arrays of origins and angles (degrees)."""
+        xs, ys, radians = np.broadcast_arrays(
+            np.asarray(xs, dtype=np.float32), np.asarray(ys, dtype=np.float32),
+            np.radians(np.asarray(angles, dtype=np.float32)))
+        shape = xs.shape
+        xs = xs.ravel()
+        ys = ys.ravel()
+        dx = np.cos(radians).ravel()
+        dy = np.sin(radians).ravel()
+        travelled = np.zeros(xs.shape, dtype=np.float32)
+
+        active = np.arange(len(xs))  # Rays still marching
+        for _ in range(TRACK_RAY_MAX_STEPS):
+            distance = self.distances_at(xs[active] + dx[active] * travelled[active],
+                                         ys[active] + dy[active] * travelled[active])
+            on_road = distance > TRACK_RAY_EPSILON
+            active = active[on_road]
+            travelled[active] += np.maximum(distance[on_road], TRACK_RAY_MIN_STEP)
+            active = active[travelled[active] < max_distance]
+            if not active.size:
+                break
+
+        # The few rays grazing along an edge need many more small steps:
+        # finish them one at a time rather than stepping the whole batch
+        for i in active:
+            x = float(xs[i] + dx[i] * travelled[i])
+            y = float(ys[i] + dy[i] * travelled[i])
+            angle = math.degrees(math.atan2(dy[i], dx[i]))
+            travelled[i] += self.raycast(x, y, angle, max_distance - float(travelled[i]))
+
+        return np.minimum(travelled, max_distance).reshape(shape)
+
     def is_in_water(self, x, y):
         """Check if a position is in water (needs respawn)."""
         for water_x, water_y, water_radius in self.water_areas:
@@ -249,20 +801,60 @@ class Track:
 
         return positions
 
-    def draw(self, screen, camera_x, camera_y):
+    def get_item_box_positions(self):
+        """Rows of item boxes across the road, every ITEM_BOX_ROW_INTERVAL
+        checkpoint segments (skipping the start straight)."""
+        positions = []
+        count = len(self.checkpoints)
+        for i in range(1, count, ITEM_BOX_ROW_INTERVAL):
+            (x1, y1), (x2, y2) = self.checkpoints[i], self.checkpoints[(i + 1) % count]
+            center_x = (x1 + x2) / 2
+            center_y = (y1 + y2) / 2
+            half_width = self.road_width / 2
+            if self.geometry is not None:
+                center_x, center_y, _, _, half_width = \
+                    self.geometry.nearest(center_x, center_y)
+
+            # Spread the row across the road, perpendicular to the segment
+            length = math.hypot(x2 - x1, y2 - y1) or 1.0
+            normal_x = -(y2 - y1) / length
+            normal_y = (x2 - x1) / length
+            spacing = 2 * half_width / (ITEM_BOXES_PER_ROW + 1)
+            for k in range(ITEM_BOXES_PER_ROW):
+                offset = (k - (ITEM_BOXES_PER_ROW - 1) / 2) * spacing
+                x = center_x + normal_x * offset
+                y = center_y + normal_y * offset
+                if self.distance_at(x, y) > ITEM_BOX_RADIUS / 2 and \
+                        not self.is_in_water(x, y):
+                    positions.append((x, y))
+        return positions
+
+    def get_scaled_surface(self, scale):
+        """Get (and cache) the track surface resized by scale."""
+        if scale == 1.0:
+            return self.track_surface
+        if scale not in self.scaled_surfaces:
+            size = (int(self.width * scale), int(self.height * scale))
+            self.scaled_surfaces[scale] = pygame.transform.smoothscale(
+                self.track_surface, size)
+        return self.scaled_surfaces[scale]
+
+    def draw(self, screen, camera_x, camera_y, scale=1.0):
         """Draw the track on screen with camera offset."""
         if self.track_surface:
-            screen.blit(self.track_surface, (-camera_x, -camera_y))
+            screen.blit(self.get_scaled_surface(scale),
+                        (-camera_x * scale, -camera_y * scale))
 
         # Draw checkpoints for debugging (optional)
         for i, checkpoint in enumerate(self.checkpoints):
-            screen_x = checkpoint[0] - camera_x
-            screen_y = checkpoint[1] - camera_y
+            screen_x = (checkpoint[0] - camera_x) * scale
+            screen_y = (checkpoint[1] - camera_y) * scale
 
             # Only draw if on screen
             if -50 < screen_x < SCREEN_WIDTH + 50 and -50 < screen_y < SCREEN_HEIGHT + 50:
                 pygame.draw.circle(
-                    screen, GREEN, (int(screen_x), int(screen_y)), CHECKPOINT_RADIUS, 3)
+                    screen, GREEN, (int(screen_x), int(screen_y)),
+                    int(CHECKPOINT_RADIUS * scale), 3)
 
                 # Draw checkpoint number
                 font = pygame.font.Font(None, 24)
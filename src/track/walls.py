@@ -0,0 +1,294 @@
+"""
+Solid walls along the road edges.
+
+The walls are the zero contour of the track's signed distance field
+(marching squares, one short segment per field cell it crosses), so every
+layout gets them the same way: the oval's two ellipses, the figure-8's
+crossing and edited tracks included. Edges against water are left open so
+water stays a hazard. Walls are one-sided: they keep karts on the road,
+but a kart that starts off it (a crowded grid, a knock from an item) can
+still drive back on.
+
+Segments are indexed by a BVH built once per track. A kart moves as a
+circle swept along its displacement: the earliest contact with any wall
+segment (a capsule of the kart's radius) stops it there and the rest of the
+move slides along the wall, so no speed is fast enough to pass through.
+"""
+
+import math
+import numpy as np
+from src.config import *
+
+# Cell corners (0..3) at the ends of each cell edge (0..3), indexed [x, y]:
+# edge 0 runs along y = j, 1 along x = i + 1, 2 along y = j + 1, 3 along x = i
+_CORNERS = [(0, 0), (1, 0), (1, 1), (0, 1)]
+_EDGES = [(0, 1), (1, 2), (3, 2), (0, 3)]
+
+# BVH nodes built between yields of an incremental build (about 2ms each)
+_NODES_PER_STEP = 96
+
+
+def contour_segments(field, cell_size, level=0.0):
+    """Segments (ax, ay, bx, by) in pixels along field == level.
+
+    field is sampled at cell centres and indexed [x, y]. Saddle cells are
+    split by the value at their centre.
+    """
+    width, height = field.shape
+    above = field > level
+    inside = [above[dx:width - 1 + dx, dy:height - 1 + dy] for dx, dy in _CORNERS]
+
+    # Only cells the contour passes through (corners on both sides)
+    mixed = (inside[0] != inside[1]) | (inside[0] != inside[2]) | \
+        (inside[0] != inside[3])
+    i, j = np.nonzero(mixed)
+    corners = [field[i + dx, j + dy].astype(np.float64) - level for dx, dy in _CORNERS]
+    inside = [corner > 0 for corner in corners]
+
+    # Crossing point on every cell edge (only used where it is crossed)
+    crossed = []
+    points_x = []
+    points_y = []
+    for first, second in _EDGES:
+        a, b = corners[first], corners[second]
+        crossed.append(inside[first] != inside[second])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(a != b, a / (a - b), 0.5)
+        (x0, y0), (x1, y1) = _CORNERS[first], _CORNERS[second]
+        points_x.append(i + x0 + (x1 - x0) * t)
+        points_y.append(j + y0 + (y1 - y0) * t)
+    crossed = np.stack(crossed, axis=-1)
+    points_x = np.stack(points_x, axis=-1)
+    points_y = np.stack(points_y, axis=-1)
+    count = crossed.sum(axis=-1)
+
+    # Two crossed edges: one segment between them
+    cells = np.nonzero(count == 2)
+    edges = np.argsort(~crossed[cells], axis=-1, kind='stable')[:, :2]
+    starts = (points_x[cells][np.arange(len(edges)), edges[:, 0]],
+              points_y[cells][np.arange(len(edges)), edges[:, 0]])
+    ends = (points_x[cells][np.arange(len(edges)), edges[:, 1]],
+            points_y[cells][np.arange(len(edges)), edges[:, 1]])
+    segments = [np.stack(starts + ends, axis=-1)]
+
+    # Saddles: cut off the two corners unlike the centre
+    cells = np.nonzero(count == 4)
+    centre = sum(corner[cells] for corner in corners) > 0
+    around_odd = inside[0][cells] == centre  # Corners 1 and 3 are cut off
+    for pairs, mask in ((((0, 1), (2, 3)), around_odd),
+                        (((3, 0), (1, 2)), ~around_odd)):
+        px = points_x[cells][mask]
+        py = points_y[cells][mask]
+        for first, second in pairs:
+            segments.append(np.stack((px[:, first], py[:, first],
+                                      px[:, second], py[:, second]), axis=-1))
+
+    return (np.concatenate(segments) + 0.5) * cell_size
+
+
+class TrackWalls:
+    """Wall segments around a track's road and swept-circle queries."""
+
+    def __init__(self, track):
+        for _ in self.build(track):
+            pass
+
+    @classmethod
+    def build_steps(cls, track):
+        """Generator building the walls a few milliseconds per step; returns
+        them."""
+        walls = cls.__new__(cls)
+        yield from walls.build(track)
+        return walls
+
+    def build(self, track):
+        """Trace the walls and index them, yielding between chunks of work."""
+        segments = contour_segments(track.distance_field, TRACK_FIELD_CELL_SIZE)
+        yield
+
+        # Leave the road open where it borders water
+        middle_x = (segments[:, 0] + segments[:, 2]) / 2
+        middle_y = (segments[:, 1] + segments[:, 3]) / 2
+        keep = (segments[:, 0] != segments[:, 2]) | (segments[:, 1] != segments[:, 3])
+        for water_x, water_y, radius in track.water_areas:
+            keep &= (middle_x - water_x) ** 2 + (middle_y - water_y) ** 2 > \
+                (radius + 2 * TRACK_FIELD_CELL_SIZE) ** 2
+        segments = segments[keep]
+
+        # Walls only stop karts leaving the road: orient every segment with
+        # the road on its left, so its normal (-edge_y, edge_x) points inward
+        edge_x = segments[:, 2] - segments[:, 0]
+        edge_y = segments[:, 3] - segments[:, 1]
+        lengths = np.hypot(edge_x, edge_y)
+        normal_x = -edge_y / lengths * TRACK_FIELD_CELL_SIZE / 2
+        normal_y = edge_x / lengths * TRACK_FIELD_CELL_SIZE / 2
+        middle_x = (segments[:, 0] + segments[:, 2]) / 2
+        middle_y = (segments[:, 1] + segments[:, 3]) / 2
+        outward = track.distances_at(middle_x + normal_x, middle_y + normal_y) < \
+            track.distances_at(middle_x - normal_x, middle_y - normal_y)
+        segments[outward] = segments[outward][:, [2, 3, 0, 1]]
+        self.segments = segments
+        yield
+
+        order = yield from self._build_bvh()
+        segments = self.segments[order]
+        yield
+
+        # Plain lists: per-query scalar access is much faster than NumPy's
+        self._ax = segments[:, 0].tolist()
+        self._ay = segments[:, 1].tolist()
+        self._bx = segments[:, 2].tolist()
+        self._by = segments[:, 3].tolist()
+        edge_x = segments[:, 2] - segments[:, 0]
+        edge_y = segments[:, 3] - segments[:, 1]
+        lengths = np.hypot(edge_x, edge_y)
+        self._ex = edge_x.tolist()
+        self._ey = edge_y.tolist()
+        self._length_sq = (lengths ** 2).tolist()
+        self._nx = (-edge_y / lengths).tolist()
+        self._ny = (edge_x / lengths).tolist()
+
+    def __len__(self):
+        return len(self.segments)
+
+    def _build_bvh(self):
+        """Split segments at the median of their midpoints along the longer
+        axis until leaves hold TRACK_BVH_LEAF_SIZE.
+
+        Leaves cover contiguous runs of the returned segment order. A
+        generator, like build().
+        """
+        self.node_box = []  # (min_x, min_y, max_x, max_y)
+        self.node_children = []  # (left, right) or None for leaves
+        self.node_range = []  # (first, last) segment indices
+        segments = self.segments
+        mins = np.minimum(segments[:, :2], segments[:, 2:])
+        maxs = np.maximum(segments[:, :2], segments[:, 2:])
+        middles = (mins + maxs) / 2
+        order = []
+        if not len(segments):
+            return np.array(order, dtype=np.intp)
+
+        # Entries are (segment indices, parent node, child slot)
+        pending = [(np.arange(len(segments)), None, 0)]
+        while pending:
+            indices, parent, slot = pending.pop()
+            index = len(self.node_box)
+            if index and index % _NODES_PER_STEP == 0:
+                yield
+            if parent is not None:
+                self.node_children[parent][slot] = index
+            low = mins[indices].min(axis=0)
+            high = maxs[indices].max(axis=0)
+            self.node_box.append((low[0], low[1], high[0], high[1]))
+            if len(indices) > TRACK_BVH_LEAF_SIZE:
+                axis = int(np.argmax(high - low))
+                half = len(indices) // 2
+                split = np.argpartition(middles[indices, axis], half)
+                self.node_children.append([None, None])
+                self.node_range.append(None)
+                pending.append((indices[split[half:]], index, 1))
+                pending.append((indices[split[:half]], index, 0))
+            else:
+                self.node_children.append(None)
+                self.node_range.append((len(order), len(order) + len(indices)))
+                order.extend(indices.tolist())
+        return np.array(order, dtype=np.intp)
+
+    def sweep(self, x, y, dx, dy, radius):
+        """First contact of a circle moving from (x, y) by (dx, dy).
+
+        Returns (t, normal_x, normal_y, depth) with t in [0, 1] and the
+        normal pointing away from the wall, or None if the move is clear.
+        depth is how far the circle already overlaps a wall it is moving
+        into (only at t == 0).
+        """
+        if not self.node_box:
+            return None
+        min_x = min(x, x + dx) - radius
+        min_y = min(y, y + dy) - radius
+        max_x = max(x, x + dx) + radius
+        max_y = max(y, y + dy) + radius
+        ax, ay, bx, by = self._ax, self._ay, self._bx, self._by
+        radius_sq = radius * radius
+        move_sq = dx * dx + dy * dy
+        best = None
+        best_t = 2.0
+
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            box = self.node_box[node]
+            if min_x > box[2] or max_x < box[0] or min_y > box[3] or max_y < box[1]:
+                continue
+            children = self.node_children[node]
+            if children:
+                stack.extend(children)
+                continue
+
+            first, last = self.node_range[node]
+            for i in range(first, last):
+                # Karts beyond a wall (off the road) may drive back through
+                nx, ny = self._nx[i], self._ny[i]
+                side = (x - ax[i]) * nx + (y - ay[i]) * ny
+                if side < 0:
+                    continue
+                closing = dx * nx + dy * ny
+                if closing < 0:
+                    t = (side - radius) / -closing
+                    if t < 0:
+                        t = 0.0
+                    if t < best_t:
+                        u = ((x + dx * t - ax[i]) * self._ex[i] +
+                             (y + dy * t - ay[i]) * self._ey[i]) / self._length_sq[i]
+                        if 0 <= u <= 1:
+                            best_t = t
+                            best = (t, nx, ny, max(radius - side, 0.0))
+
+                # Round ends
+                for cx, cy in ((ax[i], ay[i]), (bx[i], by[i])):
+                    fx = x - cx
+                    fy = y - cy
+                    closing = fx * dx + fy * dy
+                    if closing >= 0:
+                        continue  # Moving away (or not at all)
+                    gap = fx * fx + fy * fy - radius_sq
+                    if gap <= 0:
+                        t = 0.0
+                    else:
+                        discriminant = closing * closing - move_sq * gap
+                        if discriminant < 0:
+                            continue
+                        t = (-closing - math.sqrt(discriminant)) / move_sq
+                        if t > 1:
+                            continue
+                    if t < best_t:
+                        hx = fx + dx * t
+                        hy = fy + dy * t
+                        distance = math.hypot(hx, hy) or 1.0
+                        best_t = t
+                        best = (t, hx / distance, hy / distance,
+                                max(radius - distance, 0.0))
+
+        if best is not None and best[0] > 1:
+            return None
+        return best
+
+    def slide(self, x, y, dx, dy, radius):
+        """Move a circle by (dx, dy), stopping at walls and sliding along
+        them. Returns (x, y, impact), impact being the largest speed into a
+        wall (0 if none was touched)."""
+        impact = 0.0
+        for _ in range(WALL_MAX_SLIDES):
+            hit = self.sweep(x, y, dx, dy, radius)
+            if hit is None:
+                return x + dx, y + dy, impact
+            t, nx, ny, depth = hit
+            x += dx * t + nx * (depth + WALL_SKIN)
+            y += dy * t + ny * (depth + WALL_SKIN)
+            # Keep only the part of the remaining move along the wall
+            closing = dx * nx + dy * ny
+            impact = max(impact, -closing)
+            dx = (dx - closing * nx) * (1 - t)
+            dy = (dy - closing * ny) * (1 - t)
+        return x, y, impact
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+End-to-end frame-time regression harness.
+
+Steps Game.run_frame() under SDL's dummy video driver with a scripted
+input timeline (menu -> track select -> race -> pause -> restart -> race ->
+menu) for every track, and reports per-scene frame-time percentiles, net
+memory block growth and GC pauses as JSON, optionally with input-to-flip
+latency percentiles (--latency).
+
+Frames run back to back at a fixed dt, so what Game.run() adds around them
+is not measured: the frame cap, late input sampling, idle waits on event-
+driven scenes and adaptive quality's frame-time samples. Frames that change
+scenes (e.g. building a race) are reported apart, as "Old->New".
+
+    python -m tools.frame_harness --frames 600 --output build.json
+    python -m tools.frame_harness --compare baseline.json
+
+--capture DIR also records every frame (PNGs, or through --encoder), waiting
+for the writers rather than dropping, at whatever rate they sustain.
+
+--memory DIR snapshots memory at every scene change into a timeline there
+(see src/systems/memory.py); with --rounds N the session repeats N times, so
+growth between rounds of the same transitions points at leaks.
+"""
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import argparse
+import gc
+import json
+import sys
+import time
+import pygame
+from src.config import *
+
+NUM_TRACKS = 3
+COUNTDOWN_FRAMES = int(3.0 * FPS) + 5
+
+
+class ScriptedKeys:
+    """Stands in for pygame.key.get_pressed() with a scripted key set."""
+
+    def __init__(self):
+        self.held = set()
+
+    def __getitem__(self, key):
+        return key in self.held
+
+    def get_pressed(self):
+        return self
+
+
+def build_timeline(race_frames, rounds=1):
+    """Build the scripted input timeline as a list of (frames, action, keys),
+    racing every track rounds times."""
+    timeline = []
+    current_track = 0
+
+    def press(*keys):
+        for key in keys:
+            timeline.append((1, 'press', key))
+
+    for track_id in list(range(NUM_TRACKS)) * rounds:
+        # Menu cursor starts on "Start Race": go to "Select Track"
+        press(pygame.K_DOWN, pygame.K_DOWN, pygame.K_RETURN)
+        press(*[pygame.K_RIGHT] * ((track_id - current_track) % NUM_TRACKS))
+        current_track = track_id
+        press(pygame.K_RETURN)
+
+        # Back on the menu (cursor on "Select Track"): start the race
+        press(pygame.K_UP, pygame.K_UP, pygame.K_RETURN)
+        timeline.append((COUNTDOWN_FRAMES, 'hold', ()))
+        timeline.extend(race_inputs(race_frames))
+
+        # Pause, restart and race again
+        press(pygame.K_ESCAPE)
+        timeline.append((30, 'hold', ()))
+        press(pygame.K_r)
+        timeline.append((COUNTDOWN_FRAMES, 'hold', ()))
+        timeline.extend(race_inputs(race_frames // 2))
+
+        # Pause and leave to the menu (cursor is back on "Start Race")
+        press(pygame.K_ESCAPE, pygame.K_m)
+        timeline.append((30, 'hold', ()))
+
+    return timeline
+
+
+def race_inputs(frames):
+    """Throttle with a repeating left/right steering pattern."""
+    pattern = [
+        (40, (pygame.K_UP,)),
+        (15, (pygame.K_UP, pygame.K_RIGHT)),
+        (40, (pygame.K_UP,)),
+        (15, (pygame.K_UP, pygame.K_LEFT))
+    ]
+    inputs = []
+    remaining = frames
+    while remaining > 0:
+        for length, keys in pattern:
+            length = min(length, remaining)
+            if length > 0:
+                inputs.append((length, 'hold', keys))
+                remaining -= length
+    return inputs
+
+
+class FrameStats:
+    """Collects per-scene frame times, memory block growth and GC numbers."""
+
+    def __init__(self):
+        self.scenes = {}
+        self.gc_start = 0
+        self.gc_pauses = []
+        gc.callbacks.append(self.on_gc)
+
+    def on_gc(self, phase, info):
+        if phase == 'start':
+            self.gc_start = time.perf_counter()
+        else:
+            self.gc_pauses.append((time.perf_counter() - self.gc_start) * 1000)
+
+    def add(self, scene, frame_ms, block_growth):
+        """Record a frame. block_growth is the change in allocated blocks:
+        memory allocated and freed within the frame does not show."""
+        stats = self.scenes.setdefault(
+            scene, {'times': [], 'block_growth': [], 'gc_pauses': []})
+        stats['times'].append(frame_ms)
+        stats['block_growth'].append(block_growth)
+        stats['gc_pauses'].extend(self.gc_pauses)
+        self.gc_pauses = []
+
+    def report(self):
+        report = {}
+        for scene, stats in self.scenes.items():
+            times = sorted(stats['times'])
+            growth = stats['block_growth']
+            report[scene] = {
+                'frames': len(times),
+                'p50_ms': round(percentile(times, 50), 3),
+                'p99_ms': round(percentile(times, 99), 3),
+                'max_ms': round(times[-1], 3),
+                'mean_block_growth': round(sum(growth) / len(growth), 1),
+                'max_block_growth': max(growth),
+                'gc_collections': len(stats['gc_pauses']),
+                'gc_max_ms': round(max(stats['gc_pauses'], default=0.0), 3)
+            }
+        return report
+
+    def close(self):
+        gc.callbacks.remove(self.on_gc)
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1,
+                max(0, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def scene_name(game):
+    """Label frames by scene, and by track for races."""
+    name = type(game.current_scene).__name__
+    if game.state == PLAYING:
+        name += f"[track={game.selected_track}]"
+    return name
+
+
+def run_harness(race_frames, adaptive_quality=False, latency=False, trace=None,
+                capture=None, encoder=None, memory=None, rounds=1,
+                state_feed=None):
+    """Play the scripted timeline and return the JSON-ready report."""
+    from src.game import Game
+    from src.systems.capture import FrameCapture
+    from src.systems.latency import LatencyTracer
+    from src.systems.memory import MemoryTracker
+    from src.systems.state_feed import StateFeed
+    from src.systems.trace import enable_tracing, dump_trace
+
+    pygame.init()
+    if trace:
+        enable_tracing()
+    keys = ScriptedKeys()
+    real_get_pressed = pygame.key.get_pressed
+    pygame.key.get_pressed = keys.get_pressed
+
+    game = Game()
+    game.quality.enabled = adaptive_quality
+    if latency:
+        game.latency = LatencyTracer()
+    if capture:
+        game.capture = FrameCapture(game.screen, capture, encoder, block=True)
+    if memory:
+        game.memory = MemoryTracker(memory)
+    if state_feed:
+        game.state_feed = StateFeed(state_feed)
+    stats = FrameStats()
+    session_start = time.perf_counter()
+    dt = 1.0 / FPS
+
+    try:
+        for frames, action, arg in build_timeline(race_frames, rounds):
+            if action == 'press':
+                pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=arg))
+                pygame.event.post(pygame.event.Event(pygame.KEYUP, key=arg))
+                keys.held = set()
+            else:
+                keys.held = set(arg)
+
+            for _ in range(frames):
+                scene = scene_name(game)
+                blocks = sys.getallocatedblocks()
+                start = time.perf_counter()
+                game.run_frame(dt)
+                frame_ms = (time.perf_counter() - start) * 1000
+                # Scene changes (building a race takes ~100 ms) would
+                # otherwise swamp the percentiles of the scene they left
+                if scene_name(game) != scene:
+                    scene = f"{scene}->{scene_name(game)}"
+                stats.add(scene, frame_ms, sys.getallocatedblocks() - blocks)
+    finally:
+        stats.close()
+        pygame.key.get_pressed = real_get_pressed
+        if game.telemetry:
+            game.telemetry.close()
+        if game.capture:
+            game.capture.close()
+        if game.memory:
+            game.memory.close()
+        if game.state_feed:
+            game.state_feed.close()
+    session_seconds = time.perf_counter() - session_start
+
+    report = {
+        'python': sys.version.split()[0],
+        'pygame': pygame.version.ver,
+        'race_frames': race_frames,
+        'rounds': rounds,
+        'adaptive_quality': adaptive_quality,
+        'scenes': stats.report()
+    }
+    if game.latency:
+        report['latency'] = game.latency.report()
+    report['scheduler'] = game.scheduler.report()
+    if game.capture:
+        frames = game.capture.frames
+        report['capture'] = {'path': game.capture.path,
+                             'frames': frames,
+                             'written': game.capture.written,
+                             'dropped': game.capture.dropped,
+                             'realtime_factor': round(frames / FPS / session_seconds, 2)}
+    if game.memory:
+        report['memory'] = game.memory.report()
+    if game.state_feed:
+        report['state_feed'] = {'name': game.state_feed.name,
+                                'frames': game.state_feed.sequence}
+    if trace:
+        dump_trace(trace)
+    return report
+
+
+def compare(report, baseline):
+    """Print per-scene p50/p99/max changes against a baseline report."""
+    for scene, stats in sorted(report['scenes'].items()):
+        base = baseline['scenes'].get(scene)
+        if not base:
+            print(f"{scene}: new scene")
+            continue
+        parts = []
+        for key in ('p50_ms', 'p99_ms', 'max_ms', 'mean_block_growth'):
+            if key not in base:
+                continue  # Baseline from an older harness
+            old, new = base[key], stats[key]
+            change = (new - old) / old * 100 if old else 0.0
+            parts.append(f"{key} {old} -> {new} ({change:+.1f}%)")
+        print(f"{scene}: " + ", ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--frames', type=int, default=600,
+                        help="race frames per track before pausing")
+    parser.add_argument('--output', help="write the JSON report here")
+    parser.add_argument('--compare', help="baseline JSON report to diff against")
+    parser.add_argument('--label', default='', help="build label stored in the report")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="leave the adaptive quality controller enabled")
+    parser.add_argument('--latency', action='store_true',
+                        help="trace input-to-flip latency of scripted key presses")
+    parser.add_argument('--trace', help="also write a Chrome trace of every frame here")
+    parser.add_argument('--capture', help="capture every frame into this directory")
+    parser.add_argument('--encoder', default=CAPTURE_ENCODER,
+                        help="encoder command for --capture (see CAPTURE_ENCODER)")
+    parser.add_argument('--memory', help="write a memory timeline into this directory")
+    parser.add_argument('--rounds', type=int, default=1,
+                        help="repeat the session (e.g. a soak test with --memory)")
+    parser.add_argument('--state-feed', help="publish race state under this shared-memory name")
+    args = parser.parse_args()
+
+    report = run_harness(args.frames, args.adaptive, args.latency, args.trace,
+                         args.capture, args.encoder, args.memory, args.rounds,
+                         args.state_feed)
+    report['label'] = args.label
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Reference reader for the shared-memory race state feed.
+
+Prints the standings of a running game a few times a second:
+
+    python -m tools.state_reader --name kart_state
+
+Start the game with STATE_FEED_NAME set first. Spectator screens and
+dashboards can copy the loop below: poll() for every tick (e.g. to chart
+speeds), latest() for just the current state.
+"""
+
+import time
+import argparse
+from src.config import *
+from src.systems.state_feed import StateFeedReader, FRAME_STARTED, FRAME_FINISHED
+
+
+def describe(frame):
+    """Standings of one frame as printable lines."""
+    if frame['flags'] & FRAME_FINISHED:
+        status = "finished"
+    elif frame['flags'] & FRAME_STARTED:
+        status = "racing"
+    else:
+        status = "countdown"
+    lines = [f"tick {frame['tick']}  {status}  {frame['race_timer']:.1f}s"]
+    karts = StateFeedReader.karts(frame)
+    for index in sorted(range(len(karts)), key=lambda i: karts[i]['race_position']):
+        kart = karts[index]
+        name = "player" if index == 0 else f"kart {index}"
+        lines.append(f"  {kart['race_position']:2d}. {name:<8} lap {kart['lap']} "
+                     f"cp {kart['checkpoint']:3d}  speed {kart['speed']:5.2f}  "
+                     f"({kart['x']:6.0f}, {kart['y']:6.0f})"
+                     + ("  finished" if kart['finished'] else ""))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print race state from a running game.")
+    parser.add_argument('--name', default=STATE_FEED_NAME or "kart_state",
+                        help="shared-memory feed name (default: %(default)s)")
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help="seconds between printouts (default: %(default)s)")
+    parser.add_argument('--duration', type=float,
+                        help="stop after this many seconds")
+    args = parser.parse_args()
+
+    reader = StateFeedReader(args.name)
+    start = time.perf_counter()
+    frames = 0
+    try:
+        while not reader.closed:
+            polled = reader.poll()
+            frames += len(polled)
+            if polled:
+                print("\n".join(describe(polled[-1])))
+            if args.duration is not None and time.perf_counter() - start >= args.duration:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Read {frames} frames, missed {reader.missed}, "
+              f"{reader.torn} torn reads retried"
+              + (" (feed closed)" if reader.closed else ""))
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
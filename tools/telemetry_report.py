@@ -0,0 +1,105 @@
+"""
+Heatmaps, sector times and hotspots from a telemetry corpus.
+
+    python -m tools.telemetry_report telemetry --track 1 --output report
+
+Analyzes every race recorded on the track (see src/systems/analytics.py),
+prints the sector times and hotspots, and writes into the output directory:
+
+    report.json        everything printed, in full
+    heatmap.png        where karts drive
+    player_vs_ai.png   the player's line (red) over the AI's (blue)
+    off_track.png      where karts leave the road, busiest spots circled
+    water.png          where karts fall into water, busiest spots circled
+"""
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys
+import json
+import time
+import argparse
+import pygame
+from src.config import *
+from src.systems.analytics import analyze, races_on_track, render_overlay
+from src.systems.telemetry import load_schema
+from src.track.track import Track
+
+HEAT_COLOR = (255, 200, 0, 255)
+PLAYER_COLOR = (255, 40, 40, 255)
+AI_COLOR = (40, 120, 255, 255)
+OFF_TRACK_COLOR = (255, 120, 0, 255)
+WATER_COLOR = (255, 0, 255, 255)
+
+
+def print_sectors(sectors):
+    print(f"{'sector':>6}  {'player p50':>10}  {'AI p50':>8}  {'AI p10-p90':>13}  samples")
+    for sector, (player, ai) in enumerate(zip(sectors['player'], sectors['ai'])):
+        player_p50 = f"{player['p50']:.2f}s" if player['count'] else "-"
+        ai_p50 = f"{ai['p50']:.2f}s" if ai['count'] else "-"
+        ai_range = f"{ai['p10']:.2f}-{ai['p90']:.2f}s" if ai['count'] else "-"
+        print(f"{sector:>6}  {player_p50:>10}  {ai_p50:>8}  {ai_range:>13}  "
+              f"{player['count']}/{ai['count']}")
+    for loss in sectors['slowest'][:3]:
+        print(f"Sector {loss['sector']} costs the player {loss['loss']:+.2f}s "
+              f"against the AI median")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a telemetry corpus.")
+    parser.add_argument('corpus', nargs='?', default=TELEMETRY_DIR,
+                        help="telemetry directory (default: TELEMETRY_DIR)")
+    parser.add_argument('--track', type=int, default=0, help="track id (default: 0)")
+    parser.add_argument('--output', default="telemetry_report",
+                        help="directory for images and report.json (default: %(default)s)")
+    args = parser.parse_args()
+    if not args.corpus:
+        parser.error("no corpus directory given and TELEMETRY_DIR is not set")
+
+    schema = load_schema(args.corpus)
+    if schema is None:
+        sys.exit(f"No telemetry corpus in {args.corpus}")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    track = Track(args.track)
+    races, listed = races_on_track(schema, args.track, track.revision)
+    if not listed:
+        print("The corpus does not list tracks per race; analyzing every race")
+    start = time.perf_counter()
+    analytics = analyze(args.corpus, track, races)
+    elapsed = time.perf_counter() - start
+    report = analytics.report()
+    print(f"Analyzed {report['races']} races ({report['rows']} rows) on track "
+          f"{args.track} in {elapsed:.2f}s")
+    print_sectors(report['sectors'])
+    for name, hotspots in report['hotspots'].items():
+        spots = ", ".join(f"({spot['x']:.0f}, {spot['y']:.0f}) x{spot['samples']}"
+                          for spot in hotspots)
+        print(f"{name} hotspots: {spots or 'none'}")
+
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    heat = analytics.heatmaps
+    cell = analytics.cell_size
+    surface = track.track_surface
+    images = {
+        'heatmap.png': render_overlay(surface, heat['all'], cell, HEAT_COLOR),
+        'player_vs_ai.png': render_overlay(
+            render_overlay(surface, heat['ai'], cell, AI_COLOR),
+            heat['player'], cell, PLAYER_COLOR),
+        'off_track.png': render_overlay(surface, heat['left_track'], cell,
+                                        OFF_TRACK_COLOR, report['hotspots']['left_track']),
+        'water.png': render_overlay(surface, heat['water'], cell, WATER_COLOR,
+                                    report['hotspots']['water'])
+    }
+    for name, image in images.items():
+        pygame.image.save(image, os.path.join(args.output, name))
+    print(f"Report and images written to {args.output}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()